@@ -1,15 +1,18 @@
 # admin_views.py
 
+from flask_admin import BaseView, expose
 from flask_admin.contrib.sqla import ModelView
 from flask_admin.model.fields import InlineFieldList
 from flask import session, flash, redirect, url_for, request
 # Import WTForms components for custom form
 from flask_wtf import FlaskForm
 from wtforms.fields import SelectField, TextAreaField, StringField, HiddenField
-from wtforms.validators import DataRequired, Optional
+from wtforms.validators import DataRequired, Optional, ValidationError
 
 # Import your models
 from models import AppSetting, Response, User, UserFeedback
+from settings_cache import bump_settings_version
+from settings_schema import SETTINGS_BY_KEY
 
 
 
@@ -61,6 +64,30 @@ class AppSettingAdminView(ModelView):
     form_widget_args = None
     form_extra_fields = None
 
+    def __init__(self, *args, on_change=None, **kwargs):
+        # on_change(): called after every committed setting change (app.py invalidates this worker's settings snapshot)
+        self.on_change = on_change
+        super(AppSettingAdminView, self).__init__(*args, **kwargs)
+
+    def _settings_changed(self):
+        if self.on_change: self.on_change()
+
+    @staticmethod
+    def validated_value(setting_key, raw_value):
+        """Canonical string for a submitted value, checked against the settings schema (keys outside it are stored as typed)."""
+        spec = SETTINGS_BY_KEY.get(setting_key)
+        if not spec: return raw_value
+        try: return spec.format(spec.parse(raw_value))
+        except ValueError as e: raise ValidationError(str(e))
+
+    # Created/deleted settings bump the settings version in the same transaction (other workers reload within a request)
+    def on_model_change(self, form, model, is_created):
+        model.setting_value = self.validated_value(model.setting_key, model.setting_value)
+        bump_settings_version(self.session)
+    def on_model_delete(self, model): bump_settings_version(self.session)
+    def after_model_change(self, form, model, is_created): self._settings_changed()
+    def after_model_delete(self, model): self._settings_changed()
+
     def get_edit_context(self, **kwargs):
         """Pass extra context to the edit template."""
         context = super(AppSettingAdminView, self).get_edit_context(**kwargs)
@@ -72,10 +99,12 @@ class AppSettingAdminView(ModelView):
     def update_model(self, form, model):
         try:
             # Read data from the single 'setting_value' field defined in the form
-            new_value = form.setting_value.data
+            new_value = self.validated_value(model.setting_key, form.setting_value.data)
             model.setting_value = new_value
             self.session.add(model)
+            bump_settings_version(self.session)
             self.session.commit()
+            self._settings_changed()
             flash(f"Setting '{model.setting_key}' updated successfully.", 'success')
             return True
         except Exception as ex:
@@ -124,7 +153,7 @@ class ResponseAdminView(ModelView):
     }
     
     column_filters = ('is_correct', 'wiki_page_title', 'timestamp', 'user_confidence', 'game_category', 'user.nickname')
-    column_searchable_list = ('wiki_page_title', 'question_text', 'user.nickname', 'game_category')
+    column_searchable_list = ('wiki_page_title', 'question_text', 'question.question_text', 'user.nickname', 'game_category')
     column_default_sort = ('timestamp', True)
     
     column_labels = { 
@@ -222,4 +251,39 @@ class UserFeedbackAdminView(ModelView):
 
     def inaccessible_callback(self, name, **kwargs):
         flash('You are not authorized to access this page.', 'warning')
-        return redirect(url_for('index')) # Or your login page
\ No newline at end of file
+        return redirect(url_for('index')) # Or your login page
+
+
+class CategoryStandardizationAdminView(ModelView):
+    """Cached custom-category standardizations. Editing a term fixes it for everyone (other workers pick it up within the in-memory TTL)."""
+    column_list = ('input_key', 'sample_input', 'standardized_term', 'hit_count', 'last_used_at', 'created_at')
+    column_searchable_list = ('input_key', 'sample_input', 'standardized_term')
+    column_filters = ('hit_count', 'last_used_at')
+    column_default_sort = ('hit_count', True)
+    form_columns = ('standardized_term',)
+    column_labels = {'input_key': 'Normalized Input', 'sample_input': 'Example Input', 'standardized_term': 'Standardized Term', 'hit_count': 'Hits'}
+    can_create = False
+    page_size = 100
+
+    def is_accessible(self): return True # Add your access control
+    def inaccessible_callback(self, name, **kwargs):
+        flash('You are not authorized...', 'warning'); return redirect(url_for('index'))
+
+
+class ServiceMetricsView(BaseView):
+    """
+    Read-only page showing in-process service counters (parse telemetry, cache stats, ...).
+    `metrics_provider` returns {section name: {row name: {column: value}}} (or a flat {column: value} per section).
+    """
+
+    def __init__(self, metrics_provider, **kwargs):
+        self.metrics_provider = metrics_provider
+        super(ServiceMetricsView, self).__init__(**kwargs)
+
+    @expose('/')
+    def index(self):
+        return self.render('admin/service_metrics.html', metrics=self.metrics_provider())
+
+    def is_accessible(self): return True # Add your access control
+    def inaccessible_callback(self, name, **kwargs):
+        flash('You are not authorized...', 'warning'); return redirect(url_for('index'))
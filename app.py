@@ -1,8 +1,12 @@
 import os
+import time
+import asyncio
 import random
 import re 
 import requests
 import math
+import json
+import click
 from flask import Flask, render_template, request, jsonify, session, flash, redirect, url_for
 from flask_migrate import Migrate
 from flask_admin import Admin
@@ -10,14 +14,35 @@ from flask_bootstrap import Bootstrap # Make sure this is initialized only once
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from dotenv import load_dotenv
 import google.generativeai as genai
-import wikipediaapi
 from sqlalchemy.exc import IntegrityError
 from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
 from forms import RegistrationForm, LoginForm, FeedbackForm, RequestResetForm, ResetPasswordForm
-from models import db, User, Response, AppSetting, GameSummary, UserFeedback
+from models import db, User, Response, AppSetting, GameSummary, UserFeedback, CategoryStandardization, WikiPageCacheEntry
+from context_extraction import ContextCache
+from settings_cache import SettingsCache, bump_settings_version
+from settings_schema import seed_default_settings
+from user_stats import record_answer, record_game_completed, rebuild_user_stats
+from stats_queries import lifetime_totals_query, category_stats_query, best_game_score_query, best_game_brier_query, calibration_responses_query
+from leaderboard_cache import LeaderboardCache
+from rank_index import LeaderboardRankIndex
+from query_plans import check_query_plans
+from leaderboard_queries import benchmark_lifetime_leaderboards, indexed_lifetime_leaderboards, single_scan_lifetime_leaderboards, leaderboard_page, eligible_categories_query, parse_cursor, LIFETIME_BOARDS, CATEGORY_BOARDS
+from question_bank import compute_content_hash, find_banked_question, find_banked_questions, find_fallback_question, bank_question, question_to_data, record_question_served, record_question_answered
+from backends import BACKEND_LIVE, BACKEND_RECORD, BACKEND_REPLAY, FixtureStore, LatencyModel, RecordingWikipediaAdapter, ReplayWikipediaAdapter, RecordingGeminiModel, ReplayGeminiModel
+from article_index import ArticleIndex, build_article_index
+from search_index import LocalSearchIndex
+from wiki_client import WikipediaClient, WikipediaAPIError
+from wiki_cache import WikiPageCache, CandidateListCache, MEDIAWIKI_BATCH_SIZE, build_batch_page_query, parse_batch_page_query
+from question_generation import QUESTION_BATCH_SCHEMA, build_single_question_prompt, build_batch_prompt, build_json_prompt, parse_question_blocks, parse_questions_json, parse_telemetry
+from category_cache import CategoryStandardizationCache
+from circuit_breaker import CircuitBreaker
+from gemini_client import HedgedGeminiClient
+from event_loop import BackgroundEventLoop
+from question_jobs import QuestionJobRunner, JOB_PENDING, JOB_READY, JOB_FAILED, JOB_CLAIMED
+from question_pool import pool_categories, claim_pooled_question, pool_depths, refill_pool, run_pool_worker
 from datetime import datetime
-from sqlalchemy import desc, asc, func, case, literal_column
+from sqlalchemy import literal_column
 
 # --- App Configuration ---
 load_dotenv()
@@ -28,7 +53,7 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
 
 @app.context_processor
 def utility_processor():
-    return dict(get_setting=get_setting)
+    return dict(get_setting=get_setting, settings=get_settings())
 
 @app.context_processor
 def inject_current_year():
@@ -47,12 +72,14 @@ login_manager.login_message_category = 'info'
 login_manager.session_protection = "strong"
 
 # --- Admin Setup (Initialize Admin ONCE and add views) ---
-from admin_views import AppSettingAdminView, ResponseAdminView, UserAdminView, UserFeedbackAdminView
+from admin_views import AppSettingAdminView, ResponseAdminView, UserAdminView, UserFeedbackAdminView, CategoryStandardizationAdminView, ServiceMetricsView
 admin = Admin(app, name='Trivia Admin', template_mode='bootstrap3')
-admin.add_view(AppSettingAdminView(AppSetting, db.session))
+admin.add_view(AppSettingAdminView(AppSetting, db.session, on_change=lambda: settings_cache.invalidate()))
 admin.add_view(ResponseAdminView(Response, db.session))
 admin.add_view(UserAdminView(User, db.session)) 
 admin.add_view(UserFeedbackAdminView(UserFeedback, db.session))
+admin.add_view(CategoryStandardizationAdminView(CategoryStandardization, db.session, name='Custom Categories'))
+admin.add_view(ServiceMetricsView(lambda: collect_service_metrics(), name='Service Metrics', endpoint='service_metrics'))
 
 # Initialize Flask-Login
 login_manager = LoginManager()
@@ -63,26 +90,72 @@ login_manager.session_protection = "strong" # Or "basic" or None
 
 
 # --- API Setups ---
+WIKI_PAGE_CACHE_MEMORY_SIZE = 2048 # Per-process LRU entries in front of the wiki_page_cache table
+
 wiki_user_agent_contact = os.getenv('WIKI_USER_AGENT_CONTACT', 'your_email@example.com')
 WIKI_USER_AGENT = f'WikipediaTriviaGame/1.0 (https://github.com/fpidot/calibration-game; {wiki_user_agent_contact})'
-wiki_wiki = wikipediaapi.Wikipedia(user_agent=WIKI_USER_AGENT, language='en')
+WIKI_API_URL = os.getenv('WIKI_API_URL', "https://en.wikipedia.org/w/api.php")
+WIKI_HTTP_POOL_SIZE = int(os.getenv('WIKI_HTTP_POOL_SIZE', '10')) # Keep >= gunicorn threads per worker so requests never queue for a connection
+
+# External backends: 'live' (default), 'record' (live + save responses to BACKEND_FIXTURE_DIR) or 'replay'
+# (answer from saved fixtures, no network; REPLAY_* env vars add latency and errors). See backends.py.
+WIKI_BACKEND = os.getenv('WIKI_BACKEND', BACKEND_LIVE)
+GEMINI_BACKEND = os.getenv('GEMINI_BACKEND', BACKEND_LIVE)
+REPLAY_SEED = int(os.getenv('REPLAY_SEED')) if os.getenv('REPLAY_SEED') else None
+fixture_store = FixtureStore(os.getenv('BACKEND_FIXTURE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')))
+wiki_adapter = None
+if WIKI_BACKEND == BACKEND_RECORD: wiki_adapter = RecordingWikipediaAdapter(fixture_store, pool_connections=1, pool_maxsize=WIKI_HTTP_POOL_SIZE, max_retries=0)
+elif WIKI_BACKEND == BACKEND_REPLAY: wiki_adapter = ReplayWikipediaAdapter(fixture_store, latency=LatencyModel(os.getenv('REPLAY_WIKI_LATENCY', ''), seed=REPLAY_SEED), error_rate=float(os.getenv('REPLAY_WIKI_ERROR_RATE', '0')), seed=REPLAY_SEED)
+if WIKI_BACKEND != BACKEND_LIVE: print(f"Wikipedia backend: {WIKI_BACKEND} (fixtures in {fixture_store.directory}).")
+
+# Optional local article index (flask ingest-abstracts); titles it covers need no MediaWiki call.
+ARTICLE_INDEX_DIR = os.getenv('ARTICLE_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'article_index'))
+article_index = ArticleIndex.open_if_exists(ARTICLE_INDEX_DIR)
+if article_index: print(f"Local article index loaded: {len(article_index)} articles.")
+
+wikipedia_breaker = CircuitBreaker('wikipedia')
+wiki_client = WikipediaClient(user_agent=WIKI_USER_AGENT, api_url=WIKI_API_URL, pool_size=WIKI_HTTP_POOL_SIZE, breaker=wikipedia_breaker, adapter=wiki_adapter)
+# Local BM25 theme search over every summary seen; fed by the page cache, backfilled by flask build-search-index.
+SEARCH_INDEX_PATH = os.getenv('SEARCH_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'search_index.sqlite3'))
+search_index = LocalSearchIndex.open(SEARCH_INDEX_PATH)
+wiki_page_cache = WikiPageCache(memory_maxsize=WIKI_PAGE_CACHE_MEMORY_SIZE, on_store=search_index.add_record if search_index is not None else None)
+candidate_list_cache = CandidateListCache()
+leaderboard_cache = LeaderboardCache(app) # Leaderboard query results; stale-while-revalidate, single-flight recomputes
+leaderboard_ranks = LeaderboardRankIndex() # Per-user rank/percentile on the lifetime leaderboards, O(log n) lookups
+context_cache = ContextCache() # Extracted Gemini context per (title, revision, token budget)
+category_standardization_cache = CategoryStandardizationCache()
+generation_loop = BackgroundEventLoop()
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+gemini_breaker = CircuitBreaker('gemini')
 gemini_model = None 
-if not GEMINI_API_KEY: print("Warning: GEMINI_API_KEY not set. Question generation and category standardization disabled.")
+if GEMINI_BACKEND == BACKEND_REPLAY:
+    gemini_model = HedgedGeminiClient(ReplayGeminiModel(fixture_store, latency=LatencyModel(os.getenv('REPLAY_GEMINI_LATENCY', ''), seed=REPLAY_SEED), error_rate=float(os.getenv('REPLAY_GEMINI_ERROR_RATE', '0')), seed=REPLAY_SEED))
+    print(f"Gemini backend: replay (fixtures in {fixture_store.directory}).")
+elif not GEMINI_API_KEY: print("Warning: GEMINI_API_KEY not set. Question generation and category standardization disabled.")
 else:
     try: 
         genai.configure(api_key=GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel('gemini-1.5-flash') 
-        print("Gemini API configured.")
+        live_model = genai.GenerativeModel('gemini-1.5-flash')
+        gemini_model = HedgedGeminiClient(RecordingGeminiModel(live_model, fixture_store) if GEMINI_BACKEND == BACKEND_RECORD else live_model) 
+        print("Gemini API configured." + (" Recording responses." if GEMINI_BACKEND == BACKEND_RECORD else ""))
     except Exception as e: 
         print(f"Error configuring Gemini API: {e}.")
         gemini_model = None
 
+STRUCTURED_GENERATION_CONFIG = genai.GenerationConfig(response_mime_type="application/json", response_schema=QUESTION_BATCH_SCHEMA)
+
 # --- Constants ---
-PAGE_FETCH_ATTEMPTS = 5 
-WIKI_SEARCH_LIMIT_PER_THEME = 10 
+MAX_VALIDATION_BATCHES = 2 # Multi-title API calls per validation pass; each covers MEDIAWIKI_BATCH_SIZE candidates
+WIKI_SEARCH_LIMIT_PER_THEME = 40 # One memoized theme search serves a whole game
+LOCAL_THEME_SEARCH_MIN_RESULTS = 10 # Fewer local matches than this -> fall back to Wikipedia's search API
 MAX_GENERATION_ATTEMPTS = 3
+QUESTION_JOB_WORKERS = int(os.getenv('QUESTION_JOB_WORKERS', '4')) # Background generation threads per process
+QUESTION_JOB_POLL_INTERVAL_MS = 500
+QUESTION_JOB_DEADLINE_SECONDS = 45 # Background jobs aren't holding a request, so they get a longer budget (job timeout is 60s)
+CONCURRENT_VALIDATION_CHUNK_SIZE = 10 # Candidates per concurrent validation request in the async pipeline
+GENERATION_DEADLINE_MESSAGE = "Question generation took too long. Please try again."
+GENERATION_UNAVAILABLE_MESSAGE = "Question generation is temporarily unavailable. Please try again shortly."
 NICKNAME_MAX_LENGTH = 30
 NICKNAME_MIN_LENGTH = 3
 NICKNAME_REGEX = re.compile(r"^[a-zA-Z0-9_]+$") 
@@ -145,41 +218,95 @@ def send_reset_email(user_for_reset):
     # except Exception as e:
     #     print(f"Error sending password reset email: {e}") # Log error
 
+def collect_service_metrics():
+    """Sections shown on the admin Service Metrics page."""
+    return {
+        'Settings snapshot (this worker process)': settings_cache.stats(),
+        'Gemini response parsing (per path)': parse_telemetry.snapshot(),
+        'Wikipedia page cache': wiki_page_cache.stats(),
+        'Search/category candidate cache': candidate_list_cache.stats(),
+        'Leaderboard result cache': leaderboard_cache.stats(),
+        'Leaderboard rank index (this worker process)': leaderboard_ranks.stats(),
+        'Custom category standardization cache': category_standardization_cache.stats(),
+        'Gemini hedged requests': gemini_model.stats() if gemini_model else {'status': 'Gemini not configured'},
+        'Local article index': article_index.stats() if article_index else {'status': f'No index at {ARTICLE_INDEX_DIR}'},
+        'Gemini context extraction': context_cache.stats(),
+        'Local search index (FTS5)': search_index.stats() if search_index is not None else {'status': 'FTS5 unavailable'},
+        'Circuit breakers (this worker process)': {breaker.name: breaker.stats() for breaker in (gemini_breaker, wikipedia_breaker)}
+    }
+
+# Settings are read from a per-process snapshot; a version bump (admin edits, seeding) makes every worker reload it.
+settings_cache = SettingsCache()
+
+def get_settings():
+    """Typed settings (see settings_schema.py), e.g. get_settings().game_length. No DB round trip after the request's first read."""
+    return settings_cache.current()
+
 def get_setting(key, default_value):
-    setting = AppSetting.query.filter_by(setting_key=key).first()
-    if setting and setting.setting_value is not None:
-        try:
-            value_type = type(default_value)
-            if value_type is bool:
-                val = setting.setting_value.lower().strip()
-                if val in ('true', '1'): return True
-                elif val in ('false', '0'): return False
-                return default_value
-            if key in ['user_selectable_categories', 'search_keywords', 'target_categories'] and value_type is str:
-                 return setting.setting_value 
-            return value_type(setting.setting_value)
-        except (ValueError, TypeError): return default_value
-    return default_value
+    """By-name lookup for templates and settings outside the schema; schema settings ignore `default_value`."""
+    return settings_cache.get(key, default_value)
 
-def get_standardized_category_via_gemini(custom_text: str) -> str:
+def seed_settings():
+    """Adds missing schema settings (one bulk upsert) and bumps the settings version if anything was written."""
+    try:
+        written = seed_default_settings()
+        if written: bump_settings_version(db.session); print(f"Seeded/updated {written} default setting(s).")
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback(); print(f"Default settings not seeded (is the database migrated?): {getattr(e, 'orig', e)}")
+
+with app.app_context(): seed_settings() # Every worker at startup (gunicorn included); concurrent runs are harmless
+
+def lifetime_min_questions(settings):
+    """Minimum answered questions to be ranked on the lifetime accuracy/Brier leaderboards."""
+    return settings.leaderboard_min_games_for_lifetime_ranking * settings.game_length
+
+def warm_leaderboard_ranks():
+    try: leaderboard_ranks.ensure_fresh(lifetime_min_questions(get_settings()))
+    except Exception as e:
+        db.session.rollback(); print(f"Leaderboard rank index not built (is the database migrated?): {getattr(e, 'orig', e)}")
+
+with app.app_context(): warm_leaderboard_ranks()
+
+def call_gemini(prompt, **kwargs):
+    """Every Gemini call goes through the breaker: raises CircuitOpenError without calling while it is open."""
+    return gemini_breaker.call(gemini_model.generate_content, prompt, **kwargs)
+
+def configure_circuit_breakers():
+    settings = get_settings()
+    for breaker in (gemini_breaker, wikipedia_breaker):
+        breaker.configure(failure_threshold=settings.circuit_breaker_failure_threshold, recovery_seconds=settings.circuit_breaker_recovery_seconds)
+
+def live_generation_retry_after():
+    """0 when Gemini and Wikipedia are both usable, otherwise seconds until the open breaker(s) allow a probe."""
+    configure_circuit_breakers()
+    open_breakers = [b for b in (gemini_breaker, wikipedia_breaker) if b.is_open()]
+    return max(b.retry_after_seconds() for b in open_breakers) if open_breakers else 0
+
+def request_category_standardization_from_gemini(custom_text: str):
+    """One Gemini round trip. Returns the standardized term, or None when Gemini is unavailable/failed (not cached)."""
     if not gemini_model:
         print("Gemini model not available for category standardization. Returning original text.")
-        return custom_text 
+        return None
     prompt = f"""Given the user's topic query: '{custom_text}', suggest a concise and effective search term or a thematic category name that best represents this query for finding relevant Wikipedia articles. The output should be suitable for a Wikipedia search. Return *only* the suggested term/category name, without any preamble or explanation. For example, if the input is 'dinosaurs from cretaceous', a good output might be 'Cretaceous period dinosaurs' or 'Dinosaurs of the Cretaceous period'. If the input is already a good search term like 'Quantum Physics', return it as is or make minimal refinements if necessary.
 User topic query: '{custom_text}'
 Suggested search term/thematic category name:"""
     try:
         print(f"Standardizing custom category with Gemini. Input: '{custom_text}'")
-        response = gemini_model.generate_content(prompt)
+        response = call_gemini(prompt)
         standardized_term = response.text.strip()
         if not standardized_term:
             print("Gemini returned empty for category standardization. Falling back to original.")
-            return custom_text
+            return None
         print(f"Gemini standardized '{custom_text}' to '{standardized_term}'")
         return standardized_term
     except Exception as e:
         print(f"Error during Gemini category standardization: {e}. Falling back to original text.")
-        return custom_text
+        return None
+
+def get_standardized_category_via_gemini(custom_text: str) -> str:
+    """Cached standardization ('dinosaurs', 'Dinosaurs ' and 'DINOSAURS' share one entry); falls back to the original text."""
+    return category_standardization_cache.get_or_standardize(custom_text, request_category_standardization_from_gemini) or custom_text
 
 def generate_suggested_nickname():
     max_attempts = 20 
@@ -265,35 +392,68 @@ def nickname_setup_required(f):
         return f(user, *args, **kwargs) # Pass the manually loaded User object
     return decorated_function
 
-def get_wikipedia_page(
+def search_titles(query: str, limit: int, theme_search: bool = False):
+    PARAMS = {"action": "query", "list": "search", "srsearch": query, "srnamespace": "0", "srlimit": str(limit), "srwhat": "text"}
+    if theme_search: PARAMS.update({"srqiprofile": "classic_noboostlinks", "srsort": "relevance"})
+    return [result['title'] for result in wiki_client.query(PARAMS).get("query", {}).get("search", [])]
+
+def category_member_titles(category_name: str, limit: int):
+    PARAMS = {"action": "query", "list": "categorymembers", "cmtitle": category_name, "cmlimit": str(limit), "cmtype": "page", "cmprop": "title"}
+    return [m['title'] for m in wiki_client.query(PARAMS).get("query", {}).get("categorymembers", [])]
+
+def get_wikipedia_page(admin_page_selection_strategy, admin_search_keywords, admin_target_categories, admin_api_result_limit, user_category_theme=None, exclude_titles=None):
+    pages = get_wikipedia_pages(admin_page_selection_strategy, admin_search_keywords, admin_target_categories, admin_api_result_limit, user_category_theme=user_category_theme, exclude_titles=exclude_titles)
+    return pages[0] if pages else None
+
+def get_wikipedia_pages(
     admin_page_selection_strategy: str, 
     admin_search_keywords: str, 
     admin_target_categories: str, 
     admin_api_result_limit: int,
-    user_category_theme: str = None 
+    user_category_theme: str = None,
+    exclude_titles=None,
+    max_pages: int = 1
     ):
-    page_candidates = []; min_summary_words_check = get_setting('min_summary_words', 50); headers = {'User-Agent': WIKI_USER_AGENT}
+    """
+    Picks candidate titles with the theme search or the admin strategy, then returns up to `max_pages` valid pages.
+    """
+    page_candidates = get_page_candidates(admin_page_selection_strategy, admin_search_keywords, admin_target_categories, admin_api_result_limit, user_category_theme=user_category_theme, exclude_titles=exclude_titles)
+    if not page_candidates: return []
+    return validate_page_candidates(page_candidates, get_settings().min_summary_words, max_pages=max_pages)
+
+def get_page_candidates(admin_page_selection_strategy, admin_search_keywords, admin_target_categories, admin_api_result_limit, user_category_theme=None, exclude_titles=None):
+    """
+    Shuffled candidate titles from the theme search or the admin strategy (not validated yet).
+    Search and category listings are memoized per (strategy, query, limit); `exclude_titles` (pages already
+    used in the player's current game) are dealt out without replacement until the listing is exhausted.
+    """
+    page_candidates = []
+    candidate_list_cache.configure(ttl_seconds=get_settings().candidate_cache_ttl_minutes * 60)
     
     if user_category_theme:
         print(f"Attempting to find page for user category theme: '{user_category_theme}'")
-        try:
-            S = requests.Session(); URL = "https://en.wikipedia.org/w/api.php"; PARAMS = {"action": "query", "format": "json", "list": "search", "srsearch": user_category_theme, "srnamespace": "0", "srlimit": str(WIKI_SEARCH_LIMIT_PER_THEME), "srwhat": "text", "srqiprofile": "classic_noboostlinks", "srsort": "relevance"}
-            R = S.get(url=URL, params=PARAMS, headers=headers); R.raise_for_status(); data = R.json(); search_results = data.get("query", {}).get("search", [])
-            if search_results: page_candidates = [result['title'] for result in search_results]; print(f"Found {len(page_candidates)} candidates for theme '{user_category_theme}': {page_candidates[:5]}")
-            else: print(f"No Wikipedia search results for user theme '{user_category_theme}'.")
-        except requests.exceptions.RequestException as e: print(f"Network error searching for user theme '{user_category_theme}': {e}")
-        except Exception as e: print(f"Unexpected error searching for user theme '{user_category_theme}': {e}")
+        if search_index is not None:
+            try: page_candidates = search_index.search(user_category_theme, WIKI_SEARCH_LIMIT_PER_THEME)
+            except Exception as e: print(f"Local theme search failed for '{user_category_theme}': {e}")
+            if len(page_candidates) >= LOCAL_THEME_SEARCH_MIN_RESULTS: search_index.record_local_hit(); print(f"Local index: {len(page_candidates)} candidates for theme '{user_category_theme}'.")
+            else: page_candidates = []
+        if not page_candidates:
+            try:
+                page_candidates = candidate_list_cache.get_or_fetch('theme_search', user_category_theme, WIKI_SEARCH_LIMIT_PER_THEME, lambda: search_titles(user_category_theme, WIKI_SEARCH_LIMIT_PER_THEME, theme_search=True))
+                if page_candidates: print(f"Found {len(page_candidates)} candidates for theme '{user_category_theme}': {page_candidates[:5]}")
+                else: print(f"No Wikipedia search results for user theme '{user_category_theme}'.")
+            except (requests.exceptions.RequestException, WikipediaAPIError) as e: print(f"Network error searching for user theme '{user_category_theme}': {e}")
+            except Exception as e: print(f"Unexpected error searching for user theme '{user_category_theme}': {e}")
     else: 
         print(f"Using admin strategy: '{admin_page_selection_strategy}'"); current_strategy = admin_page_selection_strategy
         if current_strategy == 'search':
             keywords = [k.strip() for k in admin_search_keywords.split(',') if k.strip()];
             if keywords:
                 keyword = random.choice(keywords); print(f"Admin search: '{keyword}'")
-                try: 
-                    S = requests.Session(); URL = "https://en.wikipedia.org/w/api.php"; PARAMS = {"action": "query","format": "json","list": "search","srsearch": keyword,"srnamespace": "0","srlimit": str(admin_api_result_limit),"srwhat": "text"}
-                    R = S.get(url=URL, params=PARAMS, headers=headers); R.raise_for_status(); data = R.json(); search_results = data.get("query", {}).get("search", [])
-                    if search_results: page_candidates = [r['title'] for r in search_results]
-                except Exception as e: print(f"Error in admin search for '{keyword}': {e}")
+                if article_index: page_candidates = article_index.category_members(keyword, admin_api_result_limit) or article_index.prefix_titles(keyword, admin_api_result_limit)
+                if not page_candidates:
+                    try: page_candidates = candidate_list_cache.get_or_fetch('search', keyword, admin_api_result_limit, lambda: search_titles(keyword, admin_api_result_limit))
+                    except Exception as e: print(f"Error in admin search for '{keyword}': {e}")
             else: current_strategy = 'random' 
         
         # Use 'if' instead of 'elif' to allow fallback from empty search keywords to category, then to random
@@ -301,75 +461,120 @@ def get_wikipedia_page(
             categories = [c.strip() for c in admin_target_categories.split(',') if c.strip()]
             if categories:
                 category_name_base = random.choice(categories); category_name = category_name_base if category_name_base.lower().startswith("category:") else f"Category:{category_name_base}"; print(f"Admin category: '{category_name}'")
-                try: 
-                    S = requests.Session(); URL = "https://en.wikipedia.org/w/api.php"; PARAMS = {"action": "query","format": "json","list": "categorymembers","cmtitle": category_name,"cmlimit": str(admin_api_result_limit),"cmtype": "page","cmprop": "title"}
-                    R = S.get(url=URL, params=PARAMS, headers=headers); R.raise_for_status(); data = R.json(); members = data.get("query", {}).get("categorymembers", [])
-                    if members: page_candidates = [m['title'] for m in members]
-                except Exception as e: print(f"Error in admin category '{category_name}': {e}")
+                if article_index: page_candidates = article_index.category_members(category_name, admin_api_result_limit)
+                if not page_candidates:
+                    try: page_candidates = candidate_list_cache.get_or_fetch('category', category_name, admin_api_result_limit, lambda: category_member_titles(category_name, admin_api_result_limit))
+                    except Exception as e: print(f"Error in admin category '{category_name}': {e}")
             else: current_strategy = 'random'
         
+        # Random listings are never memoized: a fresh draw is the point of the strategy.
         if current_strategy == 'random' or not page_candidates: 
             print("Using admin random strategy or fallback.");
-            try: 
-                S = requests.Session(); URL = "https://en.wikipedia.org/w/api.php"; PARAMS = {"action": "query","format": "json","list": "random","rnnamespace": "0","rnlimit": str(admin_api_result_limit)}
-                R = S.get(url=URL, params=PARAMS, headers=headers); R.raise_for_status(); data = R.json(); random_pages = data.get("query", {}).get("random", [])
-                if random_pages: page_candidates.extend([p["title"] for p in random_pages if p["title"] not in page_candidates]) 
-            except Exception as e: print(f"Error in admin random: {e}")
+            if article_index: page_candidates.extend(t for t in article_index.random_titles(admin_api_result_limit) if t not in page_candidates)
+            if not page_candidates:
+                try: 
+                    PARAMS = {"action": "query", "list": "random","rnnamespace": "0","rnlimit": str(admin_api_result_limit)}
+                    data = wiki_client.query(PARAMS); random_pages = data.get("query", {}).get("random", [])
+                    if random_pages: page_candidates.extend([p["title"] for p in random_pages if p["title"] not in page_candidates]) 
+                except Exception as e: print(f"Error in admin random: {e}")
+
+    if exclude_titles and page_candidates:
+        unused_candidates = [t for t in page_candidates if t not in exclude_titles]
+        if unused_candidates: page_candidates = unused_candidates
+        else: print(f"All {len(page_candidates)} candidates already used this game. Allowing repeats.")
 
     if not page_candidates:
         print("No page candidates found from any strategy.");
         if not user_category_theme: 
             print("Final fallback to single random page.");
             try: 
-                S = requests.Session(); URL = "https://en.wikipedia.org/w/api.php"; PARAMS = {"action": "query","format": "json","list": "random","rnnamespace": "0","rnlimit": "1"}
-                R = S.get(url=URL, params=PARAMS, headers=headers); R.raise_for_status(); data = R.json(); random_page_data = data.get("query", {}).get("random", [])
+                PARAMS = {"action": "query", "list": "random","rnnamespace": "0","rnlimit": "1"}
+                data = wiki_client.query(PARAMS); random_page_data = data.get("query", {}).get("random", [])
                 if random_page_data: page_candidates = [random_page_data[0]["title"]]
             except Exception as e: print(f"Error in final fallback random: {e}")
-        if not page_candidates: return None
+        if not page_candidates: return []
+
+    random.shuffle(page_candidates)
+    return page_candidates
+
+def fetch_wiki_page_records_batch(titles):
+    """One multi-title MediaWiki request (<= MEDIAWIKI_BATCH_SIZE titles) -> {title: WikiPageRecord}."""
+    return parse_batch_page_query(wiki_client.query(build_batch_page_query(titles)), titles)
 
-    random.shuffle(page_candidates); attempts = 0
-    for title_to_check in page_candidates:
-        if attempts >= PAGE_FETCH_ATTEMPTS: break; attempts += 1
-        print(f"Validation Attempt {attempts}/{len(page_candidates)} for title: '{title_to_check}'")
+def validate_page_candidates(page_candidates, min_summary_words_check, max_pages=1):
+    """
+    Batch validator: metadata for a whole chunk of candidates comes from the page cache or one
+    multi-title API call; the disambiguation/stub rules are then applied locally. Returns a list of
+    up to `max_pages` valid WikiPageRecords in candidate order (empty if none validate).
+    """
+    settings = get_settings(); wiki_page_cache.configure(ttl_seconds=settings.wiki_page_cache_ttl_hours * 3600, max_db_entries=settings.wiki_page_cache_max_entries)
+    valid_pages = []; checked = 0; page_candidates = page_candidates[:MAX_VALIDATION_BATCHES * MEDIAWIKI_BATCH_SIZE]
+    for chunk_start in range(0, len(page_candidates), MEDIAWIKI_BATCH_SIZE):
+        chunk = page_candidates[chunk_start:chunk_start + MEDIAWIKI_BATCH_SIZE]
+        records = {title: record for title, record in ((t, article_index.lookup(t)) for t in chunk) if record} if article_index else {}
+        remote_titles = [t for t in chunk if t not in records]
         try:
-            page = wiki_wiki.page(title_to_check)
-            if page and page.exists():
-                summary_lower = page.summary.lower();
-                if "may refer to:" in summary_lower or page.title.lower().endswith("(disambiguation)") or "is a disambiguation page" in summary_lower: print(f"'{page.title}' is a disambiguation page. Skipping."); continue
-                if len(page.summary.split()) < max(10, min_summary_words_check // 2) and len(page.sections) <=1 : print(f"'{page.title}' appears to be a stub. Skipping."); continue
-                print(f"Validated page: {page.title}"); return page
-            else: print(f"Page '{title_to_check}' not found or does not exist. Skipping.")
-        except Exception as e: print(f"Error validating page '{title_to_check}': {e}. Skipping."); continue
-    print(f"Failed to find and validate a suitable page after {attempts} attempts."); return None
+            if remote_titles: records.update(wiki_page_cache.get_or_fetch_many(remote_titles, fetch_wiki_page_records_batch))
+        except Exception as e:
+            print(f"Error batch-validating {len(remote_titles)} candidates: {e}")
+            if not records: continue
+        print(f"Batch validation: {len(records)}/{len(chunk)} candidates resolved.")
+        for title_to_check in chunk:
+            page = records.get(title_to_check); checked += 1
+            if page is None or not page.exists: print(f"Page '{title_to_check}' not found or does not exist. Skipping."); continue
+            if page.is_disambiguation: print(f"'{page.title}' is a disambiguation page. Skipping."); continue
+            if page.word_count < max(10, min_summary_words_check // 2) and page.is_stub: print(f"'{page.title}' appears to be a stub. Skipping."); continue
+            print(f"Validated page: {page.title}"); valid_pages.append(page)
+            if len(valid_pages) >= max_pages: return valid_pages
+    if not valid_pages: print(f"Failed to find and validate a suitable page among {checked} candidates.")
+    return valid_pages
+
+def request_questions_from_gemini(article_texts, questions_per_article, game_theme=None):
+    """
+    One logical generation request: structured JSON output first (when gemini_structured_output is on), the
+    legacy line format as the fallback. Every parsed response is counted per path in parse_telemetry.
+    Returns a list of question dicts whose article_number (1-based) is within range.
+    """
+    questions = []; single_question = len(article_texts) == 1 and questions_per_article == 1
+    # Only live single-question calls are hedged; pool batches aren't latency sensitive and are expensive to duplicate.
+    settings = get_settings()
+    gemini_model.configure(enabled=settings.gemini_hedging_enabled, percentile=settings.gemini_hedge_percentile, budget_ratio=settings.gemini_hedge_budget_percent / 100.0)
+    if settings.gemini_structured_output:
+        try:
+            response = call_gemini(build_json_prompt(article_texts, questions_per_article, game_theme), hedge=single_question, generation_config=STRUCTURED_GENERATION_CONFIG)
+            questions, errors = parse_questions_json(response.text); parse_telemetry.record('json', len(questions), len(errors))
+            if not questions: print(f"Structured output unusable ({errors[0]}). Falling back to text format.")
+        except Exception as e: print(f"Structured Gemini call failed ({e}). Falling back to text format.")
+    if not questions:
+        prompt = build_single_question_prompt(article_texts[0], game_theme) if single_question else build_batch_prompt(article_texts, questions_per_article, game_theme)
+        response = call_gemini(prompt, hedge=single_question); questions, errors = parse_question_blocks(response.text.strip()); parse_telemetry.record('text', len(questions), len(errors))
+        if errors: print(f"Parsing Error(s) in text format: {errors[0]}" + (f" (+{len(errors) - 1} more)" if len(errors) > 1 else ""))
+    if len(article_texts) == 1:
+        for q in questions: q['article_number'] = q['article_number'] or 1
+    return [q for q in questions if q['article_number'] and 1 <= q['article_number'] <= len(article_texts)]
 
 def generate_question_from_text(text, context_length, game_theme=None):
     if not text: print("Error: Empty text for Q gen."); return None,None,None
     if not gemini_model: print("Error: Gemini model unavailable for Q gen."); return None,None,None
-    theme_context = f"The trivia question should ideally be related to the overall game theme of '{game_theme}'. " if game_theme else ""
-    text_to_send = text[:context_length]
-    prompt = f"""{theme_context}Create a multiple-choice trivia question based *only* on the following text. The question should be specific, but answerable by a reasonably well educated adult with at least a little knowledge of the topic. The question itself should never refer to "the text" or "the article" or "the provided document" (e.g., avoid starting with "According to the text..."). Provide the question, 4 distinct answer choices (A, B, C, D) where only one is correct according to the text, and indicate the correct answer letter. Format the output *exactly* like this, with each part on a new line:\n\nQuestion: [Your question here]\nA) [Choice A]\nB) [Choice B]\nC) [Choice C]\nD) [Choice D]\nCorrect Answer: [Correct Letter (A, B, C, or D)]\n\nText:\n{text_to_send}"""
     try:
-        response = gemini_model.generate_content(prompt); content = response.text.strip(); lines = [line.strip() for line in content.split('\n') if line.strip()]; question = None; options = {}; correct_answer_letter = None
-        if not lines or not lines[0].startswith("Question:"): print(f"Parsing Error: No 'Question:'. Line: '{lines[0] if lines else 'N/A'}'"); return None,None,None
-        question = lines[0][len("Question:"):].strip(); option_prefixes = ['A)', 'B)', 'C)', 'D)']; temp_options = {}; option_lines_found = 0; current_line_index = 1
-        while option_lines_found < 4 and current_line_index < len(lines):
-             line = lines[current_line_index]; expected_prefix = option_prefixes[option_lines_found]
-             if line.startswith(expected_prefix): temp_options[expected_prefix[0]] = line[len(expected_prefix):].strip(); option_lines_found += 1
-             current_line_index += 1
-        if option_lines_found == 4: options = temp_options
-        else: print(f"Parsing Error: Found {option_lines_found}/4 options. Lines: {lines}"); return None,None,None
-        found_correct_line = False
-        while current_line_index < len(lines):
-            line = lines[current_line_index]
-            if line.startswith("Correct Answer:"):
-                correct_answer_letter = line[len("Correct Answer:"):].strip().upper()
-                if correct_answer_letter not in options: print(f"Parsing Error: Correct letter '{correct_answer_letter}' not in options."); correct_answer_letter = None
-                found_correct_line = True; break
-            current_line_index += 1
-        if not found_correct_line or not correct_answer_letter: print(f"Parsing Error: No 'Correct Answer:' or invalid. Lines: {lines}"); return None,None,None
-        print(f"Successfully parsed Gemini response for Q&A. Theme context used: '{game_theme if game_theme else 'None'}'"); return question, options, correct_answer_letter
+        questions = request_questions_from_gemini([text[:context_length]], 1, game_theme)
+        if not questions: return None,None,None
+        print(f"Successfully parsed Gemini response for Q&A. Theme context used: '{game_theme if game_theme else 'None'}'"); return questions[0]['question'], questions[0]['options'], questions[0]['correct_answer_letter']
     except Exception as e: print(f"Error in Gemini Q gen (theme: {game_theme}): {e}"); return None,None,None
 
+def generate_questions_batch(article_texts, questions_per_article, game_theme=None):
+    """
+    Batch mode: one Gemini call for `questions_per_article` questions about each text in `article_texts`.
+    Blocks are parsed and validated independently; malformed ones are dropped and the rest kept.
+    Returns a list of dicts (question/options/correct_answer_letter/article_number, 1-based).
+    """
+    if not article_texts: return []
+    if not gemini_model: print("Error: Gemini model unavailable for batch Q gen."); return []
+    try: questions = request_questions_from_gemini(article_texts, questions_per_article, game_theme)
+    except Exception as e: print(f"Error in Gemini batch Q gen (theme: {game_theme}): {e}"); return []
+    print(f"Batch Q gen: {len(questions)} valid question(s) for {len(article_texts)} article(s).")
+    return questions
+
 def calculate_brier_score(confidence, is_correct):
     probability = confidence / 100.0; outcome = 1.0 if is_correct else 0.0
     return (probability - outcome)**2
@@ -386,7 +591,8 @@ def initialize_session_stats(force_reset=False): # Added force_reset parameter
         'questions_this_game': 0,       # Questions in current game
         'games_played_session': 0,      # Number of "games" (as defined by game_length) completed in session
         'completed_game_scores_session': [], # Scores of completed games in this session
-        'current_game_category': None 
+        'current_game_category': None,
+        'used_page_titles': []          # Wikipedia pages already served in the current game
     }
     if force_reset or 'stats' not in session: # If forcing reset or stats don't exist
         session['stats'] = default_stats.copy()
@@ -434,12 +640,7 @@ def index():
 
     if current_user.is_authenticated:
         # --- Fetch Overall Lifetime Stats for logged-in user ---
-        overall_stats_query = db.session.query(
-            func.count(Response.id).label('total_questions_lifetime'),
-            func.sum(case((Response.is_correct == True, 1), else_=0)).label('total_correct_lifetime'),
-            func.avg(Response.brier_score).label('average_brier_lifetime'),
-            func.sum(Response.points_awarded).label('total_points_lifetime')
-        ).filter(Response.user_id == current_user.id).first()
+        overall_stats_query = lifetime_totals_query(current_user.id).first()
         
         if overall_stats_query and overall_stats_query.total_questions_lifetime is not None: # Check if any responses exist
             accuracy = (overall_stats_query.total_correct_lifetime / overall_stats_query.total_questions_lifetime * 100) \
@@ -460,16 +661,7 @@ def index():
             }
 
         # --- Fetch Category-Specific Lifetime Stats (existing logic) ---
-        user_category_data = db.session.query(
-            Response.game_category.label('display_category_name'),
-            func.count(Response.id).label('total_questions'),
-            func.sum(case((Response.is_correct == True, 1), else_=0)).label('total_correct'),
-            func.avg(Response.brier_score).label('average_brier'),
-            func.avg(Response.points_awarded).label('average_points')
-        ).filter(Response.user_id == current_user.id)\
-         .group_by(Response.game_category)\
-         .order_by(Response.game_category)\
-         .all()
+        user_category_data = category_stats_query(current_user.id).all()
 
         for cat_data in user_category_data:
             cat_accuracy = (cat_data.total_correct / cat_data.total_questions * 100) if cat_data.total_questions > 0 else 0
@@ -485,14 +677,7 @@ def index():
         # --- Calculate Best/Worst Categories ONLY if category_stats were populated ---
         if category_stats:
             # Fetch MIN_QUESTIONS_FOR_CATEGORY_RANKING setting
-            # It's better to fetch settings once if used multiple times or ensure get_setting is efficient
-            min_questions_setting_val_str = AppSetting.query.filter_by(setting_key='min_questions_for_cat_rank').first()
-            MIN_QUESTIONS_FOR_CATEGORY_RANKING = 5 # Default
-            if min_questions_setting_val_str and min_questions_setting_val_str.setting_value:
-                try:
-                    MIN_QUESTIONS_FOR_CATEGORY_RANKING = int(min_questions_setting_val_str.setting_value)
-                except ValueError:
-                    print("Warning: Could not parse 'min_questions_for_cat_rank' from AppSetting, using fallback 5.")
+            MIN_QUESTIONS_FOR_CATEGORY_RANKING = get_settings().min_questions_for_cat_rank
             
             rankable_brier_categories = [
                 s for s in category_stats 
@@ -510,10 +695,7 @@ def index():
                 best_score_category = max(rankable_score_categories, key=lambda x: x['average_points'])
                 worst_score_category = min(rankable_score_categories, key=lambda x: x['average_points'])
 
-        best_score_game_summary = GameSummary.query\
-            .filter_by(user_id=current_user.id)\
-            .order_by(GameSummary.score.desc())\
-            .first()
+        best_score_game_summary = best_game_score_query(current_user.id).first()
         if best_score_game_summary:
             personal_best_game_score_data = { # Use the renamed variable
                 'score': best_score_game_summary.score,
@@ -522,10 +704,7 @@ def index():
             }
 
         # Lowest Single Game Average Brier
-        best_brier_game_summary = GameSummary.query\
-            .filter(GameSummary.user_id == current_user.id, GameSummary.average_brier_score.isnot(None))\
-            .order_by(GameSummary.average_brier_score.asc())\
-            .first()
+        best_brier_game_summary = best_game_brier_query(current_user.id).first()
         if best_brier_game_summary:
             personal_best_game_brier_data = { # Use the renamed variable
                 'brier': best_brier_game_summary.average_brier_score,
@@ -557,7 +736,7 @@ def index():
         'personal_best_game_brier': personal_best_game_brier_data
     }
     
-    template_vars['default_chart_bins'] = int(get_setting('calibration_chart_bins', 10))
+    template_vars['default_chart_bins'] = get_settings().calibration_chart_bins
 
     if current_user.is_authenticated:
         template_vars['user_info'] = {
@@ -571,7 +750,7 @@ def index():
         # We can pass current_session_stats if we want to show current game progress.
         template_vars['current_game_progress_stats'] = {
             'questions_this_game': current_session_stats.get('questions_this_game', 0),
-            'game_length_setting': int(get_setting('game_length', 20)),
+            'game_length_setting': get_settings().game_length,
             'current_game_score': current_session_stats.get('cumulative_score', 0.0)
         }
 
@@ -636,6 +815,19 @@ def reset_token(token):
         
     return render_template('reset_token.html', title='Reset Your Password', form=form, token=token)
 
+def configure_leaderboard_cache(settings):
+    leaderboard_cache.configure(ttl_seconds=settings.leaderboard_cache_ttl_seconds, stale_seconds=settings.leaderboard_cache_stale_seconds)
+
+def query_category_leaderboards(db_filter_value, top_n, min_games_in_category_for_ranking, min_questions_in_category_for_ranking):
+    """The three per-category leaderboards (plain query rows, safe to cache)."""
+    # --- Metrics for the selected category (first pages of CATEGORY_BOARDS; the JSON API serves the next ones) ---
+    # Brier/accuracy only rank users with at least min_games_in_category_for_ranking games (or the equivalent questions) in THIS category.
+    thresholds = dict(min_questions=min_questions_in_category_for_ranking, min_games=min_games_in_category_for_ranking)
+    cat_top_game_scores, _ = leaderboard_page('game_score', category=db_filter_value, limit=top_n, **thresholds)
+    cat_best_game_briers, _ = leaderboard_page('game_brier', category=db_filter_value, limit=top_n, **thresholds)
+    cat_top_accuracy, _ = leaderboard_page('accuracy', category=db_filter_value, limit=top_n, **thresholds)
+    return dict(cat_top_game_scores=cat_top_game_scores, cat_best_game_briers=cat_best_game_briers, cat_top_accuracy=cat_top_accuracy)
+
 @app.route('/leaderboard/category/<path:category_name>')
 def leaderboard_category(category_name):
     # Handle the "General Knowledge" case if it might be passed as None from certain DB queries
@@ -646,65 +838,17 @@ def leaderboard_category(category_name):
     # db_category_filter_gs = None if category_name == "General Knowledge" else category_name
     # For Response table, we used coalesce, so the category name will be "General Knowledge" string.
 
-    try:
-        top_n = int(get_setting('leaderboard_top_n_users', 25))
-        # Min games a user must have played *in this category* to be ranked for Brier/Accuracy within it
-        min_games_in_category_for_ranking = int(get_setting('leaderboard_min_games_for_category_ranking', 3))
-        game_length_setting = int(get_setting('game_length', 20))
-        min_questions_in_category_for_ranking = min_games_in_category_for_ranking * game_length_setting
-    except ValueError:
-        top_n = 25
-        min_games_in_category_for_ranking = 3
-        min_questions_in_category_for_ranking = 3 * 20
-        # flash("Warning: Could not parse category leaderboard settings, using defaults.", "warning") # Flashing here might be tricky for AJAX
-
-    # --- Metrics for the selected category ---
-
-    # 1. Top Game Scores in this Category (from GameSummary)
-    cat_top_game_scores = db.session.query(
-        User.nickname,
-        GameSummary.score.label('game_score'),
-        GameSummary.completed_at
-    ).join(User, User.id == GameSummary.user_id)\
-     .filter(GameSummary.game_category == db_filter_value)\
-     .order_by(desc('game_score'))\
-     .limit(top_n).all()
-
-    # 2. Best Game Brier in this Category (from GameSummary)
-    #    Users ranked here must have at least 'min_games_in_category_for_ranking' in THIS category.
-    #    This subquery counts games per user in this category.
-    subquery_games_in_cat = db.session.query(
-        GameSummary.user_id,
-        func.count(GameSummary.id).label('num_games_in_cat')
-    ).filter(GameSummary.game_category == db_filter_value)\
-     .group_by(GameSummary.user_id).subquery()
-
-    cat_best_game_briers = db.session.query(
-        User.nickname,
-        func.avg(GameSummary.average_brier_score).label('avg_game_brier_in_cat'), # Avg of their game briers in this cat
-        subquery_games_in_cat.c.num_games_in_cat
-    ).join(User, User.id == GameSummary.user_id)\
-     .join(subquery_games_in_cat, User.id == subquery_games_in_cat.c.user_id)\
-     .filter(GameSummary.game_category == db_filter_value)\
-     .filter(GameSummary.average_brier_score.isnot(None))\
-     .group_by(User.id, User.nickname, subquery_games_in_cat.c.num_games_in_cat)\
-     .having(subquery_games_in_cat.c.num_games_in_cat >= min_games_in_category_for_ranking)\
-     .order_by(asc('avg_game_brier_in_cat'))\
-     .limit(top_n).all()
-
-    # 3. Highest Accuracy in this Category (from Response table)
-    #    Users ranked here must have at least 'min_questions_in_category_for_ranking' in THIS category.
-    cat_top_accuracy = db.session.query(
-        User.nickname,
-        (func.sum(case((Response.is_correct == True, 1), else_=0)) * 100.0 / func.count(Response.id)).label('accuracy_in_cat'),
-        func.count(Response.id).label('questions_in_cat')
-    ).join(Response, User.id == Response.user_id)\
-     .filter(Response.game_category == db_filter_value)\
-     .group_by(User.id, User.nickname)\
-     .having(func.count(Response.id) >= min_questions_in_category_for_ranking)\
-     .order_by(desc('accuracy_in_cat'))\
-     .limit(top_n).all()
-    
+    settings = get_settings()
+    top_n = settings.leaderboard_top_n_users
+    # Min games a user must have played *in this category* to be ranked for Brier/Accuracy within it
+    min_games_in_category_for_ranking = settings.leaderboard_min_games_for_category_ranking
+    min_questions_in_category_for_ranking = min_games_in_category_for_ranking * settings.game_length
+
+    configure_leaderboard_cache(settings)
+    leaderboards = leaderboard_cache.get_or_compute(
+        ('category', db_filter_value, top_n, min_games_in_category_for_ranking, min_questions_in_category_for_ranking),
+        lambda: query_category_leaderboards(db_filter_value, top_n, min_games_in_category_for_ranking, min_questions_in_category_for_ranking))
+
     # The category_name passed in the URL is used for display.
     # If category_name was "General Knowledge", db_category_filter_gs might be None.
     # So, for display, always use the category_name from the URL.
@@ -712,99 +856,31 @@ def leaderboard_category(category_name):
 
     return render_template('_leaderboard_category_content.html', 
                            category_name_display=display_category_name,
-                           cat_top_game_scores=cat_top_game_scores,
-                           cat_best_game_briers=cat_best_game_briers,
-                           cat_top_accuracy=cat_top_accuracy,
+                           **leaderboards,
                            get_setting=get_setting # Pass for template if it needs settings
                           )
 
-@app.route('/leaderboard')
-def leaderboard():
-    try:
-        top_n = int(get_setting('leaderboard_top_n_users', 25))
-        # For lifetime stats from RESPONSES, we'll use a min number of total questions.
-        # Let's approximate min_games * typical_game_length for this.
-        min_games_for_lifetime_response_ranking_setting = int(get_setting('leaderboard_min_games_for_lifetime_ranking', 3))
-        game_length_setting = int(get_setting('game_length', 20))
-        min_total_questions_for_ranking = min_games_for_lifetime_response_ranking_setting * game_length_setting
-        
-        min_games_for_cat_lb_display = int(get_setting('leaderboard_min_games_for_category_leaderboard', 1))
-
-    except ValueError: # Fallback if settings are not proper integers
-        top_n = 25
-        min_total_questions_for_ranking = 3 * 20 
-        min_games_for_cat_lb_display = 1
-        flash("Warning: Could not parse leaderboard settings, using defaults.", "warning")
-
-    # --- 1. Overall Top Lifetime Scores (from Response table) ---
-    top_lifetime_scores = db.session.query(
-        User.nickname,
-        func.sum(Response.points_awarded).label('total_score_val'), # Renamed to avoid conflict if 'total_score' is a column
-        func.count(Response.id).label('total_questions_answered')
-    ).join(Response, User.id == Response.user_id)\
-     .group_by(User.id, User.nickname)\
-     .order_by(desc('total_score_val'))\
-     .limit(top_n).all()
-
-    # --- 2. Overall Top Lifetime Accuracy (from Response table) ---
-    top_lifetime_accuracy = db.session.query(
-        User.nickname,
-        (func.sum(case((Response.is_correct == True, 1), else_=0)) * 100.0 / func.count(Response.id)).label('accuracy_val'),
-        func.count(Response.id).label('total_questions_answered')
-    ).join(Response, User.id == Response.user_id)\
-     .group_by(User.id, User.nickname)\
-     .having(func.count(Response.id) >= min_total_questions_for_ranking)\
-     .order_by(desc('accuracy_val'))\
-     .limit(top_n).all()
-
-    # --- 3. Overall Best Lifetime Calibration (Avg. Brier from Response table) ---
-    top_lifetime_brier = db.session.query(
-        User.nickname,
-        func.avg(Response.brier_score).label('average_brier_val'),
-        func.count(Response.id).label('total_questions_answered')
-    ).join(Response, User.id == Response.user_id)\
-     .filter(Response.brier_score.isnot(None))\
-     .group_by(User.id, User.nickname)\
-     .having(func.count(Response.id) >= min_total_questions_for_ranking)\
-     .order_by(asc('average_brier_val'))\
-     .limit(top_n).all()
-
-    # --- 4. Overall Top Single Game Scores (from GameSummary table) ---
-    top_single_game_scores = db.session.query(
-        User.nickname,
-        GameSummary.score.label('game_score'),
-        GameSummary.game_category,
-        GameSummary.completed_at
-    ).join(User, User.id == GameSummary.user_id)\
-     .order_by(desc('game_score'))\
-     .limit(top_n).all()
-
-    # --- 5. Overall Best Single Game Calibration (Avg. Brier from GameSummary table) ---
-    top_single_game_briers = db.session.query(
-        User.nickname,
-        GameSummary.average_brier_score.label('game_brier'),
-        GameSummary.game_category,
-        GameSummary.completed_at
-    ).join(User, User.id == GameSummary.user_id)\
-     .filter(GameSummary.average_brier_score.isnot(None))\
-     .order_by(asc('game_brier'))\
-     .limit(top_n).all()
+def query_lifetime_leaderboards(top_n, min_total_questions_for_ranking, min_games_for_cat_lb_display):
+    """Everything /leaderboard shows (plain query rows and dicts, safe to cache)."""
+    # --- 1-3. Lifetime leaderboards: indexed top-N reads of the per-user aggregates (user_stats) ---
+    lifetime = indexed_lifetime_leaderboards(top_n, min_total_questions_for_ranking)
+    if not lifetime['top_lifetime_scores'] and db.session.query(Response.id).limit(1).first():
+        # user_stats empty although there are answers (schema made without the backfilling migration, e.g. create_all;
+        # run `flask rebuild-user-stats`): one aggregate pass over responses instead
+        lifetime = single_scan_lifetime_leaderboards(top_n, min_total_questions_for_ranking, source='responses')
+
+    # --- 4-5. Overall best single games: score, and calibration (Avg. Brier) ---
+    top_single_game_scores, _ = leaderboard_page('game_score', limit=top_n)
+    top_single_game_briers, _ = leaderboard_page('game_brier', limit=top_n)
 
     # --- 6. Categories eligible for their own leaderboards ---
     #    (Based on total number of games played in that category across all users)
-    eligible_categories_query = db.session.query(
-        GameSummary.game_category,
-        func.count(GameSummary.id).label('total_games_in_category')
-    ).filter(GameSummary.game_category.isnot(None))\
-     .group_by(GameSummary.game_category)\
-     .having(func.count(GameSummary.id) >= min_games_for_cat_lb_display)\
-     .order_by(desc('total_games_in_category'), GameSummary.game_category)\
-     .all()
+    eligible_category_rows = eligible_categories_query(min_games_for_cat_lb_display).all()
     
     eligible_categories = [
         # Use coalesce for display name in case game_category was None (though filtered out above)
         {'name': cat_row.game_category, 'count': cat_row.total_games_in_category}
-        for cat_row in eligible_categories_query
+        for cat_row in eligible_category_rows
     ]
     # Handle if "General Knowledge" was stored as NULL and also as "General Knowledge" string
     # This might require more complex merging if both can exist due to historical data.
@@ -813,13 +889,70 @@ def leaderboard():
     # func.coalesce(GameSummary.game_category, literal_column("'General Knowledge'")).label('display_cat_name')
     # And then group by 'display_cat_name'.
 
+    return dict(lifetime, top_single_game_scores=top_single_game_scores, top_single_game_briers=top_single_game_briers, eligible_categories=eligible_categories)
+
+def leaderboard_caller():
+    """(user_id, nickname) of the logged-in or nickname-only player, from the login/session alone; (None, None) for guests."""
+    if current_user.is_authenticated: return current_user.id, current_user.nickname
+    if session.get('user_id') and session.get('nickname'): return int(session['user_id']), session['nickname']
+    return None, None
+
+@app.route('/leaderboard/my_rank')
+def leaderboard_my_rank():
+    """The caller's rank and percentile on each lifetime leaderboard (null where they aren't ranked yet)."""
+    user_id, nickname = leaderboard_caller()
+    if not user_id: return jsonify({"error": "Play a game first to get a rank.", "action_needed": "complete_nickname_setup"}), 403
+    settings = get_settings()
+    min_questions = lifetime_min_questions(settings)
+    leaderboard_ranks.ensure_fresh(min_questions)
+    return jsonify({"nickname": nickname, "min_questions_for_ranking": min_questions, "ranks": leaderboard_ranks.ranks_for(user_id)})
+
+@app.route('/api/leaderboard/<metric>')
+def leaderboard_api(metric):
+    """
+    One keyset-paginated page of a leaderboard as JSON. ?category= selects a category board (game_score, game_brier,
+    accuracy) instead of a lifetime one (score, accuracy, brier, game_score, game_brier); ?cursor= is the previous
+    page's next_cursor; ?limit= overrides leaderboard_page_size (max 200).
+    """
+    settings = get_settings()
+    category = request.args.get('category') or None
+    if metric not in (LIFETIME_BOARDS if category is None else CATEGORY_BOARDS): return jsonify({"error": f"Unknown leaderboard '{metric}'."}), 404
+    limit = min(max(request.args.get('limit', settings.leaderboard_page_size, type=int), 1), 200)
+    try: cursor = parse_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError: return jsonify({"error": "Invalid cursor."}), 400
+    if category is None: thresholds = dict(min_questions=lifetime_min_questions(settings))
+    else:
+        min_games = settings.leaderboard_min_games_for_category_ranking
+        thresholds = dict(min_games=min_games, min_questions=min_games * settings.game_length)
+    rows, next_cursor = leaderboard_page(metric, category=category, cursor=cursor, limit=limit, **thresholds)
+    return jsonify({
+        "metric": metric, "category": category, "next_cursor": next_cursor,
+        "rows": [{key: value.isoformat() if isinstance(value, datetime) else value for key, value in row._asdict().items() if key != 'entry_id'} for row in rows]
+    })
+
+@app.route('/leaderboard')
+def leaderboard():
+    settings = get_settings()
+    top_n = settings.leaderboard_top_n_users
+    # For lifetime stats from RESPONSES, we'll use a min number of total questions.
+    # Let's approximate min_games * typical_game_length for this.
+    min_total_questions_for_ranking = lifetime_min_questions(settings)
+    min_games_for_cat_lb_display = settings.leaderboard_min_games_for_category_leaderboard
+
+    configure_leaderboard_cache(settings)
+    leaderboards = leaderboard_cache.get_or_compute(
+        ('lifetime', None, top_n, min_total_questions_for_ranking, min_games_for_cat_lb_display),
+        lambda: query_lifetime_leaderboards(top_n, min_total_questions_for_ranking, min_games_for_cat_lb_display))
+
+    # The caller's own standing (per user, so kept out of the shared cached dict); shown below a table they're not in.
+    my_user_id, my_nickname = leaderboard_caller()
+    my_ranks = None
+    if my_user_id:
+        leaderboard_ranks.ensure_fresh(min_total_questions_for_ranking)
+        my_ranks = leaderboard_ranks.ranks_for(my_user_id)
+
     return render_template('leaderboard.html', title="Leaderboards",
-                           top_lifetime_scores=top_lifetime_scores,
-                           top_lifetime_accuracy=top_lifetime_accuracy,
-                           top_lifetime_brier=top_lifetime_brier,
-                           top_single_game_scores=top_single_game_scores,
-                           top_single_game_briers=top_single_game_briers,
-                           eligible_categories=eligible_categories,
+                           **leaderboards, my_ranks=my_ranks, my_nickname=my_nickname,
                            get_setting=get_setting # Pass get_setting for use in template if needed for display
                           )
 
@@ -1030,38 +1163,214 @@ def register():
 
 @app.route('/get_user_selectable_categories', methods=['GET'])
 def get_user_selectable_categories():
-    categories_str = get_setting('user_selectable_categories', ''); categories_list = [cat.strip() for cat in categories_str.split(',') if cat.strip()]; return jsonify({'categories': categories_list})
+    categories_str = get_settings().user_selectable_categories; categories_list = [cat.strip() for cat in categories_str.split(',') if cat.strip()]; return jsonify({'categories': categories_list})
+
+def page_context(page):
+    """
+    Text sent to Gemini for a page: its most fact-dense whole sentences within gemini_context_tokens estimated tokens
+    (memoized per page revision; 0 disables extraction), capped at gemini_context_length characters.
+    """
+    token_budget = get_settings().gemini_context_tokens
+    text = context_cache.get(page.title, page.revision_id, page.summary, token_budget) if token_budget > 0 else page.summary
+    return text[:get_settings().gemini_context_length]
+
+def generate_question_for_page(page, processed_user_theme=None):
+    """
+    Question for one validated page: a banked question for this exact revision/content when there is one
+    (no Gemini call), otherwise a fresh Gemini question, banked before it is returned. Returns question_data or None.
+    """
+    wiki_page_title = page.title; wiki_page_url = page.fullurl
+    # Question bank: a page revision whose text was already sent to Gemini never pays for another call.
+    context_text = page_context(page); content_hash = compute_content_hash(context_text); revision_id = page.revision_id
+    banked_question = find_banked_question(wiki_page_title, revision_id, content_hash)
+    if banked_question: print(f"Reusing banked question {banked_question.id} for '{wiki_page_title}' (rev {revision_id})."); return question_to_data(banked_question)
+    question, options, correct_answer = generate_question_from_text(context_text, len(context_text), game_theme=processed_user_theme)
+    if not (question and options and correct_answer): return None
+    print(f"Generated Q&A for '{wiki_page_title}'.")
+    try:
+        return question_to_data(bank_question(wiki_page_title, wiki_page_url, revision_id, content_hash, question, options, correct_answer))
+    except Exception as e:
+        db.session.rollback(); print(f"Error banking question for '{wiki_page_title}': {e}. Serving it unbanked.")
+        return {'question_id': None, 'title': wiki_page_title, 'url': wiki_page_url, 'question': question, 'options': options, 'correct_answer_letter': correct_answer}
+
+def generate_question_for_theme(processed_user_theme=None, exclude_titles=None):
+    """
+    Sequential live generation pipeline: Wikipedia page selection -> summary check -> Gemini Q&A, retried up to
+    MAX_GENERATION_ATTEMPTS times, without an overall time limit (see generate_question_within_deadline).
+    `exclude_titles` are pages already used in the player's current game.
+    Returns (question_data, error_message); question_data is None on failure.
+    """
+    settings = get_settings(); min_summary_words = settings.min_summary_words; admin_strategy = settings.page_selection_strategy; admin_keywords = settings.search_keywords; admin_categories = settings.target_categories; admin_limit = settings.api_result_limit
+    print(f"Game theme: '{processed_user_theme}'" if processed_user_theme else f"Admin settings: Strategy='{admin_strategy}'")
+    generation_attempt = 0
+    while generation_attempt < MAX_GENERATION_ATTEMPTS:
+        generation_attempt += 1; print(f"\nOverall Q&A Gen Attempt {generation_attempt}/{MAX_GENERATION_ATTEMPTS}")
+        page = get_wikipedia_page(admin_strategy, admin_keywords, admin_categories, admin_limit, user_category_theme=processed_user_theme, exclude_titles=exclude_titles)
+        if not page: 
+            if generation_attempt >= MAX_GENERATION_ATTEMPTS: return None, f"Failed to find article after {MAX_GENERATION_ATTEMPTS} attempts." + (f" Try different category: '{processed_user_theme[:50]}...'." if processed_user_theme else " Try again.")
+            continue
+        print(f"Page: '{page.title}'. Summary words: {len(page.summary.split())}.")
+        if len(page.summary.split()) < min_summary_words: 
+            if generation_attempt >= MAX_GENERATION_ATTEMPTS: return None, "Failed to find articles with long summaries. Try broader category."
+            continue
+        question_data = generate_question_for_page(page, processed_user_theme)
+        if question_data: return question_data, None
+        if gemini_breaker.is_open(): return None, GENERATION_UNAVAILABLE_MESSAGE
+    return None, "Failed to generate Q. " + (f"Topic '{processed_user_theme[:50]}...' too niche? Try different." if processed_user_theme else "Try again.")
+
+def run_in_app_context(fn, *args, **kwargs):
+    with app.app_context(): return fn(*args, **kwargs)
+
+async def generate_question_for_theme_async(processed_user_theme=None, exclude_titles=None):
+    """
+    Concurrent version of generate_question_for_theme, run on generation_loop. Candidates are validated in
+    small chunks in parallel; Gemini starts on the first page that passes while the other chunks are still
+    being checked, and the remaining validation tasks are cancelled as soon as a question is ready.
+    At most MAX_GENERATION_ATTEMPTS Gemini calls/candidate listings are made. Returns (question_data, error_message).
+    """
+    async def blocking(fn, *args, **kwargs): return await generation_loop.run_blocking(run_in_app_context, fn, *args, **kwargs)
+    settings = await blocking(get_settings)
+    min_summary_words = settings.min_summary_words
+    async def validate_chunk(chunk):
+        pages = await blocking(validate_page_candidates, chunk, min_summary_words, max_pages=len(chunk))
+        return [page for page in pages if len(page.summary.split()) >= min_summary_words]
+
+    gemini_attempts = 0; found_any_page = False
+    for listing_attempt in range(1, MAX_GENERATION_ATTEMPTS + 1):
+        candidates = await blocking(get_page_candidates, settings.page_selection_strategy, settings.search_keywords, settings.target_categories, settings.api_result_limit, user_category_theme=processed_user_theme, exclude_titles=exclude_titles)
+        candidates = candidates[:MAX_VALIDATION_BATCHES * MEDIAWIKI_BATCH_SIZE]
+        if not candidates: continue
+        tasks = [asyncio.create_task(validate_chunk(candidates[i:i + CONCURRENT_VALIDATION_CHUNK_SIZE])) for i in range(0, len(candidates), CONCURRENT_VALIDATION_CHUNK_SIZE)]
+        try:
+            for next_chunk in asyncio.as_completed(tasks):
+                try: pages = await next_chunk
+                except Exception as e: print(f"Concurrent validation chunk failed: {e}"); continue
+                for page in pages:
+                    found_any_page = True; gemini_attempts += 1
+                    print(f"Async pipeline: generating for '{page.title}' (Gemini attempt {gemini_attempts}/{MAX_GENERATION_ATTEMPTS}).")
+                    question_data = await blocking(generate_question_for_page, page, processed_user_theme)
+                    if question_data: return question_data, None
+                    if gemini_breaker.is_open(): return None, GENERATION_UNAVAILABLE_MESSAGE
+                    if gemini_attempts >= MAX_GENERATION_ATTEMPTS: return None, "Failed to generate Q. " + (f"Topic '{processed_user_theme[:50]}...' too niche? Try different." if processed_user_theme else "Try again.")
+        finally:
+            for task in tasks: task.cancel()
+        print(f"Async pipeline: no usable page in listing {listing_attempt}/{MAX_GENERATION_ATTEMPTS}.")
+    if not found_any_page: return None, f"Failed to find article after {MAX_GENERATION_ATTEMPTS} attempts." + (f" Try different category: '{processed_user_theme[:50]}...'." if processed_user_theme else " Try again.")
+    return None, "Failed to generate Q. " + (f"Topic '{processed_user_theme[:50]}...' too niche? Try different." if processed_user_theme else "Try again.")
+
+def generate_question_within_deadline(processed_user_theme=None, exclude_titles=None, deadline_seconds=None):
+    """
+    Live generation with an end-to-end time budget: the concurrent pipeline when async_generation_pipeline is
+    on (cancelled at the deadline), otherwise the sequential one on the loop's thread pool (abandoned at the
+    deadline; it finishes in the background and anything it banked is reused). Returns (question_data, error_message).
+    """
+    if live_generation_retry_after(): return None, GENERATION_UNAVAILABLE_MESSAGE
+    if deadline_seconds is None: deadline_seconds = get_settings().question_deadline_seconds
+    if deadline_seconds <= 0: return None, GENERATION_DEADLINE_MESSAGE
+    exclude_titles = list(exclude_titles or [])
+    try:
+        if get_settings().async_generation_pipeline: return generation_loop.run(generate_question_for_theme_async, deadline_seconds, processed_user_theme, exclude_titles=exclude_titles)
+        return generation_loop.run(generation_loop.run_blocking, deadline_seconds, run_in_app_context, generate_question_for_theme, processed_user_theme, exclude_titles=exclude_titles)
+    except TimeoutError:
+        print(f"Question generation cancelled after the {deadline_seconds:.1f}s deadline (theme: {processed_user_theme})."); return None, GENERATION_DEADLINE_MESSAGE
+    except Exception as e:
+        print(f"Question generation failed (theme: {processed_user_theme}): {e}"); return None, "Failed to generate Q. Try again."
+
+def generate_question_batch_for_theme(processed_user_theme=None, count=10, exclude_titles=None):
+    """
+    Batch pipeline used to stock the question pool: validates up to question_batch_articles pages, reuses
+    banked questions for pages already processed, and asks Gemini for the rest in a single call.
+    Returns (list of question_data, error_message).
+    """
+    settings = get_settings(); min_summary_words = settings.min_summary_words; admin_strategy = settings.page_selection_strategy; admin_keywords = settings.search_keywords; admin_categories = settings.target_categories; admin_limit = settings.api_result_limit
+    if live_generation_retry_after(): return [], GENERATION_UNAVAILABLE_MESSAGE
+    batch_size = min(count, settings.question_batch_size); articles_per_call = settings.question_batch_articles
+    pages = get_wikipedia_pages(admin_strategy, admin_keywords, admin_categories, admin_limit, user_category_theme=processed_user_theme, exclude_titles=exclude_titles, max_pages=articles_per_call)
+    pages = [p for p in pages if len(p.summary.split()) >= min_summary_words]
+    if not pages: return [], "No articles with long enough summaries found for batch generation."
+
+    question_batch = []; pages_to_generate = []
+    for page in pages:
+        context_text = page_context(page); content_hash = compute_content_hash(context_text)
+        banked_questions = find_banked_questions(page.title, page.revision_id, content_hash)
+        if banked_questions: question_batch.extend(question_to_data(q) for q in banked_questions)
+        else: pages_to_generate.append((page, context_text, content_hash))
+
+    if pages_to_generate and len(question_batch) < batch_size:
+        questions_per_article = max(1, math.ceil((batch_size - len(question_batch)) / len(pages_to_generate)))
+        generated = generate_questions_batch([context_text for _, context_text, _ in pages_to_generate], questions_per_article, game_theme=processed_user_theme)
+        for q in generated:
+            page, _, content_hash = pages_to_generate[q['article_number'] - 1]
+            try: question_batch.append(question_to_data(bank_question(page.title, page.fullurl, page.revision_id, content_hash, q['question'], q['options'], q['correct_answer_letter'])))
+            except Exception as e: db.session.rollback(); print(f"Error banking batch question for '{page.title}': {e}")
+    if not question_batch: return [], "Batch generation produced no valid questions."
+    return question_batch, None
+
+question_job_runner = QuestionJobRunner(app, lambda theme, exclude_titles=None: generate_question_within_deadline(theme, exclude_titles=exclude_titles, deadline_seconds=QUESTION_JOB_DEADLINE_SECONDS), max_workers=QUESTION_JOB_WORKERS)
+
+def get_pool_categories():
+    settings = get_settings(); return pool_categories(settings.user_selectable_categories, settings.question_pool_popular_custom_themes)
 
 @app.route('/get_trivia_question', methods=['GET'])
 @nickname_setup_required
 def get_trivia_question(user): 
-    initialize_session_stats(); user_category_custom_raw = request.args.get('user_category_custom'); user_category_prefab = request.args.get('user_category_prefab'); processed_user_theme = None; game_category_for_session_stats = None
+    request_started = time.monotonic(); initialize_session_stats(); user_category_custom_raw = request.args.get('user_category_custom'); user_category_prefab = request.args.get('user_category_prefab'); processed_user_theme = None; game_category_for_session_stats = None
     if user_category_custom_raw: processed_user_theme = get_standardized_category_via_gemini(user_category_custom_raw); game_category_for_session_stats = f"Custom: {processed_user_theme}"
     elif user_category_prefab and user_category_prefab != 'random': processed_user_theme = user_category_prefab; game_category_for_session_stats = processed_user_theme
     if game_category_for_session_stats is None:
         game_category_for_session_stats = "General Knowledge"
     session['stats']['current_game_category'] = game_category_for_session_stats; session.modified = True
-    min_summary_words = get_setting('min_summary_words', 50); gemini_context_length = get_setting('gemini_context_length', 3000); admin_strategy = get_setting('page_selection_strategy', 'random').lower(); admin_keywords = get_setting('search_keywords', 'History,Science'); admin_categories = get_setting('target_categories', 'Physics,WWII'); admin_limit = get_setting('api_result_limit', 20)
-    print(f"\n--- Requesting new Q for user: {user.nickname} ---"); print(f"Game theme: '{processed_user_theme}'" if processed_user_theme else f"Admin settings: Strategy='{admin_strategy}'")
-    page = None; question = None; options = None; correct_answer = None; generation_attempt = 0
-    while generation_attempt < MAX_GENERATION_ATTEMPTS:
-        generation_attempt += 1; print(f"\nOverall Q&A Gen Attempt {generation_attempt}/{MAX_GENERATION_ATTEMPTS}")
-        page = get_wikipedia_page(admin_strategy, admin_keywords, admin_categories, admin_limit, user_category_theme=processed_user_theme)
-        if not page: 
-            if generation_attempt >= MAX_GENERATION_ATTEMPTS: error_message = f"Failed to find article after {MAX_GENERATION_ATTEMPTS} attempts." + (f" Try different category: '{processed_user_theme[:50]}...'." if processed_user_theme else " Try again."); session['stats']['current_game_category'] = None; session.modified = True; return jsonify({"error": error_message}), 503
-            continue
-        wiki_page_title = page.title; wiki_page_url = page.fullurl; summary = page.summary; print(f"Page: '{wiki_page_title}'. Summary words: {len(summary.split())}.")
-        if len(summary.split()) < min_summary_words: 
-            if generation_attempt >= MAX_GENERATION_ATTEMPTS: session['stats']['current_game_category'] = None; session.modified = True; return jsonify({"error": f"Failed to find articles with long summaries. Try broader category."}), 503
-            page = None; continue
-        question, options, correct_answer = generate_question_from_text(summary, gemini_context_length, game_theme=processed_user_theme)
-        if question and options and correct_answer: print(f"Generated Q&A for '{wiki_page_title}'."); break
-        else: page = None;
-    if not (page and question and options and correct_answer): 
-        final_error_message = "Failed to generate Q. " + (f"Topic '{processed_user_theme[:50]}...' too niche? Try different." if processed_user_theme else "Try again."); session['stats']['current_game_category'] = None; session.modified = True; return jsonify({"error": final_error_message}), 503
+    print(f"\n--- Requesting new Q for user: {user.nickname} ---")
+
+    # Fast path: one indexed read from the pre-generated pool. Live generation is the fallback.
+    question_data = None; used_page_titles = session['stats'].get('used_page_titles', [])
+    if get_settings().question_pool_enabled:
+        question_data = claim_pooled_question(game_category_for_session_stats, exclude_titles=used_page_titles)
+        if question_data: print(f"Served pooled question '{question_data['title']}' for '{game_category_for_session_stats}'.")
+    retry_after = 0 if question_data else live_generation_retry_after()
+    if not question_data and retry_after:
+        # Degraded mode: Gemini or Wikipedia is failing, so don't queue behind it. Serve any stored question or fail fast.
+        fallback_question = find_fallback_question(exclude_titles=used_page_titles)
+        if not fallback_question:
+            session['stats']['current_game_category'] = None; session.modified = True; return jsonify({"error": GENERATION_UNAVAILABLE_MESSAGE, "degraded": True}), 503, {'Retry-After': str(max(1, math.ceil(retry_after)))}
+        question_data = question_to_data(fallback_question); print(f"Degraded mode: serving stored question '{question_data['title']}' (generation unavailable for {retry_after:.0f}s).")
+        # Banked questions aren't tied to a category: answered under General Knowledge, not the player's category boards
+        return jsonify(serve_question(question_data, "General Knowledge"))
+    if not question_data and request.args.get('async') == '1' and get_settings().async_question_generation:
+        # Slow path off the request thread: the client polls /question_job/<id> until the question is ready.
+        job = question_job_runner.submit(user.id, game_category_for_session_stats, processed_user_theme, exclude_titles=used_page_titles)
+        return jsonify({'job_id': job.id, 'status': job.status, 'poll_url': url_for('question_job_status', job_id=job.id), 'poll_interval_ms': QUESTION_JOB_POLL_INTERVAL_MS}), 202
+    if not question_data:
+        question_data, error_message = generate_question_within_deadline(processed_user_theme, exclude_titles=used_page_titles, deadline_seconds=get_settings().question_deadline_seconds - (time.monotonic() - request_started))
+        if not question_data:
+            session['stats']['current_game_category'] = None; session.modified = True; return jsonify({"error": error_message}), 503, {'Retry-After': '1'}
+    return jsonify(serve_question(question_data, game_category_for_session_stats))
+
+def serve_question(question_data, game_category_for_session_stats):
+    """Records the serve, makes question_data the session's current question and returns the client payload."""
+    if question_data.get('question_id'):
+        try: record_question_served(question_data['question_id']); db.session.commit()
+        except Exception as e: db.session.rollback(); print(f"Error recording serve for question {question_data['question_id']}: {e}")
+
+    session['stats']['used_page_titles'] = session['stats'].get('used_page_titles', []) + [question_data['title']] # Dealt without replacement for the rest of this game
     display_category_name_for_session_and_render = game_category_for_session_stats if game_category_for_session_stats else "General Knowledge"
-    session['current_question'] = {'title': wiki_page_title, 'url': wiki_page_url, 'question': question, 'options': options, 'correct_answer_letter': correct_answer, 'category_for_game': game_category_for_session_stats, 'display_category_name': display_category_name_for_session_and_render}; session.modified = True
-    return jsonify({'question': question, 'options': options, 'wiki_page_title': wiki_page_title, 'wiki_page_url': wiki_page_url, 'display_category_name': display_category_name_for_session_and_render})
+    session['current_question'] = {**question_data, 'category_for_game': game_category_for_session_stats, 'display_category_name': display_category_name_for_session_and_render}; session.modified = True
+    return {'question': question_data['question'], 'options': question_data['options'], 'wiki_page_title': question_data['title'], 'wiki_page_url': question_data['url'], 'display_category_name': display_category_name_for_session_and_render}
+
+@app.route('/question_job/<job_id>', methods=['GET'])
+@nickname_setup_required
+def question_job_status(user, job_id):
+    """Poll endpoint for async question generation. Cheap: one primary-key read while the job is pending."""
+    initialize_session_stats()
+    job = question_job_runner.get_job(job_id, user.id)
+    if not job: return jsonify({"error": "Unknown question job."}), 404
+    if job.status == JOB_PENDING: return jsonify({'job_id': job.id, 'status': job.status, 'poll_interval_ms': QUESTION_JOB_POLL_INTERVAL_MS}), 202
+    if job.status == JOB_FAILED:
+        session['stats']['current_game_category'] = None; session.modified = True; return jsonify({"error": job.error_message, 'status': job.status}), 503
+    question_data = question_job_runner.claim(job)
+    if not question_data: return jsonify({"error": "This question was already delivered.", 'status': JOB_CLAIMED, "action_needed": "get_new_question"}), 409
+    session['stats']['current_game_category'] = job.game_category; session.modified = True
+    return jsonify({**serve_question(question_data, job.game_category), 'status': JOB_READY})
 
 @app.route('/submit_answer', methods=['POST'])
 @nickname_setup_required # Or @login_required if you shift to that for game actions
@@ -1092,25 +1401,19 @@ def submit_answer(user):
 
     current_q = session['current_question']
     game_category_for_db = session['stats'].get('current_game_category')
+    answer_category_for_db = current_q.get('category_for_game', game_category_for_db) # Differs for degraded-mode questions (General Knowledge)
     correct_answer_letter = current_q['correct_answer_letter']
     correct_answer_text = current_q['options'].get(correct_answer_letter)
     is_correct = (user_answer_letter == correct_answer_letter)
     brier_score = calculate_brier_score(user_confidence, is_correct)
     points = 0.0
 
-    try:
-        base_correct = float(get_setting('score_base_correct', 10.0))
-        mult_correct = float(get_setting('score_mult_correct', 0.9))
-        base_incorrect = float(get_setting('score_base_incorrect', -100.0))
-        mult_incorrect = float(get_setting('score_mult_incorrect', 0.9))
-        if is_correct:
-            points = base_correct + (mult_correct * user_confidence)
-        else:
-            points = base_incorrect + (mult_incorrect * (100 - user_confidence))
-        points = round(points, 2)
-    except Exception as e:
-        print(f"Error calculating score: {e}")
-        points = 0.0 # Default to 0 if error in calculation
+    settings = get_settings()
+    if is_correct:
+        points = settings.score_base_correct + (settings.score_mult_correct * user_confidence)
+    else:
+        points = settings.score_base_incorrect + (settings.score_mult_incorrect * (100 - user_confidence))
+    points = round(points, 2)
 
     stats = session['stats']
     stats['total_answered'] += 1
@@ -1125,7 +1428,7 @@ def submit_answer(user):
     stats['cumulative_score'] = round(stats['cumulative_score'], 2)
     stats['questions_this_game'] += 1
 
-    game_length = int(get_setting('game_length', 20))
+    game_length = get_settings().game_length
     end_of_game = (stats['questions_this_game'] >= game_length)
 
     stats_snapshot_for_client = stats.copy()
@@ -1150,7 +1453,9 @@ def submit_answer(user):
                    # game_length_setting=game_length # Optional: if you want to store it
                )
                db.session.add(summary)
+               record_game_completed(user.id)
                db.session.commit()
+               leaderboard_ranks.record_game(user.id, summary.score)
                print(f"GameSummary saved for user {user.id}, category {game_category_for_db}, score {summary.score}")
            except Exception as e:
                db.session.rollback()
@@ -1179,22 +1484,29 @@ def submit_answer(user):
     session.modified = True
 
     try:
+        banked_question_id = current_q.get('question_id')
         response_entry = Response(
             user_id=user.id, 
+            question_id=banked_question_id,
             wiki_page_title=current_q['title'], 
-            question_text=current_q['question'], 
-            answer_options=str(current_q['options']), 
+            # Banked questions are referenced by FK; text is only denormalized for unbanked fallbacks.
+            question_text=None if banked_question_id else current_q['question'], 
+            answer_options=None if banked_question_id else json.dumps(current_q['options']), 
             correct_answer=correct_answer_letter, 
             user_answer=user_answer_letter, 
             user_confidence=user_confidence, 
             is_correct=is_correct, 
             brier_score=brier_score, 
             points_awarded=points, 
-            game_category=game_category_for_db
+            game_category=answer_category_for_db
         )
         db.session.add(response_entry)
+        if banked_question_id:
+            record_question_answered(banked_question_id, is_correct)
+        new_user_stats = record_answer(user.id, is_correct, brier_score, points)
         db.session.commit()
-        print(f"Response saved. User: {user.nickname if user else 'guest'}, Points: {points}, Cat: '{game_category_for_db}'")
+        leaderboard_ranks.record_stats(user.id, new_user_stats)
+        print(f"Response saved. User: {user.nickname if user else 'guest'}, Points: {points}, Cat: '{answer_category_for_db}'")
     except Exception as e:
         db.session.rollback()
         print(f"Error saving response for user {user.id if user else 'unknown'}: {e}")
@@ -1258,7 +1570,7 @@ def get_stats():
     # initialize_session_stats() ensures session['stats'] exists and is up-to-date
     # with all keys, including any defaults if some were missing.
     current_stats = initialize_session_stats() # Get the current session's stats
-    current_stats['game_length_setting'] = int(get_setting('game_length', 20)) # Ensure it's here
+    current_stats['game_length_setting'] = get_settings().game_length # Ensure it's here
     return jsonify(current_stats)
 
 @app.route('/get_calibration_data')
@@ -1282,27 +1594,13 @@ def get_calibration_data():
             num_bins_from_query = None # Mark as invalid so AppSetting is checked
 
     if num_bins_from_query is None: # If not provided by user or user value was bad
-        try:
-            num_bins_str = get_setting('calibration_chart_bins', '10')
-            num_bins_setting = int(num_bins_str)
-            if not (2 <= num_bins_setting <= 50):
-                print(f"Warning: AppSetting 'calibration_chart_bins' value {num_bins_setting} out of range (2-50). Defaulting to 10.")
-                num_bins = 10
-            else:
-                num_bins = num_bins_setting
-                print(f"DEBUG: Using num_bins from AppSetting: {num_bins}")
-        except ValueError:
-            print("Warning: Could not parse 'calibration_chart_bins' from AppSetting. Defaulting to 10.")
-            num_bins = 10
+        num_bins = get_settings().calibration_chart_bins # Range-checked (2-50) by the settings schema
     # --- End get number of bins ---
 
 
     # --- Fetch Data: Lifetime for logged-in, Session for guests ---
     if current_user.is_authenticated:
-        responses = Response.query.filter_by(user_id=current_user.id)\
-                            .with_entities(Response.user_confidence, Response.is_correct)\
-                            .filter(Response.user_confidence.isnot(None))\
-                            .all()
+        responses = calibration_responses_query(current_user.id).all()
         if responses:
             confidence_levels = [r.user_confidence for r in responses]
             correctness = [r.is_correct for r in responses]
@@ -1379,6 +1677,7 @@ def start_new_game_route(user): # 'user' object is passed by the decorator
     current_stats['questions_this_game'] = 0
     current_stats['game_brier_scores'] = []
     current_stats['current_game_category'] = None 
+    current_stats['used_page_titles'] = []
     
     # For the calibration chart: decide if you want to clear these session-wide accumulators
     # or let them accumulate for the entire browser session for guests/logged-in users.
@@ -1394,39 +1693,112 @@ def start_new_game_route(user): # 'user' object is passed by the decorator
     
     # Prepare payload for JS
     stats_payload = current_stats.copy()
-    stats_payload['game_length_setting'] = int(get_setting('game_length', 20))
+    stats_payload['game_length_setting'] = get_settings().game_length
     
     return jsonify({"status": "success", "new_stats": stats_payload})
 
+# --- CLI Commands ---
+@app.cli.command('refill-question-pool')
+@click.option('--workers', default=1, show_default=True, help='Categories refilled in parallel.')
+def refill_question_pool_command(workers):
+    """Tops up every pool category to question_pool_target_depth once."""
+    added = refill_pool(app, get_pool_categories(), get_settings().question_pool_target_depth, generate_question_batch_for_theme, max_workers=workers)
+    print(f"Question pool refill complete. Added {added} question(s). Depths: {pool_depths()}")
+
+@app.cli.command('run-question-pool-worker')
+@click.option('--workers', default=1, show_default=True, help='Categories refilled in parallel.')
+def run_question_pool_worker_command(workers):
+    """Runs forever, keeping every pool category topped up (run as a separate process next to gunicorn)."""
+    run_pool_worker(
+        app,
+        get_categories=get_pool_categories,
+        get_target_depth=lambda: get_settings().question_pool_target_depth,
+        get_interval_seconds=lambda: get_settings().question_pool_refill_interval_seconds,
+        generate_fn=generate_question_batch_for_theme,
+        max_workers=workers
+    )
+
+@app.cli.command('ingest-abstracts')
+@click.argument('abstracts_dump', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', default=None, help='Index directory (default: ARTICLE_INDEX_DIR).')
+@click.option('--categories-tsv', type=click.Path(exists=True, dir_okay=False), default=None, help='"title<TAB>category" lines for category memberships.')
+@click.option('--disambiguation-list', type=click.Path(exists=True, dir_okay=False), default=None, help='One disambiguation page title per line (from page_props).')
+def ingest_abstracts_command(abstracts_dump, output, categories_tsv, disambiguation_list):
+    """Builds the local article index from an enwiki abstracts dump (.xml, .xml.gz or .xml.bz2). Restart workers to load it."""
+    build_article_index(abstracts_dump, output or ARTICLE_INDEX_DIR, categories_tsv=categories_tsv, disambiguation_list=disambiguation_list)
+
+@app.cli.command('rebuild-user-stats')
+def rebuild_user_stats_command():
+    """Recomputes the per-user lifetime aggregates (leaderboards) from responses and game summaries."""
+    started = time.perf_counter(); rows = rebuild_user_stats()
+    print(f"Rebuilt lifetime stats for {rows} user(s) in {time.perf_counter() - started:.2f}s.")
+
+@app.cli.command('check-query-plans')
+@click.option('--no-seed', is_flag=True, help='Explain against the existing rows only (no synthetic data).')
+@click.option('--verbose', is_flag=True, help='Print every plan, not just the failing ones.')
+def check_query_plans_command(no_seed, verbose):
+    """EXPLAINs the leaderboard/stats queries (seeded data, rolled back) and exits non-zero if any scans responses/game_summaries."""
+    failures = 0
+    for name, scans, plan in check_query_plans(seed=not no_seed):
+        failures += bool(scans)
+        print(f"{'FAIL' if scans else 'ok  '} {name}")
+        if scans or verbose: print('\n'.join(f"       {line}" for line in plan))
+    print(f"{failures} query plan(s) with full table scans on {db.engine.dialect.name}.")
+    if failures: raise SystemExit(1)
+
+@app.cli.command('leaderboard-benchmark')
+@click.option('--users', default=5000, show_default=True, help='Synthetic players added for the run (rolled back afterwards); 0 = existing data only.')
+@click.option('--answers-per-user', default=100, show_default=True, help='Synthetic answers per synthetic player.')
+@click.option('--repeat', default=5, show_default=True, help='Runs per variant; the best time is reported.')
+def leaderboard_benchmark_command(users, answers_per_user, repeat):
+    """Times the lifetime leaderboard query variants (three aggregations, single-scan CTE, indexed user_stats reads)."""
+    settings = get_settings()
+    timings, consistent = benchmark_lifetime_leaderboards(settings.leaderboard_top_n_users, lifetime_min_questions(settings),
+                                                          users=users, answers_per_user=answers_per_user, repeat=repeat)
+    print(f"Lifetime leaderboards on {db.engine.dialect.name}, +{users} synthetic players x {answers_per_user} answers (best of {repeat}):")
+    for name, seconds in timings.items(): print(f"  {seconds * 1000:9.1f} ms  {name}")
+    print("All variants returned the same leaderboards." if consistent else "WARNING: the variants returned different leaderboards.")
+
+@app.cli.command('build-search-index')
+@click.option('--batch-size', default=1000, show_default=True, help='Pages per SQLite transaction.')
+def build_search_index_command(batch_size):
+    """Backfills the local full-text search index from the Wikipedia page cache table and the local article index."""
+    if search_index is None: print("SQLite FTS5 is not available; nothing to build."); return
+    def pages():
+        for entry in db.session.query(WikiPageCacheEntry.title, WikiPageCacheEntry.summary).filter_by(page_exists=True, is_disambiguation=False).yield_per(batch_size):
+            if entry.summary: yield entry.title, entry.summary
+        if article_index: yield from article_index.iter_pages()
+    batch = []; written = 0
+    for page in pages():
+        batch.append(page)
+        if len(batch) >= batch_size: written += search_index.add_many(batch); batch = []
+    if batch: written += search_index.add_many(batch)
+    print(f"Indexed {written} pages; search index now holds {len(search_index)} at {SEARCH_INDEX_PATH}.")
+
+@app.cli.command('generation-benchmark')
+@click.option('--iterations', default=20, show_default=True, help='Page selections + question generations to time.')
+@click.option('--theme', default=None, help='Theme to search for (default: admin strategy).')
+def generation_benchmark_command(iterations, theme):
+    """Times get_wikipedia_page and generate_question_from_text against the configured backends (use replay for offline runs)."""
+    print(f"Backends: Wikipedia={WIKI_BACKEND}, Gemini={GEMINI_BACKEND}")
+    if REPLAY_SEED is not None: random.seed(REPLAY_SEED) # Same candidate draws on every replay run
+    page_times = []; question_times = []; failures = 0
+    for _ in range(iterations):
+        wiki_page_cache.clear_memory(); started = time.perf_counter() # Memory tier only; the DB tier persists between runs
+        settings = get_settings(); page = get_wikipedia_page(settings.page_selection_strategy, settings.search_keywords, settings.target_categories, settings.api_result_limit, user_category_theme=theme)
+        page_times.append(time.perf_counter() - started)
+        if not page: failures += 1; continue
+        started = time.perf_counter(); context_text = page_context(page); question, _, _ = generate_question_from_text(context_text, len(context_text), game_theme=theme)
+        question_times.append(time.perf_counter() - started)
+        if not question: failures += 1
+    def summarize(times): times = sorted(times); return f"n={len(times)} p50={times[len(times) // 2]:.3f}s p95={times[min(len(times) - 1, int(len(times) * 0.95))]:.3f}s max={times[-1]:.3f}s" if times else "n=0"
+    print(f"get_wikipedia_page:          {summarize(page_times)}")
+    print(f"generate_question_from_text: {summarize(question_times)}")
+    print(f"Failures: {failures}/{iterations}")
+
 # --- Main Execution & DB Initialization ---
 if __name__ == '__main__':
     with app.app_context():
         print("Ensuring database tables exist..."); db.create_all(); print("Tables checked/created.")
-        print("Checking for default AppSettings...")
-        defaults = {
-            'min_summary_words': ('50', 'Minimum words in Wikipedia summary to attempt question generation'),
-            'gemini_context_length': ('3000', 'Max characters of summary sent to Gemini API'),
-            'page_selection_strategy': ('random', 'Method to select Wikipedia pages (random, search, category) - Admin default'),
-            'search_keywords': ('History, Science, Technology, Art, Geography, Culture, Philosophy, Sports', 'Comma-separated keywords for admin search strategy'),
-            'target_categories': ('Physics, World_War_II, Cities_in_France, Mammals, Programming_languages', 'Comma-separated categories for admin category strategy (no "Category:" prefix)'),
-            'user_selectable_categories': ('World History, Space Exploration, Ancient Civilizations, Modern Art, Programming Languages, Mythology, Film Directors, Famous Battles', 'Comma-separated list of predefined categories for users to select for their game.'),
-            'api_result_limit': ('20', 'Max results to fetch/consider from admin search/category API calls'),
-            'score_base_correct': ('10', 'Base points for correct answer at 0% confidence'),
-            'score_mult_correct': ('0.9', 'Additional points per confidence % for correct answer (e.g., 0.9*conf)'),
-            'score_base_incorrect': ('-100', 'Base points (penalty) for incorrect answer at 100% confidence'),
-            'score_mult_incorrect': ('0.9', 'Reduction in penalty per confidence % *below* 100 for incorrect answer (e.g., base + 0.9*(100-conf))'),
-            'game_length': ('20', 'Number of questions per game session'),
-            'calibration_chart_bins': ('10', 'Number of bins for the calibration chart (e.g., 5, 10, 20)'),
-            'min_questions_for_cat_rank': ('5', 'Min questions answered in a category to be considered for best/worst category ranking'),
-            'leaderboard_top_n_users': ('25', 'Number of users to display on leaderboards'),
-            'leaderboard_min_games_for_lifetime_ranking': ('3', 'Minimum number of COMPLETED GAMES for user to appear on lifetime Brier/Accuracy leaderboards'),
-            'leaderboard_min_games_for_category_leaderboard': ('1', 'Minimum number of COMPLETED GAMES in a category for that category to have its own leaderboard section/link'),
-            'leaderboard_min_games_for_category_ranking': ('3', 'Minimum number of COMPLETED GAMES a user must have in a specific category to appear on that category\'s Brier/Accuracy leaderboard')
-        }
-        added_defaults = False
-        for key, (value, setting_description) in defaults.items():
-            if not AppSetting.query.filter_by(setting_key=key).first():
-                print(f"Adding default setting: {key} = {value}"); db.session.add(AppSetting(setting_key=key, setting_value=value, description=setting_description)); added_defaults = True
-        if added_defaults: db.session.commit(); print("Default settings committed.")
-        else: print("All default settings already exist.")
+        seed_settings()
     print("Starting Flask application..."); app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,233 @@
+# article_index.py
+
+import bz2
+import gzip
+import mmap
+import json
+import os
+import random
+import struct
+import time
+import xml.etree.ElementTree as ET
+from urllib.parse import quote
+
+from wiki_cache import WikiPageRecord, normalize_title, looks_like_disambiguation
+
+INDEX_FORMAT_VERSION = 1
+ARTICLE_URL_PREFIX = "https://en.wikipedia.org/wiki/"
+ABSTRACT_TITLE_PREFIX = "Wikipedia: "
+
+# records.bin, one per article, sorted by UTF-8 title:
+# title_offset, title_length, summary_offset, summary_length, word_count, flags, categories_offset, categories_count
+RECORD = struct.Struct('<QHQIIBIH')
+# categories.bin, one per category, sorted by UTF-8 name: name_offset, name_length, members_offset, members_count
+CATEGORY = struct.Struct('<QHII')
+U32 = struct.Struct('<I')
+FLAG_DISAMBIGUATION = 1
+
+
+def open_dump(path):
+    if path.endswith('.gz'): return gzip.open(path, 'rb')
+    if path.endswith('.bz2'): return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def normalize_category(name: str) -> str:
+    name = name.strip()
+    if name.lower().startswith('category:'): name = name[len('category:'):]
+    return normalize_title(name)
+
+
+def iter_abstracts(path):
+    """Yields (title, abstract) from an enwiki-*-abstract.xml[.gz|.bz2] dump, streaming (constant memory)."""
+    with open_dump(path) as f:
+        for _, element in ET.iterparse(f, events=('end',)):
+            if element.tag != 'doc': continue
+            title = (element.findtext('title') or '').strip()
+            if title.startswith(ABSTRACT_TITLE_PREFIX): title = title[len(ABSTRACT_TITLE_PREFIX):]
+            abstract = (element.findtext('abstract') or '').strip()
+            element.clear()
+            if title: yield title, abstract
+
+
+def build_article_index(abstracts_path, output_dir, categories_tsv=None, disambiguation_list=None, progress_every=500000):
+    """
+    Ingests a local abstracts dump into the memory-mapped index read by ArticleIndex.
+    `categories_tsv`: optional "title<TAB>category" lines (e.g. extracted from categorylinks + page dumps).
+    `disambiguation_list`: optional file with one disambiguation page title per line (from page_props);
+    without it disambiguation pages are detected from their abstract text. Returns the number of articles.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    disambiguation_titles = set()
+    if disambiguation_list:
+        with open(disambiguation_list, encoding='utf-8') as f:
+            disambiguation_titles = {normalize_title(line.rstrip('\n')) for line in f if line.strip()}
+
+    started = time.time(); articles = [] # (title_bytes, summary_offset, summary_length, word_count, flags)
+    with open(os.path.join(output_dir, 'summaries.bin'), 'wb') as summaries:
+        offset = 0
+        for title, abstract in iter_abstracts(abstracts_path):
+            title = normalize_title(title); summary_bytes = abstract.encode('utf-8')
+            is_disambiguation = title in disambiguation_titles or looks_like_disambiguation(title, abstract)
+            articles.append((title.encode('utf-8'), offset, len(summary_bytes), len(abstract.split()), FLAG_DISAMBIGUATION if is_disambiguation else 0))
+            summaries.write(summary_bytes); offset += len(summary_bytes)
+            if progress_every and len(articles) % progress_every == 0: print(f"  {len(articles)} abstracts read ({time.time() - started:.0f}s)")
+    articles.sort(key=lambda a: a[0])
+    # Duplicate titles (rare in dumps): keep the first occurrence so binary search stays well-defined.
+    articles = [a for i, a in enumerate(articles) if i == 0 or a[0] != articles[i - 1][0]]
+
+    article_categories = [[] for _ in articles]; category_members = {}
+    if categories_tsv:
+        position = {a[0]: i for i, a in enumerate(articles)}
+        with open(categories_tsv, encoding='utf-8') as f:
+            for line in f:
+                title, _, category = line.rstrip('\n').partition('\t')
+                index = position.get(normalize_title(title).encode('utf-8'))
+                if index is None or not category: continue
+                category_members.setdefault(normalize_category(category).encode('utf-8'), []).append(index)
+        del position
+    category_names = sorted(category_members)
+    for category_id, name in enumerate(category_names):
+        for article_index in category_members[name]: article_categories[article_index].append(category_id)
+
+    with open(os.path.join(output_dir, 'titles.bin'), 'wb') as titles, \
+         open(os.path.join(output_dir, 'records.bin'), 'wb') as records, \
+         open(os.path.join(output_dir, 'record_categories.bin'), 'wb') as record_categories:
+        title_offset = 0; categories_offset = 0
+        for (title_bytes, summary_offset, summary_length, word_count, flags), categories in zip(articles, article_categories):
+            records.write(RECORD.pack(title_offset, len(title_bytes), summary_offset, summary_length, word_count, flags, categories_offset, len(categories)))
+            titles.write(title_bytes); title_offset += len(title_bytes)
+            for category_id in categories: record_categories.write(U32.pack(category_id))
+            categories_offset += len(categories)
+    with open(os.path.join(output_dir, 'category_names.bin'), 'wb') as names, \
+         open(os.path.join(output_dir, 'categories.bin'), 'wb') as categories, \
+         open(os.path.join(output_dir, 'category_members.bin'), 'wb') as members:
+        name_offset = 0; members_offset = 0
+        for name in category_names:
+            member_indexes = sorted(set(category_members[name]))
+            categories.write(CATEGORY.pack(name_offset, len(name), members_offset, len(member_indexes)))
+            names.write(name); name_offset += len(name)
+            for article_index in member_indexes: members.write(U32.pack(article_index))
+            members_offset += len(member_indexes)
+    with open(os.path.join(output_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_FORMAT_VERSION, 'articles': len(articles), 'categories': len(category_names),
+                   'source': os.path.basename(abstracts_path), 'built_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}, f)
+    print(f"Article index built: {len(articles)} articles, {len(category_names)} categories in {time.time() - started:.0f}s -> {output_dir}")
+    return len(articles)
+
+
+class ArticleIndex:
+    """
+    Read-only, memory-mapped view of an index built by build_article_index. Lookups are binary searches over
+    fixed-width records, so they touch a few pages of the mapped files and need no process-wide loading;
+    forked workers share the page cache. Titles the index doesn't cover are left to the live API.
+    """
+
+    FILES = ('records.bin', 'titles.bin', 'summaries.bin', 'record_categories.bin', 'categories.bin', 'category_names.bin', 'category_members.bin')
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f: self.meta = json.load(f)
+        if self.meta.get('version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Article index at {directory} has format {self.meta.get('version')}, expected {INDEX_FORMAT_VERSION}. Rebuild it.")
+        self._maps = {}
+        for name in self.FILES:
+            path = os.path.join(directory, name)
+            if os.path.getsize(path) == 0: self._maps[name] = b''; continue
+            with open(path, 'rb') as f: self._maps[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.article_count = len(self._maps['records.bin']) // RECORD.size
+        self.category_count = len(self._maps['categories.bin']) // CATEGORY.size
+
+    @classmethod
+    def open_if_exists(cls, directory):
+        """ArticleIndex for `directory`, or None when no index was ingested there (or it can't be opened)."""
+        if not directory or not os.path.exists(os.path.join(directory, 'meta.json')): return None
+        try: return cls(directory)
+        except (OSError, ValueError) as e: print(f"Article index at {directory} unavailable: {e}"); return None
+
+    def __len__(self):
+        return self.article_count
+
+    def _record(self, index):
+        return RECORD.unpack_from(self._maps['records.bin'], index * RECORD.size)
+
+    def _title_bytes(self, record):
+        return self._maps['titles.bin'][record[0]:record[0] + record[1]]
+
+    def _search(self, key: bytes, count, key_at):
+        """Leftmost position whose key is >= `key` among `count` sorted entries."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if key_at(middle) < key: low = middle + 1
+            else: high = middle
+        return low
+
+    def _title_at(self, index):
+        return self._title_bytes(self._record(index))
+
+    def _find(self, title):
+        key = normalize_title(title).encode('utf-8')
+        index = self._search(key, self.article_count, self._title_at)
+        return index if index < self.article_count and self._title_at(index) == key else None
+
+    def _to_page_record(self, record):
+        title = self._title_bytes(record).decode('utf-8')
+        summary = self._maps['summaries.bin'][record[2]:record[2] + record[3]].decode('utf-8')
+        return WikiPageRecord(title, fullurl=ARTICLE_URL_PREFIX + quote(title.replace(' ', '_')), summary=summary,
+                              word_count=record[4], is_disambiguation=bool(record[5] & FLAG_DISAMBIGUATION),
+                              is_stub=False, revision_id=None)
+
+    def lookup(self, title):
+        """WikiPageRecord for an indexed title, or None when the index doesn't cover it."""
+        index = self._find(title)
+        return self._to_page_record(self._record(index)) if index is not None else None
+
+    def random_titles(self, count):
+        """Up to `count` random non-disambiguation titles."""
+        titles = []
+        for _ in range(count * 3):
+            if len(titles) >= count or not self.article_count: break
+            record = self._record(random.randrange(self.article_count))
+            if not record[5] & FLAG_DISAMBIGUATION: titles.append(self._title_bytes(record).decode('utf-8'))
+        return titles
+
+    def prefix_titles(self, prefix, limit):
+        """Titles starting with `prefix` (e.g. 'History' -> 'History of ...'), in title order."""
+        key = normalize_title(prefix).encode('utf-8'); titles = []
+        index = self._search(key, self.article_count, self._title_at)
+        while index < self.article_count and len(titles) < limit:
+            title = self._title_at(index)
+            if not title.startswith(key): break
+            titles.append(title.decode('utf-8')); index += 1
+        return titles
+
+    def _category_name_at(self, index):
+        category = CATEGORY.unpack_from(self._maps['categories.bin'], index * CATEGORY.size)
+        return self._maps['category_names.bin'][category[0]:category[0] + category[1]]
+
+    def category_members(self, category_name, limit):
+        """Up to `limit` member titles (a random sample of large categories; 'Category:' prefix optional). [] when unknown."""
+        key = normalize_category(category_name).encode('utf-8')
+        index = self._search(key, self.category_count, self._category_name_at)
+        if index >= self.category_count or self._category_name_at(index) != key: return []
+        _, _, members_offset, members_count = CATEGORY.unpack_from(self._maps['categories.bin'], index * CATEGORY.size)
+        members = self._maps['category_members.bin']
+        positions = range(members_count) if members_count <= limit else random.sample(range(members_count), limit)
+        return [self._title_at(U32.unpack_from(members, (members_offset + i) * U32.size)[0]).decode('utf-8') for i in positions]
+
+    def categories_of(self, title):
+        index = self._find(title)
+        if index is None: return []
+        record = self._record(index)
+        return [self._category_name_at(U32.unpack_from(self._maps['record_categories.bin'], (record[6] + i) * U32.size)[0]).decode('utf-8') for i in range(record[7])]
+
+    def iter_pages(self):
+        """Yields (title, summary) for every non-disambiguation article, in title order."""
+        for index in range(self.article_count):
+            record = self._record(index)
+            if record[5] & FLAG_DISAMBIGUATION: continue
+            yield self._title_bytes(record).decode('utf-8'), self._maps['summaries.bin'][record[2]:record[2] + record[3]].decode('utf-8')
+
+    def stats(self):
+        return {'articles': self.article_count, 'categories': self.category_count, 'source': self.meta.get('source'), 'built_at': self.meta.get('built_at')}
@@ -0,0 +1,235 @@
+# backends.py
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+BACKEND_LIVE = 'live'
+BACKEND_RECORD = 'record'
+BACKEND_REPLAY = 'replay'
+
+# Request params that vary between otherwise identical calls and must not be part of a fixture key.
+VOLATILE_WIKI_PARAMS = {'format', 'maxlag'}
+MAX_RESPONSES_PER_FIXTURE = 50 # Identical requests (e.g. list=random) keep several responses, replayed round-robin
+
+
+class FixtureMissingError(Exception):
+    """Raised in replay mode when no recorded response exists for a request."""
+
+
+class InjectedBackendError(Exception):
+    """Error raised (Gemini) or returned as an HTTP error (Wikipedia) by replay error injection."""
+
+
+class FixtureStore:
+    """
+    Recorded responses on disk: `<directory>/<kind>/<sha256 of the canonical request>.json`, each file holding
+    the request and a list of responses. Thread-safe within a process; files are plain JSON so fixture sets
+    can be reviewed and committed for CI.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._replay_positions = {}
+
+    @staticmethod
+    def request_key(request: dict) -> str:
+        return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, kind, f"{key}.json")
+
+    def put(self, kind: str, request: dict, response):
+        key = self.request_key(request); path = self._path(kind, key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            entry = {'request': request, 'responses': []}
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f: entry = json.load(f)
+            entry['responses'] = (entry['responses'] + [response])[-MAX_RESPONSES_PER_FIXTURE:]
+            with open(path, 'w', encoding='utf-8') as f: json.dump(entry, f, ensure_ascii=False, indent=1)
+
+    def get(self, kind: str, request: dict):
+        """Next recorded response for `request` (round-robin over recordings). Raises FixtureMissingError."""
+        key = self.request_key(request); path = self._path(kind, key)
+        try:
+            with open(path, encoding='utf-8') as f: responses = json.load(f)['responses']
+        except (OSError, ValueError, KeyError):
+            raise FixtureMissingError(f"No recorded {kind} response for {json.dumps(request, sort_keys=True)[:200]}")
+        with self._lock:
+            position = self._replay_positions.get((kind, key), 0)
+            self._replay_positions[(kind, key)] = position + 1
+        return responses[position % len(responses)]
+
+
+class LatencyModel:
+    """
+    Injected latency, parsed from a spec string: '' (none), 'fixed:SECONDS', 'uniform:LOW:HIGH' or
+    'lognormal:MEDIAN:SIGMA' (heavy right tail, like real API latencies). `seed` makes runs repeatable.
+    """
+
+    def __init__(self, spec: str = '', seed=None):
+        self.spec = spec or ''
+        self._random = random.Random(seed)
+        parts = self.spec.split(':') if self.spec else ['none']
+        self.kind = parts[0]
+        self.args = [float(p) for p in parts[1:]]
+        if self.kind not in ('none', 'fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency model '{self.spec}'")
+
+    def sample(self) -> float:
+        if self.kind == 'fixed': return self.args[0]
+        if self.kind == 'uniform': return self._random.uniform(self.args[0], self.args[1])
+        if self.kind == 'lognormal': return self._random.lognormvariate(0, self.args[1]) * self.args[0]
+        return 0.0
+
+    def sleep(self):
+        delay = self.sample()
+        if delay > 0: time.sleep(delay)
+
+
+def wiki_request_params(url: str) -> dict:
+    """
+    Canonical fixture key for a MediaWiki API GET: its query parameters without the volatile ones.
+    Multi-title lists are sorted (candidates are shuffled before validation, the response doesn't depend on order).
+    """
+    params = {k: v for k, v in parse_qsl(urlsplit(url).query, keep_blank_values=True) if k not in VOLATILE_WIKI_PARAMS}
+    if 'titles' in params:
+        params['titles'] = '|'.join(sorted(params['titles'].split('|')))
+    return params
+
+
+class RecordingWikipediaAdapter(HTTPAdapter):
+    """Transport adapter that performs real requests and saves every successful API response to the store."""
+
+    def __init__(self, store: FixtureStore, **kwargs):
+        self.store = store
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code == 200:
+            try: self.store.put('wikipedia', wiki_request_params(request.url), response.json())
+            except ValueError: pass
+        return response
+
+
+class ReplayWikipediaAdapter(BaseAdapter):
+    """
+    Transport adapter answering from recorded fixtures with no network. WikipediaClient's retries,
+    rate limiter and breaker still run on top of it. Unknown requests get HTTP 404; `error_rate` of
+    requests get `error_status` (503 by default, so the retry/breaker paths are exercised too).
+    """
+
+    def __init__(self, store: FixtureStore, latency: LatencyModel = None, error_rate: float = 0.0, error_status: int = 503, seed=None):
+        super().__init__()
+        self.store = store
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+
+    def send(self, request, **kwargs):
+        self.latency.sleep()
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self._response(request, self.error_status, {'error': {'code': 'injected', 'info': 'Injected replay error'}})
+        try:
+            return self._response(request, 200, self.store.get('wikipedia', wiki_request_params(request.url)))
+        except FixtureMissingError as e:
+            print(f"Replay miss: {e}")
+            return self._response(request, 404, {'error': {'code': 'fixture-missing', 'info': str(e)}})
+
+    @staticmethod
+    def _response(request, status_code, payload):
+        response = requests.models.Response()
+        response.status_code = status_code
+        response._content = json.dumps(payload).encode('utf-8')
+        response.headers = CaseInsensitiveDict({'Content-Type': 'application/json; charset=utf-8'})
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def gemini_request(prompt, kwargs) -> dict:
+    """Fixture key for a generate_content call: the prompt and whether structured (JSON) output was requested."""
+    return {'prompt': prompt, 'structured': kwargs.get('generation_config') is not None}
+
+
+class RecordedGeminiResponse:
+    """Minimal stand-in for a GenerateContentResponse: just `.text`, which is all the app reads."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class RecordingGeminiModel:
+    """Wraps a live GenerativeModel and saves every successful response's text to the store."""
+
+    def __init__(self, model, store: FixtureStore):
+        self.model = model
+        self.store = store
+
+    def generate_content(self, prompt, **kwargs):
+        response = self.model.generate_content(prompt, **kwargs)
+        try: self.store.put('gemini', gemini_request(prompt, kwargs), {'text': response.text})
+        except ValueError: pass # Blocked/empty responses have no text; nothing to record
+        return response
+
+
+class ReplayGeminiModel:
+    """
+    GenerativeModel stand-in answering from recorded fixtures, with injected latency and errors.
+    With `synthesize_missing`, prompts that were never recorded get a deterministic, well-formed answer
+    (question prompts in the requested format, the topic itself for category prompts), so load tests can
+    run against pages that weren't part of the recording.
+    """
+
+    def __init__(self, store: FixtureStore, latency: LatencyModel = None, error_rate: float = 0.0, synthesize_missing: bool = True, seed=None):
+        self.store = store
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.synthesize_missing = synthesize_missing
+        self._random = random.Random(seed)
+
+    def generate_content(self, prompt, **kwargs):
+        self.latency.sleep()
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise InjectedBackendError("503 Service Unavailable (injected replay error)")
+        request = gemini_request(prompt, kwargs)
+        try:
+            return RecordedGeminiResponse(self.store.get('gemini', request)['text'])
+        except FixtureMissingError:
+            if not self.synthesize_missing: raise
+        return RecordedGeminiResponse(synthesize_gemini_text(prompt, request['structured']))
+
+
+def synthesize_gemini_text(prompt: str, structured: bool) -> str:
+    topic = re.search(r"User topic query: '(.*)'", prompt)
+    if topic:
+        return topic.group(1).strip().title()
+    seed = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8], 16)
+    questions_per_article = int((re.search(r"Create (\d+) different", prompt) or [None, 1])[1])
+    article_numbers = [int(n) for n in re.findall(r"^Article (\d+):$", prompt, re.MULTILINE)] or [1]
+    items = []
+    for article_number in article_numbers:
+        for index in range(questions_per_article):
+            number = seed + article_number * 100 + index
+            items.append({'article_number': article_number, 'question': f"Synthetic replay question #{number}?",
+                          'options': {letter: f"Option {letter} {number}" for letter in 'ABCD'},
+                          'correct_answer': 'ABCD'[number % 4]})
+    if structured:
+        return json.dumps({'questions': items})
+    return "\n\n".join(f"Article: {q['article_number']}\nQuestion: {q['question']}\n" + "\n".join(f"{l}) {o}" for l, o in q['options'].items()) + f"\nCorrect Answer: {q['correct_answer']}" for q in items)
@@ -0,0 +1,129 @@
+# category_cache.py
+
+import threading
+import time
+from datetime import datetime
+from cachetools import TTLCache
+from sqlalchemy.exc import IntegrityError
+
+from models import db, CategoryStandardization
+from single_flight import SingleFlight
+
+INPUT_KEY_MAX_LENGTH = 255 # CategoryStandardization.input_key column size
+
+
+def normalize_category_input(text: str) -> str:
+    """Cache key for raw custom-category text: case-folded, whitespace collapsed, surrounding punctuation dropped."""
+    return ' '.join((text or '').casefold().split()).strip(' .,;:!?"\'')
+
+
+class CategoryStandardizationCache:
+    """
+    Custom-category text -> standardized search term, so repeat themes skip the Gemini round trip.
+    A per-process TTL'd LRU sits in front of the category_standardizations table (shared by all workers,
+    editable in the admin). Concurrent misses for the same key make a single Gemini call (single-flight).
+    Hit counts are buffered in memory and flushed to the table in small batches. DB access needs an app context.
+    """
+
+    def __init__(self, memory_maxsize=1024, memory_ttl_seconds=3600, hit_flush_threshold=25, hit_flush_interval_seconds=60):
+        self._memory = TTLCache(maxsize=memory_maxsize, ttl=memory_ttl_seconds) # input_key -> standardized_term
+        self._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        self._pending_hits = {} # input_key -> hits not yet written to the table
+        self._last_flush = time.monotonic()
+        self.hit_flush_threshold = hit_flush_threshold
+        self.hit_flush_interval_seconds = hit_flush_interval_seconds
+        self.counters = {'memory_hits': 0, 'db_hits': 0, 'coalesced': 0, 'misses': 0, 'failures': 0}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self._memory)
+            stats['pending_hits'] = sum(self._pending_hits.values())
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['coalesced'] + stats['misses'] + stats['failures']
+        stats['hit_rate'] = round((lookups - stats['misses'] - stats['failures']) / lookups, 3) if lookups else None
+        return stats
+
+    def get_or_standardize(self, raw_text: str, standardize_fn):
+        """
+        Returns the standardized term for `raw_text`, calling `standardize_fn(raw_text) -> term or None` on a miss.
+        None (standardization failed) is returned as-is and not cached, so the next request retries.
+        """
+        input_key = normalize_category_input(raw_text)
+        if not input_key or len(input_key) > INPUT_KEY_MAX_LENGTH:
+            return standardize_fn(raw_text)
+
+        with self._lock:
+            term = self._memory.get(input_key)
+            if term is not None:
+                self.counters['memory_hits'] += 1
+        if term is not None:
+            self._record_hit(input_key)
+            return term
+
+        term, shared = self._single_flight.do(input_key, lambda: self._load_or_standardize(input_key, raw_text, standardize_fn))
+        if shared and term is not None:
+            with self._lock:
+                self.counters['coalesced'] += 1
+            self._record_hit(input_key)
+        return term
+
+    def _load_or_standardize(self, input_key, raw_text, standardize_fn):
+        try:
+            entry = CategoryStandardization.query.filter_by(input_key=input_key).first()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Category standardization cache DB read failed for '{input_key}': {e}")
+            entry = None
+        if entry:
+            with self._lock:
+                self._memory[input_key] = entry.standardized_term
+                self.counters['db_hits'] += 1
+            self._record_hit(input_key)
+            return entry.standardized_term
+
+        term = standardize_fn(raw_text)
+        with self._lock:
+            self.counters['misses' if term else 'failures'] += 1
+        if not term:
+            return None
+        with self._lock:
+            self._memory[input_key] = term
+        try:
+            db.session.add(CategoryStandardization(input_key=input_key, sample_input=raw_text.strip()[:INPUT_KEY_MAX_LENGTH], standardized_term=term))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback() # Another worker standardized the same text concurrently; either term is fine.
+        except Exception as e:
+            db.session.rollback()
+            print(f"Category standardization cache DB write failed for '{input_key}': {e}")
+        return term
+
+    def _record_hit(self, input_key):
+        with self._lock:
+            self._pending_hits[input_key] = self._pending_hits.get(input_key, 0) + 1
+            due = (sum(self._pending_hits.values()) >= self.hit_flush_threshold
+                   or time.monotonic() - self._last_flush >= self.hit_flush_interval_seconds)
+        if due:
+            self.flush_hits()
+
+    def flush_hits(self):
+        """Writes buffered hit counts to the table (one UPDATE per key). Returns the number of hits written."""
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            now = datetime.utcnow()
+            for input_key, hits in pending.items():
+                CategoryStandardization.query.filter_by(input_key=input_key).update({
+                    CategoryStandardization.hit_count: CategoryStandardization.hit_count + hits,
+                    CategoryStandardization.last_used_at: now
+                }, synchronize_session=False)
+            db.session.commit()
+            return sum(pending.values())
+        except Exception as e:
+            db.session.rollback()
+            print(f"Category standardization hit count flush failed: {e}")
+            return 0
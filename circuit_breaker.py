@@ -0,0 +1,118 @@
+# circuit_breaker.py
+
+import threading
+import time
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, breaker_name, retry_after_seconds):
+        self.breaker_name = breaker_name
+        self.retry_after_seconds = retry_after_seconds
+        super().__init__(f"{breaker_name} circuit is open; retry in {retry_after_seconds:.0f}s.")
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker. Closed: calls pass, `failure_threshold` consecutive failures open it.
+    Open: calls fail fast for `recovery_seconds`. Half-open: up to `half_open_max_calls` probe calls pass;
+    a successful probe closes the breaker, a failed one re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_seconds=30, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self.counters = {'successes': 0, 'failures': 0, 'short_circuited': 0, 'times_opened': 0}
+        self.last_error = None
+
+    def configure(self, failure_threshold=None, recovery_seconds=None):
+        if failure_threshold is not None: self.failure_threshold = max(1, failure_threshold)
+        if recovery_seconds is not None: self.recovery_seconds = max(1, recovery_seconds)
+
+    def _current_state(self):
+        """State with the open -> half-open transition applied. Caller holds the lock."""
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self._state = STATE_HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def retry_after_seconds(self) -> float:
+        with self._lock:
+            if self._current_state() != STATE_OPEN: return 0.0
+            return max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at))
+
+    def is_open(self) -> bool:
+        """True while calls would be short-circuited (doesn't use up a half-open probe)."""
+        with self._lock:
+            state = self._current_state()
+            return state == STATE_OPEN or (state == STATE_HALF_OPEN and self._half_open_calls >= self.half_open_max_calls)
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now. In half-open state each allowed call uses up a probe slot."""
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self.counters['short_circuited'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.counters['successes'] += 1
+            self._consecutive_failures = 0
+            if self._state != STATE_CLOSED:
+                print(f"Circuit breaker '{self.name}' closed again.")
+            self._state = STATE_CLOSED
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.counters['failures'] += 1
+            self._consecutive_failures += 1
+            self.last_error = str(error)[:200] if error is not None else None
+            state = self._current_state()
+            if state == STATE_HALF_OPEN or (state == STATE_CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+                self.counters['times_opened'] += 1
+                print(f"Circuit breaker '{self.name}' opened after {self._consecutive_failures} consecutive failure(s): {self.last_error}")
+
+    def call(self, fn, *args, **kwargs):
+        """Runs `fn` through the breaker. Raises CircuitOpenError without calling `fn` while open."""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after_seconds())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = {'state': self._current_state(), 'consecutive_failures': self._consecutive_failures,
+                     'failure_threshold': self.failure_threshold, 'recovery_seconds': self.recovery_seconds}
+            stats.update(self.counters)
+            stats['retry_in_seconds'] = round(max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at)), 1) if stats['state'] == STATE_OPEN else None
+            stats['last_error'] = self.last_error
+        return stats
@@ -0,0 +1,98 @@
+# context_extraction.py
+
+import hashlib
+import re
+import threading
+from cachetools import LRUCache
+
+# Sentence ends at . ! or ? (optionally followed by a closing quote/bracket) and whitespace before an upper-case
+# letter, digit or opening quote. Common abbreviations and initials ("St.", "J. R. R.") are not treated as ends.
+SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]?\s+(?=["\'(\[]?[A-Z0-9])')
+NON_TERMINAL_ABBREVIATIONS = {'st', 'mr', 'mrs', 'ms', 'dr', 'jr', 'sr', 'mt', 'ft', 'no', 'vs', 'inc', 'ltd', 'co', 'gen', 'col', 'lt', 'sgt', 'capt', 'prof', 'rev', 'ca', 'c', 'approx', 'u.s', 'e.g', 'i.e'}
+
+YEAR = re.compile(r'\b(1[0-9]{3}|20[0-9]{2})s?\b|\b[0-9]+ (?:BC|BCE|AD|CE)\b')
+NUMBER = re.compile(r'\b\d[\d,.]*\b(?:\s*(?:%|percent|km|kilometres|kilometers|miles|metres|meters|m|kg|tonnes|million|billion|people|inhabitants))?')
+PROPER_NOUN = re.compile(r'(?<![.!?]\s)(?<!^)\b[A-Z][a-z]+(?:\s+(?:of|the|de|von|van)?\s*[A-Z][a-z]+)*')
+TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate (no tokenizer call): ~4 characters per token for English prose,
+    but never fewer than one token per word or punctuation mark.
+    """
+    return max(len(TOKEN_PIECE.findall(text)), (len(text) + 3) // 4)
+
+
+def split_sentences(text: str):
+    """Splits prose into sentences, re-joining splits made after abbreviations and initials."""
+    sentences = []
+    for piece in SENTENCE_END.split(' '.join(text.split())):
+        last_word = sentences[-1].rsplit(' ', 1)[-1].rstrip('.').lower() if sentences else ''
+        if sentences and (last_word in NON_TERMINAL_ABBREVIATIONS or len(last_word) == 1):
+            sentences[-1] += ' ' + piece
+        elif piece:
+            sentences.append(piece)
+    return sentences
+
+
+def fact_density(sentence: str) -> float:
+    """Facts (years, numbers/quantities, named entities) per estimated token; years count double."""
+    facts = 2 * len(YEAR.findall(sentence)) + len(NUMBER.findall(sentence)) + len(PROPER_NOUN.findall(sentence))
+    return facts / estimate_tokens(sentence)
+
+
+def extract_context(text: str, token_budget: int) -> str:
+    """
+    The most fact-dense whole sentences of `text` that fit in `token_budget` estimated tokens, in their original order.
+    The lead sentence (which names and defines the subject) is always kept, sentences without any facts never are;
+    text already within budget is returned as is.
+    """
+    text = ' '.join((text or '').split())
+    if estimate_tokens(text) <= token_budget: return text
+    sentences = split_sentences(text)
+    if not sentences: return text
+    costs = [estimate_tokens(s) for s in sentences]
+    chosen = {0}; used = costs[0]
+    if used > token_budget: # One enormous lead sentence: cut it at a word boundary instead
+        return text[:token_budget * 4].rsplit(' ', 1)[0]
+    densities = [fact_density(s) for s in sentences]
+    for index in sorted(range(1, len(sentences)), key=lambda i: densities[i], reverse=True):
+        if densities[index] > 0 and used + costs[index] <= token_budget: # Fact-free filler is never worth tokens
+            chosen.add(index); used += costs[index]
+    return ' '.join(sentences[i] for i in sorted(chosen))
+
+
+class ContextCache:
+    """
+    In-process LRU memo of extract_context results, keyed by (title, revision id, token budget). Pages without a
+    revision id (e.g. from the local article index) are keyed by a hash of their text instead.
+    """
+
+    def __init__(self, maxsize=4096):
+        self._entries = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'tokens_in': 0, 'tokens_out': 0}
+
+    def get(self, title: str, revision_id, text: str, token_budget: int) -> str:
+        version = revision_id if revision_id is not None else hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+        key = (title, version, token_budget)
+        with self._lock:
+            context = self._entries.get(key)
+            if context is not None:
+                self.counters['hits'] += 1
+                return context
+        context = extract_context(text, token_budget)
+        with self._lock:
+            self._entries[key] = context
+            self.counters['misses'] += 1
+            self.counters['tokens_in'] += estimate_tokens(text or '')
+            self.counters['tokens_out'] += estimate_tokens(context)
+        return context
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+        stats['token_reduction'] = round(1 - stats['tokens_out'] / stats['tokens_in'], 3) if stats['tokens_in'] else None
+        return stats
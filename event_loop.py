@@ -0,0 +1,53 @@
+# event_loop.py
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundEventLoop:
+    """
+    One asyncio event loop running in a daemon thread, so sync (WSGI) code can run coroutines with a deadline:
+    `run(coro_fn, timeout)` blocks the caller until the coroutine finishes or the deadline cancels it.
+    Blocking I/O (requests, the Gemini SDK, SQLAlchemy) is awaited with `run_blocking`, which runs it on the
+    loop's own thread pool. Cancelled blocking calls cannot be interrupted; they finish in the background
+    and their results are dropped. The loop is (re)started lazily per process, so forked workers get their own.
+    """
+
+    def __init__(self, max_blocking_workers=32, name='generation-loop'):
+        self.max_blocking_workers = max_blocking_workers
+        self.name = name
+        self._loop = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return self._loop
+            self._loop = asyncio.new_event_loop()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_blocking_workers, thread_name_prefix=f'{self.name}-io')
+            self._loop.set_default_executor(self._executor)
+            self._pid = os.getpid()
+            threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True).start()
+            return self._loop
+
+    def run(self, coro_fn, timeout: float, *args, **kwargs):
+        """
+        Runs `coro_fn(*args, **kwargs)` on the loop and returns its result.
+        Raises TimeoutError once `timeout` seconds pass (the coroutine is cancelled first).
+        """
+        loop = self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(asyncio.wait_for(coro_fn(*args, **kwargs), timeout), loop)
+        try:
+            return future.result(timeout + 1) # wait_for fires first; the extra second only guards a stuck loop
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        """Awaitable wrapper around a blocking call, executed on the loop's thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,113 @@
+# gemini_client.py
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class HedgedGeminiClient:
+    """
+    Drop-in wrapper around a genai.GenerativeModel that hedges slow calls: when a call with `hedge=True` hasn't
+    returned after the configured percentile of recent latencies, an identical second call is started and
+    whichever succeeds first wins (the loser can't be cancelled and is discarded when it finishes).
+    Spend is bounded per call (`max_hedges_per_call`) and globally: every call earns `budget_ratio` hedge
+    tokens (capped at `budget_burst`) and every hedge spends one, so hedges stay under ~budget_ratio of traffic.
+    """
+
+    def __init__(self, model, percentile=95.0, min_delay_seconds=0.5, max_delay_seconds=5.0, default_delay_seconds=2.0,
+                 max_hedges_per_call=1, budget_ratio=0.1, budget_burst=5, max_workers=16, latency_window=200, min_samples=20):
+        self.model = model
+        self.enabled = True
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.default_delay_seconds = default_delay_seconds
+        self.max_hedges_per_call = max_hedges_per_call
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=latency_window) # Seconds, successful hedge-eligible primary calls
+        self._budget_tokens = float(budget_burst)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gemini-hedge')
+        self._lock = threading.Lock()
+        self.counters = {'calls': 0, 'hedge_eligible': 0, 'hedged': 0, 'hedge_wins': 0, 'budget_denied': 0, 'errors': 0}
+
+    def configure(self, enabled=None, percentile=None, budget_ratio=None, max_hedges_per_call=None):
+        if enabled is not None: self.enabled = enabled
+        if percentile is not None: self.percentile = min(99.9, max(50.0, percentile))
+        if budget_ratio is not None: self.budget_ratio = max(0.0, budget_ratio)
+        if max_hedges_per_call is not None: self.max_hedges_per_call = max(0, max_hedges_per_call)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait before hedging: the configured percentile of recent latencies, clamped."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay_seconds
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100.0))
+        return min(self.max_delay_seconds, max(self.min_delay_seconds, samples[index]))
+
+    def _take_hedge_token(self) -> bool:
+        with self._lock:
+            if self._budget_tokens >= 1:
+                self._budget_tokens -= 1
+                self.counters['hedged'] += 1
+                return True
+            self.counters['budget_denied'] += 1
+            return False
+
+    def _timed_call(self, prompt, kwargs):
+        started = time.monotonic()
+        response = self.model.generate_content(prompt, **kwargs)
+        return response, time.monotonic() - started
+
+    def generate_content(self, prompt, hedge=False, **kwargs):
+        """Same contract as GenerativeModel.generate_content; `hedge=True` marks latency-sensitive calls."""
+        with self._lock:
+            self.counters['calls'] += 1
+            if hedge: self.counters['hedge_eligible'] += 1
+            self._budget_tokens = min(self.budget_burst, self._budget_tokens + self.budget_ratio)
+        if not (hedge and self.enabled and self.max_hedges_per_call > 0):
+            try: return self.model.generate_content(prompt, **kwargs)
+            except Exception:
+                with self._lock: self.counters['errors'] += 1
+                raise
+
+        primary = self._executor.submit(self._timed_call, prompt, kwargs)
+        primary.add_done_callback(self._record_latency) # Also when a hedge won, so slow primaries keep the percentile honest
+        pending = {primary}; hedges = 0; may_hedge = True; last_error = None
+        delay = self.hedge_delay()
+        while pending:
+            may_hedge = may_hedge and hedges < self.max_hedges_per_call
+            done, pending = wait(pending, timeout=delay if may_hedge else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                try: response, _ = future.result()
+                except Exception as e:
+                    last_error = e; continue
+                if future is not primary:
+                    with self._lock: self.counters['hedge_wins'] += 1
+                return response
+            if not done and may_hedge:
+                if not self._take_hedge_token():
+                    may_hedge = False; continue
+                hedges += 1
+                pending.add(self._executor.submit(self._timed_call, prompt, kwargs))
+                print(f"Gemini call still running after {delay:.2f}s; hedging ({hedges}/{self.max_hedges_per_call}).")
+        with self._lock: self.counters['errors'] += 1
+        raise last_error
+
+    def _record_latency(self, future):
+        if future.exception() is None:
+            with self._lock: self._latencies.append(future.result()[1])
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            samples = sorted(self._latencies)
+        stats['hedge_rate'] = round(stats['hedged'] / stats['hedge_eligible'], 3) if stats['hedge_eligible'] else None
+        stats['win_rate'] = round(stats['hedge_wins'] / stats['hedged'], 3) if stats['hedged'] else None
+        stats['hedge_delay_seconds'] = round(self.hedge_delay(), 3)
+        stats['latency_p50_seconds'] = round(samples[len(samples) // 2], 3) if samples else None
+        stats['latency_p99_seconds'] = round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3) if samples else None
+        return stats
@@ -0,0 +1,89 @@
+# leaderboard_cache.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import LRUCache
+
+from single_flight import SingleFlight
+
+
+class LeaderboardCache:
+    """
+    In-process cache of leaderboard query results keyed by (view, category, top_n, relevant settings).
+    Fresh entries (younger than `ttl_seconds`) are served without touching the database. Entries up to
+    `stale_seconds` past their TTL are still served while one background refresh recomputes them
+    (stale-while-revalidate); older or missing entries are recomputed inline, and concurrent misses for
+    the same key share a single computation (single flight). Cached values must not hold ORM instances
+    bound to a session (query rows of plain columns are fine).
+    """
+
+    def __init__(self, app, ttl_seconds=30, stale_seconds=300, maxsize=256, refresh_workers=2):
+        self.app = app
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._entries = LRUCache(maxsize=maxsize) # key -> (computed_at_monotonic, value)
+        self._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        self._refreshing = set()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='leaderboard-refresh')
+        self.counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'shared_misses': 0, 'refreshes': 0, 'refresh_errors': 0}
+
+    def configure(self, ttl_seconds=None, stale_seconds=None):
+        if ttl_seconds is not None: self.ttl_seconds = ttl_seconds
+        if stale_seconds is not None: self.stale_seconds = stale_seconds
+
+    def get_or_compute(self, key, compute_fn):
+        """Cached value for `key`, calling `compute_fn()` (needs an app context; runs in the caller's) on a miss."""
+        if self.ttl_seconds <= 0: return compute_fn() # Caching disabled
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            age = now - cached[0] if cached else None
+            if cached and age < self.ttl_seconds:
+                self.counters['hits'] += 1
+                return cached[1]
+            if cached and age < self.ttl_seconds + self.stale_seconds:
+                self.counters['stale_hits'] += 1
+                start_refresh = key not in self._refreshing
+                if start_refresh: self._refreshing.add(key)
+            else:
+                start_refresh = None
+        if start_refresh is not None: # Stale: serve it, refresh in the background (at most one refresh per key)
+            if start_refresh: self._refresh_executor.submit(self._refresh, key, compute_fn)
+            return cached[1]
+        value, shared = self._single_flight.do(key, lambda: self._compute_and_store(key, compute_fn))
+        with self._lock:
+            self.counters['shared_misses' if shared else 'misses'] += 1
+        return value
+
+    def _compute_and_store(self, key, compute_fn):
+        value = compute_fn()
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def _refresh(self, key, compute_fn):
+        try:
+            with self.app.app_context():
+                self._single_flight.do(key, lambda: self._compute_and_store(key, compute_fn))
+            with self._lock: self.counters['refreshes'] += 1
+        except Exception as e:
+            with self._lock: self.counters['refresh_errors'] += 1
+            print(f"Leaderboard cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock: self._refreshing.discard(key)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+            stats['ttl_seconds'] = self.ttl_seconds
+            stats['stale_seconds'] = self.stale_seconds
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses'] + stats['shared_misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['stale_hits']) / lookups, 3) if lookups else None
+        return stats
@@ -0,0 +1,218 @@
+# leaderboard_queries.py
+
+import time
+from collections import namedtuple
+from sqlalchemy import and_, asc, case, desc, func, or_, select
+
+from models import db, User, Response, GameSummary, UserStats
+from synthetic_data import seed_synthetic_play
+
+LifetimeScoreRow = namedtuple('LifetimeScoreRow', 'nickname total_score_val total_questions_answered entry_id')
+LifetimeAccuracyRow = namedtuple('LifetimeAccuracyRow', 'nickname accuracy_val total_questions_answered entry_id')
+LifetimeBrierRow = namedtuple('LifetimeBrierRow', 'nickname average_brier_val total_questions_answered entry_id')
+
+
+class LeaderboardMetric:
+    """
+    One leaderboard: `build(category, min_questions, min_games)` returns a select whose columns carry the labels the
+    templates use, plus `entry_id` (user id, or game id for per-game boards) as the tie-breaker of the ordering.
+    """
+    __slots__ = ('value_label', 'descending', 'build')
+
+    def __init__(self, value_label, descending, build):
+        self.value_label = value_label
+        self.descending = descending
+        self.build = build
+
+
+def _lifetime_board(value_column, label, count_column, descending, eligible):
+    return LeaderboardMetric(label, descending, lambda category, min_questions, min_games: select(
+        User.nickname, value_column.label(label), count_column.label('total_questions_answered'), UserStats.user_id.label('entry_id')
+    ).join(User, User.id == UserStats.user_id).where(*eligible(min_questions)))
+
+
+def _game_board(value_column, label, descending, category_filter):
+    def build(category, min_questions, min_games):
+        statement = select(User.nickname, value_column.label(label), GameSummary.game_category, GameSummary.completed_at,
+                           GameSummary.id.label('entry_id')).join(User, User.id == GameSummary.user_id).where(value_column.isnot(None))
+        return statement.where(GameSummary.game_category == category) if category_filter else statement
+    return LeaderboardMetric(label, descending, build)
+
+
+def _category_game_brier(category, min_questions, min_games):
+    games = func.count(GameSummary.id)
+    return select(User.nickname, func.avg(GameSummary.average_brier_score).label('avg_game_brier_in_cat'), games.label('num_games_in_cat'),
+                  User.id.label('entry_id')).join(User, User.id == GameSummary.user_id).where(GameSummary.game_category == category)\
+        .group_by(User.id, User.nickname).having(games >= min_games, func.avg(GameSummary.average_brier_score).isnot(None))
+
+
+def _category_accuracy(category, min_questions, min_games):
+    answers = func.count(Response.id)
+    return select(User.nickname, (func.sum(case((Response.is_correct == True, 1), else_=0)) * 100.0 / answers).label('accuracy_in_cat'),
+                  answers.label('questions_in_cat'), User.id.label('entry_id')).join(Response, User.id == Response.user_id)\
+        .where(Response.game_category == category).group_by(User.id, User.nickname).having(answers >= min_questions)
+
+
+LIFETIME_BOARDS = {
+    'score': _lifetime_board(UserStats.points_sum, 'total_score_val', UserStats.answer_count, True, lambda min_questions: (UserStats.answer_count > 0,)),
+    'accuracy': _lifetime_board(UserStats.accuracy, 'accuracy_val', UserStats.answer_count, True,
+                                lambda min_questions: (UserStats.answer_count > 0, UserStats.answer_count >= min_questions)),
+    'brier': _lifetime_board(UserStats.average_brier, 'average_brier_val', UserStats.brier_count, False,
+                             lambda min_questions: (UserStats.brier_count > 0, UserStats.brier_count >= min_questions)),
+    'game_score': _game_board(GameSummary.score, 'game_score', True, category_filter=False),
+    'game_brier': _game_board(GameSummary.average_brier_score, 'game_brier', False, category_filter=False),
+}
+CATEGORY_BOARDS = {
+    'game_score': _game_board(GameSummary.score, 'game_score', True, category_filter=True),
+    'game_brier': LeaderboardMetric('avg_game_brier_in_cat', False, _category_game_brier),
+    'accuracy': LeaderboardMetric('accuracy_in_cat', True, _category_accuracy),
+}
+
+
+def parse_cursor(cursor):
+    """(metric value, entry id) from a "value:entry_id" cursor; ValueError if it's malformed."""
+    value, _, entry_id = (cursor or '').rpartition(':')
+    return float(value), int(entry_id)
+
+
+def leaderboard_page_statement(metric, category=None, cursor=None, limit=25, min_questions=0, min_games=0):
+    """(board, select) for one leaderboard_page() read: `limit` + 1 rows after `cursor`, so the caller can tell if there's more."""
+    board = (CATEGORY_BOARDS if category is not None else LIFETIME_BOARDS)[metric]
+    page = board.build(category, min_questions, min_games).subquery('board')
+    value = page.c[board.value_label]; entry_id = page.c.entry_id
+    statement = select(page)
+    if cursor is not None:
+        after_value, after_id = cursor
+        statement = statement.where(or_(value < after_value, and_(value == after_value, entry_id < after_id)) if board.descending
+                                    else or_(value > after_value, and_(value == after_value, entry_id > after_id)))
+    order = (desc(value), desc(entry_id)) if board.descending else (asc(value), asc(entry_id))
+    return board, statement.order_by(*order).limit(limit + 1)
+
+
+def leaderboard_page(metric, category=None, cursor=None, limit=25, min_questions=0, min_games=0):
+    """
+    One page of a leaderboard (LIFETIME_BOARDS, or CATEGORY_BOARDS when `category` is given), ordered by
+    (value, entry_id) and keyset-paginated: `cursor` is the (value, entry_id) of the previous page's last row, so
+    every page is an index range read however deep it is (the category Brier/accuracy boards are aggregates and
+    recompute them per page, which doesn't grow with depth either). Returns (rows, next cursor or None).
+    """
+    board, statement = leaderboard_page_statement(metric, category, cursor, limit, min_questions, min_games)
+    rows = db.session.execute(statement).all()
+    next_cursor = f"{getattr(rows[limit - 1], board.value_label)!r}:{rows[limit - 1].entry_id}" if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def eligible_categories_query(min_games):
+    """Categories with at least `min_games` games (they get their own leaderboards), most played first."""
+    return db.session.query(
+        GameSummary.game_category,
+        func.count(GameSummary.id).label('total_games_in_category')
+    ).filter(GameSummary.game_category.isnot(None))\
+     .group_by(GameSummary.game_category)\
+     .having(func.count(GameSummary.id) >= min_games)\
+     .order_by(desc('total_games_in_category'), GameSummary.game_category)
+
+def _per_user_from_responses():
+    """One aggregate pass over responses: every per-user lifetime metric."""
+    answer_count = func.count(Response.id)
+    return select(
+        Response.user_id,
+        answer_count.label('answer_count'),
+        (func.sum(case((Response.is_correct == True, 1), else_=0)) * 100.0 / answer_count).label('accuracy'),
+        func.coalesce(func.sum(Response.points_awarded), 0.0).label('points_sum'),
+        func.avg(Response.brier_score).label('average_brier'),
+        func.count(Response.brier_score).label('brier_count')
+    ).group_by(Response.user_id)
+
+
+def _per_user_from_user_stats():
+    return select(UserStats.user_id, UserStats.answer_count, UserStats.accuracy, UserStats.points_sum,
+                  UserStats.average_brier, UserStats.brier_count).where(UserStats.answer_count > 0)
+
+
+def single_scan_lifetime_leaderboards(top_n, min_total_questions_for_ranking, source='user_stats'):
+    """
+    The three lifetime leaderboards from one statement: a per-user CTE (from user_stats, or aggregated from responses
+    when source='responses'), ROW_NUMBER() per metric over it, and one join to users for the rows that make any top N.
+    Ineligible users are ordered last by each window and filtered out. Returns the dict keys the lifetime partials use.
+    """
+    per_user = (_per_user_from_responses() if source == 'responses' else _per_user_from_user_stats()).cte('per_user')
+    accuracy_eligible = per_user.c.answer_count >= min_total_questions_for_ranking
+    brier_eligible = and_(per_user.c.brier_count > 0, per_user.c.brier_count >= min_total_questions_for_ranking)
+    ranked = select(
+        per_user,
+        func.row_number().over(order_by=(desc(per_user.c.points_sum), desc(per_user.c.user_id))).label('score_rank'),
+        func.row_number().over(order_by=(case((accuracy_eligible, 0), else_=1), desc(per_user.c.accuracy), desc(per_user.c.user_id))).label('accuracy_rank'),
+        func.row_number().over(order_by=(case((brier_eligible, 0), else_=1), asc(per_user.c.average_brier), asc(per_user.c.user_id))).label('brier_rank'),
+        case((accuracy_eligible, True), else_=False).label('accuracy_eligible'),
+        case((brier_eligible, True), else_=False).label('brier_eligible')
+    ).cte('ranked')
+    rows = db.session.execute(
+        select(User.nickname, ranked).join(ranked, User.id == ranked.c.user_id)
+        .where(or_(ranked.c.score_rank <= top_n, ranked.c.accuracy_rank <= top_n, ranked.c.brier_rank <= top_n))
+    ).all()
+    return dict(
+        top_lifetime_scores=[LifetimeScoreRow(row.nickname, row.points_sum, row.answer_count, row.user_id)
+                             for row in sorted(rows, key=lambda row: row.score_rank) if row.score_rank <= top_n],
+        top_lifetime_accuracy=[LifetimeAccuracyRow(row.nickname, row.accuracy, row.answer_count, row.user_id)
+                               for row in sorted(rows, key=lambda row: row.accuracy_rank) if row.accuracy_rank <= top_n and row.accuracy_eligible],
+        top_lifetime_brier=[LifetimeBrierRow(row.nickname, row.average_brier, row.brier_count, row.user_id)
+                            for row in sorted(rows, key=lambda row: row.brier_rank) if row.brier_rank <= top_n and row.brier_eligible]
+    )
+
+
+def three_query_lifetime_leaderboards(top_n, min_total_questions_for_ranking):
+    """The pre-user_stats implementation (three GROUP BY passes over responses JOIN users), kept as the benchmark baseline."""
+    top_lifetime_scores = db.session.query(
+        User.nickname, func.sum(Response.points_awarded).label('total_score_val'), func.count(Response.id).label('total_questions_answered')
+    ).join(Response, User.id == Response.user_id).group_by(User.id, User.nickname).order_by(desc('total_score_val')).limit(top_n).all()
+    top_lifetime_accuracy = db.session.query(
+        User.nickname, (func.sum(case((Response.is_correct == True, 1), else_=0)) * 100.0 / func.count(Response.id)).label('accuracy_val'),
+        func.count(Response.id).label('total_questions_answered')
+    ).join(Response, User.id == Response.user_id).group_by(User.id, User.nickname)\
+     .having(func.count(Response.id) >= min_total_questions_for_ranking).order_by(desc('accuracy_val')).limit(top_n).all()
+    top_lifetime_brier = db.session.query(
+        User.nickname, func.avg(Response.brier_score).label('average_brier_val'), func.count(Response.id).label('total_questions_answered')
+    ).join(Response, User.id == Response.user_id).filter(Response.brier_score.isnot(None)).group_by(User.id, User.nickname)\
+     .having(func.count(Response.id) >= min_total_questions_for_ranking).order_by(asc('average_brier_val')).limit(top_n).all()
+    return dict(top_lifetime_scores=top_lifetime_scores, top_lifetime_accuracy=top_lifetime_accuracy, top_lifetime_brier=top_lifetime_brier)
+
+
+def indexed_lifetime_leaderboards(top_n, min_total_questions_for_ranking):
+    """Three top-N reads of user_stats (the first page of each lifetime board), each served by one of its indexes."""
+    return {name: leaderboard_page(metric, limit=top_n, min_questions=min_total_questions_for_ranking)[0]
+            for name, metric in (('top_lifetime_scores', 'score'), ('top_lifetime_accuracy', 'accuracy'), ('top_lifetime_brier', 'brier'))}
+
+
+LIFETIME_LEADERBOARD_VARIANTS = {
+    'three aggregations over responses (before user_stats)': three_query_lifetime_leaderboards,
+    'single scan of responses (CTE + ROW_NUMBER)': lambda top_n, min_questions: single_scan_lifetime_leaderboards(top_n, min_questions, source='responses'),
+    'single scan of user_stats (CTE + ROW_NUMBER)': lambda top_n, min_questions: single_scan_lifetime_leaderboards(top_n, min_questions, source='user_stats'),
+    'three indexed top-N reads of user_stats': indexed_lifetime_leaderboards,
+}
+
+
+def _comparable(leaderboards):
+    """Rounded value lists, to check that every variant returns the same leaderboards (players tied on a value may come in any order)."""
+    return {name: [round(row[1], 6) for row in rows] for name, rows in leaderboards.items()}
+
+
+def benchmark_lifetime_leaderboards(top_n, min_total_questions_for_ranking, users=0, answers_per_user=0, repeat=5):
+    """
+    Times every LIFETIME_LEADERBOARD_VARIANTS entry (best of `repeat`). With `users`, synthetic players/answers
+    (and their user_stats rows) are added first; everything runs in one transaction that is rolled back.
+    Returns ({variant: best seconds}, whether all variants returned the same leaderboards).
+    """
+    try:
+        if users:
+            seed_synthetic_play(users=users, responses_per_user=answers_per_user, games_per_user=0)
+        timings = {}; results = {}
+        for name, variant in LIFETIME_LEADERBOARD_VARIANTS.items():
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter(); leaderboards = variant(top_n, min_total_questions_for_ranking)
+                elapsed = time.perf_counter() - started; best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best; results[name] = _comparable(leaderboards)
+        return timings, all(result == next(iter(results.values())) for result in results.values())
+    finally:
+        db.session.rollback()
@@ -60,11 +60,25 @@ class AppSetting(db.Model):
 
 class GameSummary(db.Model):
     __tablename__ = 'game_summaries'
+    # Leaderboard/profile access paths. The composites' leading columns replace the old single-column
+    # user_id/game_category indexes; partial ones only hold games with a Brier score. Leaderboard orders end
+    # with id, the keyset pagination tie-breaker.
+    __table_args__ = (
+        db.Index('ix_game_summaries_user_score', 'user_id', 'score'),
+        db.Index('ix_game_summaries_category_score', 'game_category', 'score', 'id', postgresql_include=['user_id', 'completed_at']),
+        db.Index('ix_game_summaries_score', 'score', 'id'),
+        db.Index('ix_game_summaries_brier', 'average_brier_score', 'id',
+                 postgresql_where=db.text('average_brier_score IS NOT NULL'), sqlite_where=db.text('average_brier_score IS NOT NULL')),
+        db.Index('ix_game_summaries_user_brier', 'user_id', 'average_brier_score',
+                 postgresql_where=db.text('average_brier_score IS NOT NULL'), sqlite_where=db.text('average_brier_score IS NOT NULL')),
+        db.Index('ix_game_summaries_category_user_brier', 'game_category', 'user_id', 'average_brier_score',
+                 postgresql_where=db.text('average_brier_score IS NOT NULL'), sqlite_where=db.text('average_brier_score IS NOT NULL')),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     user = db.relationship('User', backref=db.backref('game_summaries', lazy='dynamic'))
     
-    game_category = db.Column(db.String(255), nullable=True, index=True) # Same as in Response
+    game_category = db.Column(db.String(255), nullable=True) # Same as in Response
     score = db.Column(db.Float, nullable=False)
     average_brier_score = db.Column(db.Float, nullable=True)
     questions_answered = db.Column(db.Integer, nullable=False) # Should match game_length setting at time of game
@@ -76,19 +90,62 @@ class GameSummary(db.Model):
     def __repr__(self):
         return f'<GameSummary id={self.id} user_id={self.user_id} category="{self.game_category}" score={self.score}>'
 
+class Question(db.Model):
+    """
+    A generated question, banked so that a Wikipedia page revision is only ever sent to Gemini once.
+    Keyed by page title + revision id + hash of the text the question was generated from.
+    """
+    __tablename__ = 'questions'
+    __table_args__ = (
+        db.Index('ix_questions_page_key', 'wiki_page_title', 'wiki_revision_id', 'content_hash'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    wiki_page_title = db.Column(db.String(255), nullable=False)
+    wiki_page_url = db.Column(db.String(500), nullable=True)
+    wiki_revision_id = db.Column(db.BigInteger, nullable=True)
+    content_hash = db.Column(db.String(64), nullable=False) # sha256 hex of the context sent to Gemini
+
+    question_text = db.Column(db.Text, nullable=False)
+    answer_options = db.Column(db.Text, nullable=False) # JSON-encoded {"A": ..., "B": ..., "C": ..., "D": ...}
+    correct_answer = db.Column(db.String(10), nullable=False)
+
+    serve_count = db.Column(db.Integer, default=0, nullable=False)
+    answer_count = db.Column(db.Integer, default=0, nullable=False)
+    correct_count = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<Question id={self.id} title="{self.wiki_page_title}" rev={self.wiki_revision_id} answered={self.answer_count}>'
+
 class Response(db.Model):
     __tablename__ = 'responses'
+    # Covering indexes for the per-user stats (index page, calibration chart) and per-category accuracy
+    # leaderboard; INCLUDE columns are PostgreSQL-only (other databases get the key columns). They replace
+    # the old single-column user_id/game_category indexes.
+    __table_args__ = (
+        db.Index('ix_responses_user_category', 'user_id', 'game_category', postgresql_include=['is_correct', 'brier_score', 'points_awarded']),
+        db.Index('ix_responses_user_confidence', 'user_id', 'user_confidence', postgresql_include=['is_correct']),
+        db.Index('ix_responses_category_user', 'game_category', 'user_id', postgresql_include=['is_correct']),
+        db.Index('ix_responses_user_brier', 'user_id', 'brier_score',
+                 postgresql_where=db.text('brier_score IS NOT NULL'), sqlite_where=db.text('brier_score IS NOT NULL')),
+    )
     id = db.Column(db.Integer, primary_key=True)
     
     # Link to User model
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True) # Changed nullable to False, assume user always exists for a response
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False) # Changed nullable to False, assume user always exists for a response
     user = db.relationship('User', backref=db.backref('responses', lazy='dynamic')) # Or lazy='select' or True
 
     # Remove old session_id if it exists in your version; the prompt version did not have it directly on Response but used session.sid
     # session_id = db.Column(db.String(100), nullable=True, index=True) # REMOVE IF PRESENT
 
+    # Link to the banked Question. Legacy rows (before the question bank) have question_id NULL and keep
+    # the denormalized question_text/answer_options; new rows only store the foreign key.
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=True, index=True)
+    question = db.relationship('Question', backref=db.backref('responses', lazy='dynamic'))
+
     wiki_page_title = db.Column(db.String(255), nullable=False)
-    question_text = db.Column(db.Text, nullable=False)
+    question_text = db.Column(db.Text, nullable=True)
     answer_options = db.Column(db.Text, nullable=True)
     correct_answer = db.Column(db.String(10), nullable=False)
     user_answer = db.Column(db.String(10), nullable=True)
@@ -97,7 +154,7 @@ class Response(db.Model):
     brier_score = db.Column(db.Float, nullable=True)
     points_awarded = db.Column(db.Float, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    game_category = db.Column(db.String(255), nullable=True, index=True)
+    game_category = db.Column(db.String(255), nullable=True)
 
     def __repr__(self):
         return f'<Response id={self.id} user_id={self.user_id} correct={self.is_correct}>'
@@ -131,4 +188,121 @@ class UserFeedback(db.Model):
     admin_notes = db.Column(db.Text, nullable=True)
 
     def __repr__(self):
-        return f'<UserFeedback id={self.id} user_id={self.user_id or "Guest"} type="{self.feedback_type}">'
\ No newline at end of file
+        return f'<UserFeedback id={self.id} user_id={self.user_id or "Guest"} type="{self.feedback_type}">'
+
+class QuestionPoolItem(db.Model):
+    """A pre-generated, validated question waiting to be served for a game category."""
+    __tablename__ = 'question_pool'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Same value as the game category stored on Response/GameSummary (e.g. "General Knowledge", "Custom: Dinosaurs")
+    pool_category = db.Column(db.String(255), nullable=False, index=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=True)
+
+    wiki_page_title = db.Column(db.String(255), nullable=False)
+    wiki_page_url = db.Column(db.String(500), nullable=True)
+    question_text = db.Column(db.Text, nullable=False)
+    answer_options = db.Column(db.Text, nullable=False) # JSON-encoded {"A": ..., "B": ..., "C": ..., "D": ...}
+    correct_answer = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<QuestionPoolItem id={self.id} category="{self.pool_category}" title="{self.wiki_page_title}">'
+
+
+class WikiPageCacheEntry(db.Model):
+    """On-disk tier of the Wikipedia page cache (see wiki_cache.py). One compact record per looked-up title."""
+    __tablename__ = 'wiki_page_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    title_key = db.Column(db.String(255), unique=True, nullable=False, index=True) # Normalized lookup title
+    title = db.Column(db.String(255), nullable=True) # Canonical title as returned by Wikipedia (after redirects)
+    page_exists = db.Column(db.Boolean, nullable=False, default=True) # False = negative cache entry
+    fullurl = db.Column(db.String(500), nullable=True)
+    summary = db.Column(db.Text, nullable=True)
+    word_count = db.Column(db.Integer, nullable=False, default=0)
+    section_count = db.Column(db.Integer, nullable=False, default=0)
+    is_disambiguation = db.Column(db.Boolean, nullable=False, default=False)
+    is_stub = db.Column(db.Boolean, nullable=False, default=False)
+    revision_id = db.Column(db.BigInteger, nullable=True)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<WikiPageCacheEntry "{self.title_key}" rev={self.revision_id} exists={self.page_exists}>'
+
+
+class CategoryStandardization(db.Model):
+    """Cached Gemini standardization of a custom category, keyed by the normalized user input (see category_cache.py)."""
+    __tablename__ = 'category_standardizations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    input_key = db.Column(db.String(255), unique=True, nullable=False, index=True) # Case-folded, whitespace-collapsed user text
+    sample_input = db.Column(db.String(255), nullable=True) # First raw text seen for this key, for the admin list
+    standardized_term = db.Column(db.String(255), nullable=False)
+    hit_count = db.Column(db.Integer, nullable=False, default=0) # Lookups answered from the cache (not counting the first)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<CategoryStandardization "{self.input_key}" -> "{self.standardized_term}" hits={self.hit_count}>'
+
+
+class QuestionJob(db.Model):
+    """A live question generation running in the background for one user (see question_jobs.py)."""
+    __tablename__ = 'question_jobs'
+
+    id = db.Column(db.String(32), primary_key=True) # uuid4 hex, handed to the client for polling
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    game_category = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True) # pending / ready / failed / claimed
+    question_data = db.Column(db.Text, nullable=True) # JSON-encoded question_data dict once ready
+    error_message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<QuestionJob {self.id} user_id={self.user_id} status={self.status}>'
+
+
+class SettingsVersion(db.Model):
+    """Single row (id=1) whose version is bumped on every AppSetting change; workers reload their settings snapshot when it moves."""
+    __tablename__ = 'settings_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<SettingsVersion {self.version}>'
+
+
+class UserStats(db.Model):
+    """
+    Lifetime aggregates of one user's responses and completed games, updated in the same transaction as every
+    answer (see user_stats.py) so the lifetime leaderboards are top-N reads of one row per user.
+    Backfilled by its migration; rebuilt from responses/game_summaries with `flask rebuild-user-stats`.
+    """
+    __tablename__ = 'user_stats'
+    # (metric, user_id): the leaderboard order including its tie-breaker, so keyset pages are index range reads
+    __table_args__ = (
+        db.Index('ix_user_stats_points_sum_user', 'points_sum', 'user_id'),
+        db.Index('ix_user_stats_accuracy_user', 'accuracy', 'user_id'),
+        db.Index('ix_user_stats_average_brier_user', 'average_brier', 'user_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    user = db.relationship('User', backref=db.backref('lifetime_stats', uselist=False))
+    answer_count = db.Column(db.Integer, nullable=False, default=0)
+    correct_count = db.Column(db.Integer, nullable=False, default=0)
+    brier_sum = db.Column(db.Float, nullable=False, default=0.0)
+    brier_count = db.Column(db.Integer, nullable=False, default=0) # Responses with a Brier score
+    points_sum = db.Column(db.Float, nullable=False, default=0.0)
+    games_played = db.Column(db.Integer, nullable=False, default=0)
+    # Derived from the counters above on every update, stored so the leaderboards can sort on an index
+    accuracy = db.Column(db.Float, nullable=True) # Percent correct
+    average_brier = db.Column(db.Float, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<UserStats user_id={self.user_id} answers={self.answer_count} points={self.points_sum}>'
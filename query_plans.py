@@ -0,0 +1,76 @@
+# query_plans.py
+
+import re
+from sqlalchemy import func, text
+
+from models import db, Response
+from stats_queries import lifetime_totals_query, category_stats_query, best_game_score_query, best_game_brier_query, calibration_responses_query
+from leaderboard_queries import eligible_categories_query, leaderboard_page_statement, LIFETIME_BOARDS, CATEGORY_BOARDS
+from rank_index import best_game_per_user_query
+from synthetic_data import seed_synthetic_play, SYNTHETIC_CATEGORIES
+
+# Tables that grow with play (user_stats: one row per player); a full scan of any is a regression (users are looked up by key).
+# The rank index build reads all of user_stats on purpose and isn't checked.
+HOT_TABLES = ('responses', 'game_summaries', 'user_stats')
+PLAN_CHECK_CATEGORY = SYNTHETIC_CATEGORIES[0]
+PLAN_CHECK_MIN_QUESTIONS = 10
+PLAN_CHECK_MIN_GAMES = 2
+PLAN_CHECK_CURSOR = (0.5, 100) # (value, entry id) of a previous page's last row
+
+
+def hot_queries(user_id, category):
+    """
+    {name: query} for the per-user/per-category reads of index(), get_calibration_data() and the rank index build,
+    and every leaderboard page (each LIFETIME_BOARDS/CATEGORY_BOARDS entry, first page and a page after a cursor).
+    """
+    queries = {
+        'index: lifetime totals': lifetime_totals_query(user_id),
+        'index: per-category stats': category_stats_query(user_id),
+        'index: personal best game score': best_game_score_query(user_id),
+        'index: personal best game Brier': best_game_brier_query(user_id),
+        'calibration: lifetime confidences': calibration_responses_query(user_id),
+        'leaderboard: eligible categories': eligible_categories_query(PLAN_CHECK_MIN_GAMES),
+        'rank index: best game per user': best_game_per_user_query(),
+    }
+    for scope, boards, board_category in (('leaderboard', LIFETIME_BOARDS, None), ('category', CATEGORY_BOARDS, category)):
+        for metric in boards:
+            for page, cursor in (('first page', None), ('after cursor', PLAN_CHECK_CURSOR)):
+                queries[f'{scope}: {metric}, {page}'] = leaderboard_page_statement(
+                    metric, board_category, cursor, min_questions=PLAN_CHECK_MIN_QUESTIONS, min_games=PLAN_CHECK_MIN_GAMES)[1]
+    return queries
+
+
+def explain(query):
+    """Plan lines of `query` (ORM query or select) on the session's connection (EXPLAIN on PostgreSQL, EXPLAIN QUERY PLAN on SQLite)."""
+    dialect = db.engine.dialect
+    sql = str(getattr(query, 'statement', query).compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    if dialect.name == 'sqlite':
+        return [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+    return [row[0] for row in db.session.execute(text('EXPLAIN ' + sql))]
+
+
+def full_scans(plan_lines, dialect_name):
+    """Plan lines that read a whole HOT_TABLES table (a Seq Scan, or a SQLite SCAN without an index)."""
+    tables = '|'.join(HOT_TABLES)
+    if dialect_name == 'sqlite': pattern = re.compile(rf'^SCAN ({tables})(?: AS \w+)?$')
+    else: pattern = re.compile(rf'Seq Scan on ({tables})\b')
+    return [line for line in plan_lines if pattern.search(line.strip())]
+
+
+def check_query_plans(seed=True):
+    """
+    EXPLAINs every hot query and returns [(name, full-scan plan lines, all plan lines)]. With `seed`, synthetic
+    rows are added first; everything runs in one transaction that is rolled back. On PostgreSQL sequential
+    scans are disabled for the check, so a Seq Scan in the plan means no usable index exists (whatever the table size).
+    """
+    dialect_name = db.engine.dialect.name
+    try:
+        user_id = seed_synthetic_play() if seed else (db.session.query(func.min(Response.user_id)).scalar() or 1)
+        if dialect_name == 'postgresql': db.session.execute(text('SET LOCAL enable_seqscan = off'))
+        results = []
+        for name, query in hot_queries(user_id, PLAN_CHECK_CATEGORY).items():
+            plan = explain(query)
+            results.append((name, full_scans(plan, dialect_name), plan))
+        return results
+    finally:
+        db.session.rollback()
@@ -0,0 +1,96 @@
+# question_bank.py
+
+import hashlib
+import json
+import random
+from sqlalchemy import desc, func
+
+from models import db, Question
+
+
+def compute_content_hash(text: str) -> str:
+    """sha256 hex digest of the exact text a question is generated from."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def question_to_data(question: Question) -> dict:
+    """Converts a banked Question into the question_data dict used by the session and the pool."""
+    return {
+        'question_id': question.id,
+        'title': question.wiki_page_title,
+        'url': question.wiki_page_url,
+        'question': question.question_text,
+        'options': json.loads(question.answer_options),
+        'correct_answer_letter': question.correct_answer
+    }
+
+
+def find_banked_question(wiki_page_title: str, wiki_revision_id, content_hash: str, exclude_ids=None):
+    """
+    Returns an already generated Question for this exact page revision/content, or None.
+    When a page has several banked questions, well-tested ones (most answers) are preferred.
+    """
+    query = Question.query.filter_by(
+        wiki_page_title=wiki_page_title,
+        wiki_revision_id=wiki_revision_id,
+        content_hash=content_hash
+    )
+    if exclude_ids:
+        query = query.filter(Question.id.notin_(exclude_ids))
+    return query.order_by(desc(Question.answer_count), Question.id).first()
+
+
+def find_banked_questions(wiki_page_title: str, wiki_revision_id, content_hash: str):
+    """All banked questions for this exact page revision/content (several when it was batch-generated)."""
+    return Question.query.filter_by(
+        wiki_page_title=wiki_page_title,
+        wiki_revision_id=wiki_revision_id,
+        content_hash=content_hash
+    ).order_by(desc(Question.answer_count), Question.id).all()
+
+
+def find_fallback_question(exclude_titles=None):
+    """
+    A random banked question (skipping `exclude_titles`) for degraded mode, when live generation is unavailable.
+    Primary-key reads only: a random id between the smallest and largest, then the first question at or after it
+    (wrapping around), so the cost doesn't grow with the bank. Gaps in the ids make this only roughly uniform.
+    """
+    lowest_id, highest_id = db.session.query(func.min(Question.id), func.max(Question.id)).one()
+    if lowest_id is None: return None
+    pivot = random.randint(lowest_id, highest_id)
+    query = Question.query
+    if exclude_titles:
+        query = query.filter(Question.wiki_page_title.notin_(exclude_titles))
+    return query.filter(Question.id >= pivot).order_by(Question.id).first() \
+        or query.filter(Question.id < pivot).order_by(Question.id).first()
+
+
+def bank_question(wiki_page_title: str, wiki_page_url, wiki_revision_id, content_hash: str,
+                  question_text: str, options: dict, correct_answer: str) -> Question:
+    """Stores a freshly generated question and returns the committed Question row."""
+    question = Question(
+        wiki_page_title=wiki_page_title,
+        wiki_page_url=wiki_page_url,
+        wiki_revision_id=wiki_revision_id,
+        content_hash=content_hash,
+        question_text=question_text,
+        answer_options=json.dumps(options),
+        correct_answer=correct_answer
+    )
+    db.session.add(question)
+    db.session.commit()
+    return question
+
+
+def record_question_served(question_id: int):
+    """Increments serve_count. Committed by the caller."""
+    Question.query.filter_by(id=question_id)\
+        .update({Question.serve_count: Question.serve_count + 1}, synchronize_session=False)
+
+
+def record_question_answered(question_id: int, is_correct: bool):
+    """Increments answer/correct counts. Committed by the caller, in the same transaction as the Response."""
+    Question.query.filter_by(id=question_id).update({
+        Question.answer_count: Question.answer_count + 1,
+        Question.correct_count: Question.correct_count + (1 if is_correct else 0)
+    }, synchronize_session=False)
@@ -0,0 +1,187 @@
+# question_generation.py
+
+import json
+import threading
+
+OPTION_LETTERS = ['A', 'B', 'C', 'D']
+
+# Response schema for the structured-output path (Gemini `response_schema`, OpenAPI subset).
+QUESTION_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "article_number": {"type": "integer"},
+                    "question": {"type": "string"},
+                    "options": {
+                        "type": "object",
+                        "properties": {letter: {"type": "string"} for letter in OPTION_LETTERS},
+                        "required": OPTION_LETTERS
+                    },
+                    "correct_answer": {"type": "string", "format": "enum", "enum": OPTION_LETTERS}
+                },
+                "required": ["article_number", "question", "options", "correct_answer"]
+            }
+        }
+    },
+    "required": ["questions"]
+}
+
+QUESTION_STYLE_RULES = """The question should be specific, but answerable by a reasonably well educated adult with at least a little knowledge of the topic. The question itself should never refer to "the text" or "the article" or "the provided document" (e.g., avoid starting with "According to the text..."). Provide the question, 4 distinct answer choices (A, B, C, D) where only one is correct according to the text, and indicate the correct answer letter."""
+
+
+def theme_context_sentence(game_theme):
+    return f"The trivia question should ideally be related to the overall game theme of '{game_theme}'. " if game_theme else ""
+
+
+def build_single_question_prompt(text_to_send: str, game_theme=None) -> str:
+    return f"""{theme_context_sentence(game_theme)}Create a multiple-choice trivia question based *only* on the following text. {QUESTION_STYLE_RULES} Format the output *exactly* like this, with each part on a new line:\n\nQuestion: [Your question here]\nA) [Choice A]\nB) [Choice B]\nC) [Choice C]\nD) [Choice D]\nCorrect Answer: [Correct Letter (A, B, C, or D)]\n\nText:\n{text_to_send}"""
+
+
+def build_batch_prompt(article_texts, questions_per_article: int, game_theme=None) -> str:
+    """
+    One prompt asking for `questions_per_article` independent questions about each of the numbered
+    articles. Every block is tagged with its article number so answers can be traced back to a page.
+    """
+    articles_section = "\n\n".join(f"Article {number}:\n{text}" for number, text in enumerate(article_texts, start=1))
+    return f"""{theme_context_sentence(game_theme)}Create {questions_per_article} different multiple-choice trivia question(s) for EACH of the {len(article_texts)} numbered articles below. Each question must be based *only* on its own article, and questions about the same article must not overlap. {QUESTION_STYLE_RULES} Format every question *exactly* like this, with each part on a new line and a blank line between questions:\n\nArticle: [Article number]\nQuestion: [Your question here]\nA) [Choice A]\nB) [Choice B]\nC) [Choice C]\nD) [Choice D]\nCorrect Answer: [Correct Letter (A, B, C, or D)]\n\n{articles_section}"""
+
+
+def build_json_prompt(article_texts, questions_per_article: int, game_theme=None) -> str:
+    """Structured-output prompt (single question = one article, one question). Format is enforced by QUESTION_BATCH_SCHEMA."""
+    articles_section = "\n\n".join(f"Article {number}:\n{text}" for number, text in enumerate(article_texts, start=1))
+    return f"""{theme_context_sentence(game_theme)}Create {questions_per_article} different multiple-choice trivia question(s) for EACH of the {len(article_texts)} numbered articles below. Each question must be based *only* on its own article, and questions about the same article must not overlap. {QUESTION_STYLE_RULES} Return JSON: a "questions" array whose items have "article_number", "question", "options" (keys A, B, C, D) and "correct_answer" (one of A, B, C, D).\n\n{articles_section}"""
+
+
+def validate_question(question, options, correct_answer_letter):
+    """Shared checks for both parsers. Returns an error string, or None when the question is usable."""
+    if not question:
+        return "Empty question text."
+    if not isinstance(options, dict) or sorted(options) != OPTION_LETTERS:
+        return f"Options must be exactly A-D: {options}"
+    if not all(isinstance(o, str) and o.strip() for o in options.values()) or len(set(o.strip().lower() for o in options.values())) < 4:
+        return f"Empty or duplicate answer options: {options}"
+    if correct_answer_letter not in options:
+        return f"Correct letter '{correct_answer_letter}' not in options."
+    return None
+
+
+def parse_questions_json(content: str):
+    """
+    Fast parser for the structured-output path: one json.loads plus per-item validation.
+    Same return shape as parse_question_blocks: (questions, errors).
+    """
+    try:
+        items = json.loads(content).get("questions")
+    except (ValueError, AttributeError) as e:
+        return [], [f"Invalid JSON response: {e}"]
+    if not isinstance(items, list):
+        return [], ["JSON response has no 'questions' array."]
+    questions = []; errors = []
+    for item in items:
+        if not isinstance(item, dict):
+            errors.append(f"Question item is not an object: {item!r}"); continue
+        question = str(item.get("question") or "").strip()
+        options = item.get("options")
+        if isinstance(options, dict): options = {str(k).strip().upper(): str(v).strip() for k, v in options.items()}
+        correct_answer_letter = str(item.get("correct_answer") or "").strip().upper()
+        error = validate_question(question, options, correct_answer_letter)
+        if error:
+            errors.append(error); continue
+        article_number = item.get("article_number")
+        questions.append({'question': question, 'options': options, 'correct_answer_letter': correct_answer_letter,
+                          'article_number': article_number if isinstance(article_number, int) else None})
+    if not items:
+        errors.append("JSON response contained no questions.")
+    return questions, errors
+
+
+class ParseTelemetry:
+    """
+    Thread-safe per-path counters ('json' structured output vs legacy 'text') of Gemini responses that
+    parsed into at least one usable question vs. wasted round trips, plus per-block totals.
+    """
+
+    PATHS = ('json', 'text')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {path: {'responses_ok': 0, 'responses_failed': 0, 'questions_ok': 0, 'blocks_failed': 0} for path in self.PATHS}
+
+    def record(self, path: str, questions_ok: int, blocks_failed: int):
+        with self._lock:
+            counters = self._counters[path]
+            counters['responses_ok' if questions_ok else 'responses_failed'] += 1
+            counters['questions_ok'] += questions_ok
+            counters['blocks_failed'] += blocks_failed
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {path: dict(counters) for path, counters in self._counters.items()}
+        for counters in snapshot.values():
+            total = counters['responses_ok'] + counters['responses_failed']
+            counters['failure_rate'] = round(counters['responses_failed'] / total, 3) if total else None
+        return snapshot
+
+
+parse_telemetry = ParseTelemetry()
+
+
+def parse_question_lines(lines):
+    """
+    Parses one `Question:` block (already split into stripped, non-empty lines).
+    Returns (question, options, correct_answer_letter, error); error is None on success.
+    """
+    if not lines or not lines[0].startswith("Question:"):
+        return None, None, None, f"No 'Question:'. Line: '{lines[0] if lines else 'N/A'}'"
+    question = lines[0][len("Question:"):].strip()
+    options = {}; option_lines_found = 0; current_line_index = 1
+    while option_lines_found < 4 and current_line_index < len(lines):
+        line = lines[current_line_index]; expected_prefix = f"{OPTION_LETTERS[option_lines_found]})"
+        if line.startswith(expected_prefix): options[expected_prefix[0]] = line[len(expected_prefix):].strip(); option_lines_found += 1
+        current_line_index += 1
+    if option_lines_found < 4:
+        return None, None, None, f"Found {option_lines_found}/4 options. Lines: {lines}"
+    while current_line_index < len(lines):
+        line = lines[current_line_index]
+        if line.startswith("Correct Answer:"):
+            correct_answer_letter = line[len("Correct Answer:"):].strip().upper().rstrip(').')
+            error = validate_question(question, options, correct_answer_letter)
+            if error:
+                return None, None, None, error
+            return question, options, correct_answer_letter, None
+        current_line_index += 1
+    return None, None, None, f"No 'Correct Answer:' or invalid. Lines: {lines}"
+
+
+def parse_question_blocks(content: str):
+    """
+    Splits a (possibly multi-question) response into blocks at each `Question:` line and parses each
+    block independently, so one malformed block doesn't discard the rest.
+    Returns (questions, errors): questions is a list of dicts with keys
+    question/options/correct_answer_letter/article_number (None when untagged), errors a list of strings.
+    """
+    blocks = []; current_article = None
+    for line in (l.strip() for l in content.split('\n')):
+        if not line: continue
+        if line.startswith("Article:"):
+            try: current_article = int(line[len("Article:"):].strip().rstrip(':'))
+            except ValueError: current_article = None
+            continue
+        if line.startswith("Question:"):
+            blocks.append((current_article, [line]))
+        elif blocks:
+            blocks[-1][1].append(line)
+
+    questions = []; errors = []
+    for article_number, block_lines in blocks:
+        question, options, correct_answer_letter, error = parse_question_lines(block_lines)
+        if error:
+            errors.append(error); continue
+        questions.append({'question': question, 'options': options, 'correct_answer_letter': correct_answer_letter, 'article_number': article_number})
+    if not blocks:
+        errors.append(f"No 'Question:' blocks found in response: '{content[:80]}'")
+    return questions, errors
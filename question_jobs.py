@@ -0,0 +1,106 @@
+# question_jobs.py
+
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from models import db, QuestionJob
+
+JOB_PENDING = 'pending'
+JOB_READY = 'ready'
+JOB_FAILED = 'failed'
+JOB_CLAIMED = 'claimed'
+
+
+class QuestionJobRunner:
+    """
+    Runs live question generation off the request thread. `submit()` stores a pending QuestionJob row and
+    hands the work to a small per-process thread pool; the result is written back to the row, so any
+    worker process can answer the client's poll. Jobs never touch the (cookie) session: the poll request
+    that claims a ready job applies it to the session.
+    `generate_fn(theme, exclude_titles=...) -> (question_data, error_message)` runs inside an app context.
+    """
+
+    PRUNE_EVERY_N_SUBMITS = 50
+
+    def __init__(self, app, generate_fn, max_workers=4, job_timeout_seconds=60, retention_seconds=3600):
+        self.app = app
+        self.generate_fn = generate_fn
+        self.max_workers = max_workers
+        self.job_timeout_seconds = job_timeout_seconds
+        self.retention_seconds = retention_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._submits_since_prune = 0
+
+    def _get_executor(self):
+        with self._lock: # Created lazily so forked gunicorn workers each get their own threads
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='question-job')
+            return self._executor
+
+    def submit(self, user_id: int, game_category, theme, exclude_titles=None) -> QuestionJob:
+        """Stores a pending job and starts it. Needs an app context; commits."""
+        job = QuestionJob(id=uuid.uuid4().hex, user_id=user_id, game_category=game_category, status=JOB_PENDING)
+        db.session.add(job)
+        db.session.commit()
+        self._get_executor().submit(self._run, job.id, theme, list(exclude_titles or []))
+        self._submits_since_prune += 1
+        if self._submits_since_prune >= self.PRUNE_EVERY_N_SUBMITS:
+            self._submits_since_prune = 0
+            self.prune()
+        return job
+
+    def _run(self, job_id, theme, exclude_titles):
+        with self.app.app_context():
+            try:
+                question_data, error_message = self.generate_fn(theme, exclude_titles=exclude_titles)
+            except Exception as e:
+                db.session.rollback()
+                question_data, error_message = None, f"Question generation failed: {e}"
+            try:
+                values = {QuestionJob.finished_at: datetime.utcnow()}
+                if question_data:
+                    values.update({QuestionJob.status: JOB_READY, QuestionJob.question_data: json.dumps(question_data)})
+                else:
+                    values.update({QuestionJob.status: JOB_FAILED, QuestionJob.error_message: error_message or "Could not generate a question."})
+                QuestionJob.query.filter_by(id=job_id, status=JOB_PENDING).update(values, synchronize_session=False)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error storing result of question job {job_id}: {e}")
+
+    def get_job(self, job_id: str, user_id: int):
+        """The user's job, or None. A job pending for longer than job_timeout_seconds (e.g. its process died) is failed here."""
+        job = QuestionJob.query.filter_by(id=job_id, user_id=user_id).first()
+        if job and job.status == JOB_PENDING and job.created_at < datetime.utcnow() - timedelta(seconds=self.job_timeout_seconds):
+            QuestionJob.query.filter_by(id=job_id, status=JOB_PENDING).update({
+                QuestionJob.status: JOB_FAILED, QuestionJob.error_message: "Question generation timed out.",
+                QuestionJob.finished_at: datetime.utcnow()
+            }, synchronize_session=False)
+            db.session.commit()
+            db.session.refresh(job)
+        return job
+
+    def claim(self, job: QuestionJob):
+        """Atomically marks a ready job as claimed. Returns its question_data, or None if it was already claimed."""
+        claimed = QuestionJob.query.filter_by(id=job.id, status=JOB_READY)\
+            .update({QuestionJob.status: JOB_CLAIMED}, synchronize_session=False)
+        db.session.commit()
+        return json.loads(job.question_data) if claimed else None
+
+    def prune(self):
+        """Deletes finished jobs older than retention_seconds. Returns the number deleted."""
+        try:
+            deleted = QuestionJob.query\
+                .filter(QuestionJob.created_at < datetime.utcnow() - timedelta(seconds=self.retention_seconds))\
+                .filter(QuestionJob.status != JOB_PENDING)\
+                .delete(synchronize_session=False)
+            db.session.commit()
+            return deleted
+        except Exception as e:
+            db.session.rollback()
+            print(f"Question job prune failed: {e}")
+            return 0
@@ -0,0 +1,158 @@
+# question_pool.py
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func, desc
+
+from models import db, QuestionPoolItem, GameSummary
+
+GENERAL_KNOWLEDGE_CATEGORY = "General Knowledge"
+CUSTOM_CATEGORY_PREFIX = "Custom: "
+
+
+def pool_categories(user_selectable_categories: str, popular_custom_limit: int):
+    """
+    Returns the list of (pool_category, theme) pairs the pool should keep stocked:
+    General Knowledge, every user-selectable category, and the most played custom themes.
+    `theme` is what get_wikipedia_page/generate_question_from_text expect (None for General Knowledge).
+    """
+    categories = [(GENERAL_KNOWLEDGE_CATEGORY, None)]
+    for cat in [c.strip() for c in user_selectable_categories.split(',') if c.strip()]:
+        categories.append((cat, cat))
+
+    if popular_custom_limit > 0:
+        popular_custom = db.session.query(
+            GameSummary.game_category,
+            func.count(GameSummary.id).label('games_played')
+        ).filter(GameSummary.game_category.like(f"{CUSTOM_CATEGORY_PREFIX}%"))\
+         .group_by(GameSummary.game_category)\
+         .order_by(desc('games_played'))\
+         .limit(popular_custom_limit).all()
+        for row in popular_custom:
+            categories.append((row.game_category, row.game_category[len(CUSTOM_CATEGORY_PREFIX):]))
+    return categories
+
+
+def claim_pooled_question(pool_category: str, exclude_titles=None):
+    """
+    Atomically claims (and removes) the oldest pooled question for a category, skipping pages in `exclude_titles`.
+    FOR UPDATE SKIP LOCKED lets concurrent workers claim different rows without blocking each other.
+    Returns a question_data dict (same shape as session['current_question'] payload) or None if the pool is empty.
+    """
+    try:
+        query = QuestionPoolItem.query.filter_by(pool_category=pool_category)
+        if exclude_titles:
+            query = query.filter(QuestionPoolItem.wiki_page_title.notin_(exclude_titles))
+        item = query\
+            .order_by(QuestionPoolItem.id)\
+            .with_for_update(skip_locked=True)\
+            .first()
+        if not item:
+            db.session.rollback() # Release the (empty) FOR UPDATE transaction
+            return None
+        question_data = {
+            'question_id': item.question_id,
+            'title': item.wiki_page_title,
+            'url': item.wiki_page_url,
+            'question': item.question_text,
+            'options': json.loads(item.answer_options),
+            'correct_answer_letter': item.correct_answer
+        }
+        db.session.delete(item)
+        db.session.commit()
+        return question_data
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error claiming pooled question for '{pool_category}': {e}")
+        return None
+
+
+def add_pooled_question(pool_category: str, question_data: dict):
+    """Stores a generated question_data dict in the pool for the given category."""
+    item = QuestionPoolItem(
+        pool_category=pool_category,
+        question_id=question_data.get('question_id'),
+        wiki_page_title=question_data['title'],
+        wiki_page_url=question_data.get('url'),
+        question_text=question_data['question'],
+        answer_options=json.dumps(question_data['options']),
+        correct_answer=question_data['correct_answer_letter']
+    )
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
+def pool_depths():
+    """Returns {pool_category: number of ready questions}."""
+    rows = db.session.query(
+        QuestionPoolItem.pool_category,
+        func.count(QuestionPoolItem.id)
+    ).group_by(QuestionPoolItem.pool_category).all()
+    return {category: count for category, count in rows}
+
+
+def refill_category(pool_category: str, theme, target_depth: int, generate_fn):
+    """
+    Tops up one category to `target_depth` using
+    `generate_fn(theme, count, exclude_titles=...) -> (list of question_data, error_message)`.
+    Pages already pooled for the category are excluded so the pool doesn't fill up with repeats.
+    Stops on the first batch that adds nothing so a dead topic doesn't burn API quota. Returns the number added.
+    """
+    pooled_titles = {row.wiki_page_title for row in db.session.query(QuestionPoolItem.wiki_page_title).filter_by(pool_category=pool_category).all()}
+    current_depth = QuestionPoolItem.query.filter_by(pool_category=pool_category).count()
+    added = 0
+    while current_depth + added < target_depth:
+        question_batch, error_message = generate_fn(theme, target_depth - current_depth - added, exclude_titles=list(pooled_titles))
+        added_this_batch = 0
+        for question_data in question_batch[:target_depth - current_depth - added]:
+            try:
+                add_pooled_question(pool_category, question_data)
+                added_this_batch += 1
+                pooled_titles.add(question_data['title'])
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error adding pooled question for '{pool_category}': {e}")
+        added += added_this_batch
+        if not added_this_batch:
+            print(f"Pool refill for '{pool_category}' stopped: {error_message or 'batch added no questions'}")
+            break
+    if added:
+        print(f"Pool refill: added {added} question(s) to '{pool_category}' (depth now {current_depth + added}/{target_depth}).")
+    return added
+
+
+def refill_pool(app, categories, target_depth: int, generate_fn, max_workers: int = 1):
+    """
+    Tops up every (pool_category, theme) pair (see refill_category for the generate_fn contract). With max_workers > 1 categories are refilled
+    in parallel threads, each with its own app context (and therefore its own DB session).
+    """
+    def _refill_in_context(category_and_theme):
+        pool_category, theme = category_and_theme
+        with app.app_context():
+            return refill_category(pool_category, theme, target_depth, generate_fn)
+
+    if max_workers <= 1:
+        return sum(_refill_in_context(c) for c in categories)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return sum(executor.map(_refill_in_context, categories))
+
+
+def run_pool_worker(app, get_categories, get_target_depth, get_interval_seconds, generate_fn, max_workers: int = 1):
+    """
+    Long-running loop for a dedicated pool worker process. Settings are re-read on every pass
+    so admin changes to depth/interval/categories apply without a restart.
+    """
+    print("Question pool worker started.")
+    while True:
+        try:
+            with app.app_context():
+                categories = get_categories()
+                target_depth = get_target_depth()
+                interval_seconds = get_interval_seconds()
+            refill_pool(app, categories, target_depth, generate_fn, max_workers=max_workers)
+        except Exception as e:
+            print(f"Question pool worker pass failed: {e}")
+            interval_seconds = 30
+        time.sleep(max(1, interval_seconds))
@@ -0,0 +1,187 @@
+# rank_index.py
+
+import threading
+import time
+from bisect import bisect_left, insort
+
+from models import db, UserStats, GameSummary
+from sqlalchemy import func
+
+
+def best_game_per_user_query():
+    """(user_id, best single-game score) for every player with a game."""
+    return db.session.query(GameSummary.user_id, func.max(GameSummary.score)).group_by(GameSummary.user_id)
+
+
+class OrderStatisticsList:
+    """
+    Sorted multiset with O(log n) rank queries: sorted buckets of about `load` keys plus a Fenwick tree
+    over the bucket sizes. Adds/removes touch one bucket (and log(buckets) tree nodes); a bucket that grows
+    past 2*load is split, which rebuilds the tree in O(number of buckets).
+    """
+
+    def __init__(self, keys=(), load=512):
+        self.load = load
+        keys = sorted(keys)
+        self._buckets = [keys[i:i + load] for i in range(0, len(keys), load)] or [[]]
+        self._maxes = [bucket[-1] if bucket else None for bucket in self._buckets]
+        self._size = len(keys)
+        self._rebuild_tree()
+
+    def _rebuild_tree(self):
+        self._tree = [0] * (len(self._buckets) + 1)
+        for index, bucket in enumerate(self._buckets):
+            self._tree_add(index, len(bucket))
+
+    def _tree_add(self, index, delta):
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta; index += index & -index
+
+    def _tree_prefix(self, index):
+        """Number of keys in buckets [0, index)."""
+        total = 0
+        while index > 0:
+            total += self._tree[index]; index -= index & -index
+        return total
+
+    def _bucket_for(self, key):
+        index = bisect_left(self._maxes, key) if self._maxes[-1] is not None else 0
+        return min(index, len(self._buckets) - 1)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key):
+        index = self._bucket_for(key); bucket = self._buckets[index]
+        insort(bucket, key); self._maxes[index] = bucket[-1]; self._size += 1
+        if len(bucket) > 2 * self.load:
+            self._buckets[index:index + 1] = [bucket[:self.load], bucket[self.load:]]
+            self._maxes[index:index + 1] = [self._buckets[index][-1], self._buckets[index + 1][-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(index, 1)
+
+    def remove(self, key):
+        """Removes one occurrence of `key` (which must be present)."""
+        index = self._bucket_for(key); bucket = self._buckets[index]
+        del bucket[bisect_left(bucket, key)]; self._size -= 1
+        if bucket:
+            self._maxes[index] = bucket[-1]; self._tree_add(index, -1)
+        elif len(self._buckets) > 1:
+            del self._buckets[index]; del self._maxes[index]; self._rebuild_tree()
+        else:
+            self._maxes[index] = None; self._tree_add(index, -1)
+
+    def count_less(self, key):
+        """Number of keys strictly smaller than `key`."""
+        if not self._size: return 0
+        index = self._bucket_for(key)
+        return self._tree_prefix(index) + bisect_left(self._buckets[index], key)
+
+
+class MetricRanking:
+    """One leaderboard metric: user_id -> sort key, and the ordered keys (smaller key = better rank)."""
+
+    def __init__(self, higher_is_better: bool, values=None):
+        self.higher_is_better = higher_is_better
+        self._keys = {user_id: self._key(value) for user_id, value in (values or {}).items()}
+        self._ordered = OrderStatisticsList(self._keys.values())
+
+    def _key(self, value):
+        return -value if self.higher_is_better else value
+
+    def set(self, user_id, value):
+        """Inserts/moves a user; value None removes them (e.g. no longer eligible)."""
+        old_key = self._keys.pop(user_id, None)
+        if old_key is not None: self._ordered.remove(old_key)
+        if value is not None:
+            key = self._key(value); self._keys[user_id] = key; self._ordered.add(key)
+
+    def value(self, user_id):
+        key = self._keys.get(user_id)
+        return None if key is None else (-key if self.higher_is_better else key)
+
+    def rank(self, user_id):
+        """{'rank', 'of', 'percentile', 'value'} (ties share the best rank), or None when the user isn't ranked."""
+        key = self._keys.get(user_id)
+        if key is None: return None
+        rank = self._ordered.count_less(key) + 1; total = len(self._ordered)
+        # Percentile: share of ranked players this user is at least as good as (100 = best).
+        return {'rank': rank, 'of': total, 'percentile': round(100.0 * (total - rank + 1) / total, 1), 'value': self.value(user_id)}
+
+
+class LeaderboardRankIndex:
+    """
+    Per-process "where do I stand" index for the lifetime leaderboards: lifetime score, accuracy and Brier
+    (from user_stats, with the same minimum-question eligibility as the leaderboards) and best single game score.
+    Built from the DB on first use, updated in place after every answer/game this worker commits, and fully
+    rebuilt every `refresh_seconds` (or when the eligibility threshold changes) to pick up other workers' writes.
+    """
+
+    METRICS = ('score', 'accuracy', 'brier', 'best_game')
+
+    def __init__(self, refresh_seconds=300):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rankings = None
+        self._min_questions = None
+        self._built_at = 0.0
+        self.counters = {'rebuilds': 0, 'updates': 0, 'lookups': 0}
+
+    def _build(self, min_questions):
+        rows = db.session.query(UserStats.user_id, UserStats.points_sum, UserStats.answer_count, UserStats.accuracy,
+                                UserStats.brier_count, UserStats.average_brier).filter(UserStats.answer_count > 0).all()
+        best_games = best_game_per_user_query().all()
+        rankings = {
+            'score': MetricRanking(True, {row.user_id: row.points_sum for row in rows}),
+            'accuracy': MetricRanking(True, {row.user_id: row.accuracy for row in rows if row.answer_count >= min_questions and row.accuracy is not None}),
+            'brier': MetricRanking(False, {row.user_id: row.average_brier for row in rows if row.brier_count >= min_questions and row.average_brier is not None}),
+            'best_game': MetricRanking(True, {user_id: score for user_id, score in best_games if score is not None})
+        }
+        with self._lock:
+            self._rankings = rankings; self._min_questions = min_questions; self._built_at = time.monotonic()
+            self.counters['rebuilds'] += 1
+
+    def ensure_fresh(self, min_questions):
+        """Rebuilds (needs an app context) when never built, older than refresh_seconds, or built for another threshold."""
+        with self._lock:
+            fresh = self._rankings is not None and self._min_questions == min_questions and time.monotonic() - self._built_at < self.refresh_seconds
+        if fresh: return
+        if not self._rebuild_lock.acquire(blocking=self._rankings is None): return # Someone else is rebuilding: use the current index
+        try: self._build(min_questions)
+        finally: self._rebuild_lock.release()
+
+    def record_stats(self, user_id, stats):
+        """Applies a user's new user_stats values (dict from user_stats.record_answer) after the answer was committed."""
+        with self._lock:
+            if self._rankings is None: return # Not built yet; the first build reads the committed row
+            min_questions = self._min_questions
+            self._rankings['score'].set(user_id, stats['points_sum'])
+            self._rankings['accuracy'].set(user_id, stats['accuracy'] if stats['answer_count'] >= min_questions else None)
+            self._rankings['brier'].set(user_id, stats['average_brier'] if stats['brier_count'] >= min_questions else None)
+            self.counters['updates'] += 1
+
+    def record_game(self, user_id, score):
+        """A committed GameSummary: the user's best game is the max of the old best and `score`."""
+        with self._lock:
+            if self._rankings is None: return
+            best = self._rankings['best_game'].value(user_id)
+            if best is None or score > best: self._rankings['best_game'].set(user_id, score)
+            self.counters['updates'] += 1
+
+    def ranks_for(self, user_id):
+        """{metric: rank dict or None} for one user; call ensure_fresh first."""
+        with self._lock:
+            self.counters['lookups'] += 1
+            if self._rankings is None: return {metric: None for metric in self.METRICS}
+            return {metric: self._rankings[metric].rank(user_id) for metric in self.METRICS}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['ranked_users'] = {metric: len(ranking._keys) for metric, ranking in self._rankings.items()} if self._rankings else None
+            stats['age_seconds'] = round(time.monotonic() - self._built_at, 1) if self._rankings else None
+            stats['min_questions'] = self._min_questions
+        return stats
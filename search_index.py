@@ -0,0 +1,132 @@
+# search_index.py
+
+import queue
+import re
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (id INTEGER PRIMARY KEY, title TEXT NOT NULL UNIQUE, summary TEXT NOT NULL);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(title, summary, content='pages', content_rowid='id', tokenize='porter unicode61');
+CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+    INSERT INTO pages_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+    INSERT INTO pages_fts(pages_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE ON pages BEGIN
+    INSERT INTO pages_fts(pages_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+    INSERT INTO pages_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+END;
+"""
+UPSERT = "INSERT INTO pages(title, summary) VALUES (?, ?) ON CONFLICT(title) DO UPDATE SET summary = excluded.summary WHERE summary != excluded.summary"
+# bm25() is lower-is-better; title matches weigh 5x summary matches.
+SEARCH = "SELECT pages.title FROM pages_fts JOIN pages ON pages.id = pages_fts.rowid WHERE pages_fts MATCH ? ORDER BY bm25(pages_fts, 5.0, 1.0) LIMIT ?"
+
+
+def fts_terms(text: str):
+    """Query words as quoted FTS5 strings, so user text can never be parsed as FTS5 syntax."""
+    return ['"' + word.replace('"', '') + '"' for word in re.findall(r"\w+", text.lower()) if len(word) > 1]
+
+
+class LocalSearchIndex:
+    """
+    BM25-ranked full-text search (SQLite FTS5) over every article summary the app has seen: pages entering the
+    Wikipedia page cache are queued with `add()` and written in batches by a background thread, and
+    `flask build-search-index` backfills the page cache table and the local article index. The SQLite file is
+    separate from the main database and shared by all worker processes (WAL mode).
+    """
+
+    WRITE_BATCH_SIZE = 200
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._queue = queue.Queue(maxsize=10000)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._counters_lock = threading.Lock()
+        self.counters = {'searches': 0, 'local_hits': 0, 'queued': 0, 'dropped': 0, 'written': 0}
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+
+    @classmethod
+    def open(cls, path):
+        """LocalSearchIndex at `path`, or None when this SQLite build has no FTS5 (or the file can't be opened)."""
+        try: return cls(path)
+        except sqlite3.Error as e: print(f"Local search index unavailable ({path}): {e}"); return None
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, name, amount=1):
+        with self._counters_lock: self.counters[name] += amount
+
+    def record_local_hit(self):
+        """Counts a theme lookup answered from this index (without asking the MediaWiki search API)."""
+        self._count('local_hits')
+
+    def add(self, title: str, summary: str):
+        """Queues a page for indexing without blocking the caller; the queue drops pages when full."""
+        if not title or not summary: return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((title, summary)); self._count('queued')
+        except queue.Full:
+            self._count('dropped')
+
+    def add_record(self, record):
+        """WikiPageCache listener: indexes existing, non-disambiguation pages."""
+        if record.exists and not record.is_disambiguation: self.add(record.title, record.summary)
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name='search-index-writer', daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                try: batch.append(self._queue.get_nowait())
+                except queue.Empty: break
+            try: self.add_many(batch)
+            except sqlite3.Error as e: print(f"Local search index write failed ({len(batch)} pages): {e}")
+
+    def add_many(self, pages):
+        """Upserts (title, summary) pairs synchronously in one transaction. Returns the number written."""
+        connection = self._connection()
+        with connection:
+            connection.executemany(UPSERT, pages)
+        self._count('written', len(pages))
+        return len(pages)
+
+    def search(self, query: str, limit: int):
+        """
+        Titles ranked by BM25: pages matching every query word first, then (to fill `limit`) pages matching any.
+        """
+        terms = fts_terms(query)
+        if not terms: return []
+        self._count('searches')
+        connection = self._connection(); titles = []
+        for match in ([' AND '.join(terms), ' OR '.join(terms)] if len(terms) > 1 else [terms[0]]):
+            for (title,) in connection.execute(SEARCH, (match, limit)):
+                if title not in titles: titles.append(title)
+            if len(titles) >= limit: break
+        return titles[:limit]
+
+    def __len__(self):
+        return self._connection().execute("SELECT count(*) FROM pages").fetchone()[0]
+
+    def stats(self):
+        with self._counters_lock: stats = dict(self.counters)
+        stats['pages'] = len(self)
+        stats['pending_writes'] = self._queue.qsize()
+        return stats
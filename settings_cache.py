@@ -0,0 +1,99 @@
+# settings_cache.py
+
+import threading
+import time
+from flask import g, has_app_context
+from sqlalchemy import select
+
+from models import db, AppSetting, SettingsVersion
+from settings_schema import SETTINGS_BY_KEY, compile_settings
+
+SETTINGS_VERSION_ROW_ID = 1
+
+
+def cast_setting(raw_value, default_value):
+    """Casts a stored string to the type of `default_value`, for settings outside the schema; bad values give the default."""
+    if raw_value is None: return default_value
+    try:
+        value_type = type(default_value)
+        if value_type is bool:
+            val = raw_value.lower().strip()
+            if val in ('true', '1'): return True
+            elif val in ('false', '0'): return False
+            return default_value
+        return value_type(raw_value)
+    except (ValueError, TypeError): return default_value
+
+
+def bump_settings_version(session):
+    """Marks every worker's settings snapshot stale. Call in the same transaction as the AppSetting change; the caller commits."""
+    updated = session.query(SettingsVersion).filter_by(id=SETTINGS_VERSION_ROW_ID)\
+        .update({SettingsVersion.version: SettingsVersion.version + 1}, synchronize_session=False)
+    if not updated:
+        session.add(SettingsVersion(id=SETTINGS_VERSION_ROW_ID, version=1))
+
+
+class SettingsCache:
+    """
+    Per-process snapshot of the whole app_settings table, loaded with one query and compiled into a typed Settings object.
+    Freshness is checked at most once per app context (i.e. per request) and at most every `check_interval_seconds`,
+    with a single-row read of settings_version; the table is re-read only when that version has moved.
+    Reads use their own connection, so they never autoflush or join the caller's transaction.
+    """
+
+    def __init__(self, check_interval_seconds=1.0):
+        self.check_interval_seconds = check_interval_seconds
+        self._lock = threading.Lock()
+        self._raw = None # setting_key -> setting_value; None until the first load
+        self._settings = compile_settings({}) # Schema defaults until the first load
+        self._version = None
+        self._checked_at = 0.0
+        self.counters = {'reads': 0, 'version_checks': 0, 'reloads': 0, 'errors': 0}
+
+    def current(self):
+        """The compiled Settings of the current snapshot; its attributes are plain reads."""
+        self._refresh_if_stale()
+        self.counters['reads'] += 1
+        return self._settings
+
+    def get(self, key, default_value):
+        """Schema settings by name (`default_value` is ignored, the schema default applies); other keys are cast on read."""
+        settings = self.current()
+        if key in SETTINGS_BY_KEY: return getattr(settings, key)
+        return cast_setting((self._raw or {}).get(key), default_value)
+
+    def invalidate(self):
+        """Forces a reload on the next check (used by the admin view in the process that made the change)."""
+        with self._lock:
+            self._version = None; self._checked_at = 0.0
+
+    def _refresh_if_stale(self):
+        if has_app_context():
+            if g.get('_settings_checked'): return
+            g._settings_checked = True
+        now = time.monotonic()
+        with self._lock:
+            if self._raw is not None and now - self._checked_at < self.check_interval_seconds: return
+            self._checked_at = now; known_version = self._version if self._raw is not None else None
+        try:
+            with db.engine.connect() as connection:
+                try: version = connection.execute(select(SettingsVersion.version).where(SettingsVersion.id == SETTINGS_VERSION_ROW_ID)).scalar()
+                except Exception: connection.rollback(); version = None # No version table yet: reload every interval
+                self.counters['version_checks'] += 1
+                if version is not None and version == known_version: return
+                rows = connection.execute(select(AppSetting.setting_key, AppSetting.setting_value)).all()
+        except Exception as e:
+            self.counters['errors'] += 1
+            print(f"Settings reload failed, keeping the previous snapshot: {e}")
+            return
+        raw = {key: value for key, value in rows}; settings = compile_settings(raw)
+        with self._lock:
+            self._raw = raw; self._settings = settings; self._version = version
+            self.counters['reloads'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['settings'] = len(self._raw or {})
+            stats['version'] = self._version
+        return stats
@@ -0,0 +1,133 @@
+# settings_schema.py
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, AppSetting
+
+TRUE_STRINGS = ('true', '1', 'yes', 'on')
+FALSE_STRINGS = ('false', '0', 'no', 'off')
+
+
+class SettingSpec:
+    """Type, default, allowed range/choices and admin description of one AppSetting."""
+    __slots__ = ('key', 'type', 'default', 'description', 'min_value', 'max_value', 'choices')
+
+    def __init__(self, key, value_type, default, description, min_value=None, max_value=None, choices=None):
+        self.key = key
+        self.type = value_type
+        self.default = default
+        self.description = description
+        self.min_value = min_value
+        self.max_value = max_value
+        self.choices = choices
+
+    def parse(self, raw_value):
+        """Typed, range-checked value of a stored/submitted string. Raises ValueError with an admin-readable message."""
+        text = (raw_value or '').strip()
+        if self.type is bool:
+            if text.lower() in TRUE_STRINGS: return True
+            if text.lower() in FALSE_STRINGS: return False
+            raise ValueError(f"'{self.key}' must be true or false, not '{text}'.")
+        if self.type is str:
+            if self.choices: text = text.lower()
+            if self.choices and text not in self.choices: raise ValueError(f"'{self.key}' must be one of {', '.join(self.choices)}.")
+            return text
+        try: value = self.type(text)
+        except ValueError: raise ValueError(f"'{self.key}' must be {'a whole number' if self.type is int else 'a number'}, not '{text}'.")
+        if self.min_value is not None and value < self.min_value: raise ValueError(f"'{self.key}' must be at least {self.min_value}.")
+        if self.max_value is not None and value > self.max_value: raise ValueError(f"'{self.key}' must be at most {self.max_value}.")
+        return value
+
+    def format(self, value):
+        """Canonical stored string for a typed value."""
+        if self.type is bool: return 'true' if value else 'false'
+        return str(value)
+
+
+SETTINGS_SCHEMA = (
+    SettingSpec('min_summary_words', int, 50, 'Minimum words in Wikipedia summary to attempt question generation', min_value=1),
+    SettingSpec('gemini_context_length', int, 3000, 'Max characters of summary sent to Gemini API', min_value=100),
+    SettingSpec('gemini_context_tokens', int, 350, 'Token budget for the summary sent to Gemini: the most fact-dense whole sentences that fit are kept (0 = plain character cut)', min_value=0),
+    SettingSpec('page_selection_strategy', str, 'random', 'Method to select Wikipedia pages (random, search, category) - Admin default', choices=('random', 'search', 'category')),
+    SettingSpec('search_keywords', str, 'History, Science, Technology, Art, Geography, Culture, Philosophy, Sports', 'Comma-separated keywords for admin search strategy'),
+    SettingSpec('target_categories', str, 'Physics, World_War_II, Cities_in_France, Mammals, Programming_languages', 'Comma-separated categories for admin category strategy (no "Category:" prefix)'),
+    SettingSpec('user_selectable_categories', str, 'World History, Space Exploration, Ancient Civilizations, Modern Art, Programming Languages, Mythology, Film Directors, Famous Battles', 'Comma-separated list of predefined categories for users to select for their game.'),
+    SettingSpec('api_result_limit', int, 20, 'Max results to fetch/consider from admin search/category API calls', min_value=1, max_value=500),
+    SettingSpec('score_base_correct', float, 10.0, 'Base points for correct answer at 0% confidence'),
+    SettingSpec('score_mult_correct', float, 0.9, 'Additional points per confidence % for correct answer (e.g., 0.9*conf)'),
+    SettingSpec('score_base_incorrect', float, -100.0, 'Base points (penalty) for incorrect answer at 100% confidence'),
+    SettingSpec('score_mult_incorrect', float, 0.9, 'Reduction in penalty per confidence % *below* 100 for incorrect answer (e.g., base + 0.9*(100-conf))'),
+    SettingSpec('game_length', int, 20, 'Number of questions per game session', min_value=1, max_value=500),
+    SettingSpec('calibration_chart_bins', int, 10, 'Number of bins for the calibration chart (e.g., 5, 10, 20)', min_value=2, max_value=50),
+    SettingSpec('min_questions_for_cat_rank', int, 5, 'Min questions answered in a category to be considered for best/worst category ranking', min_value=1),
+    SettingSpec('leaderboard_top_n_users', int, 25, 'Number of users to display on leaderboards', min_value=1, max_value=1000),
+    SettingSpec('leaderboard_min_games_for_lifetime_ranking', int, 3, 'Minimum number of COMPLETED GAMES for user to appear on lifetime Brier/Accuracy leaderboards', min_value=0),
+    SettingSpec('leaderboard_min_games_for_category_leaderboard', int, 1, 'Minimum number of COMPLETED GAMES in a category for that category to have its own leaderboard section/link', min_value=0),
+    SettingSpec('leaderboard_min_games_for_category_ranking', int, 3, 'Minimum number of COMPLETED GAMES a user must have in a specific category to appear on that category\'s Brier/Accuracy leaderboard', min_value=0),
+    SettingSpec('leaderboard_page_size', int, 25, 'Rows per page of the JSON leaderboard API (what the leaderboard page loads as you scroll past the top list)', min_value=1, max_value=200),
+    SettingSpec('leaderboard_cache_ttl_seconds', int, 30, 'Seconds leaderboard results are served from the in-process cache before they are recomputed (0 = always recompute)', min_value=0, max_value=3600),
+    SettingSpec('leaderboard_cache_stale_seconds', int, 300, 'Seconds past the TTL a cached leaderboard is still served while one background refresh recomputes it', min_value=0, max_value=86400),
+    SettingSpec('question_pool_enabled', bool, True, 'Serve questions from the pre-generated pool when available (true/false). Live generation is the fallback.'),
+    SettingSpec('question_pool_target_depth', int, 10, 'Number of ready questions the pool worker keeps per category', min_value=0, max_value=1000),
+    SettingSpec('question_pool_popular_custom_themes', int, 5, 'How many of the most played custom themes also get a pre-generated pool', min_value=0, max_value=100),
+    SettingSpec('question_pool_refill_interval_seconds', int, 30, 'Seconds the pool worker sleeps between refill passes', min_value=1),
+    SettingSpec('wiki_page_cache_ttl_hours', int, 24, 'Hours a cached Wikipedia page record (summary, flags, revision id) stays valid', min_value=1),
+    SettingSpec('wiki_page_cache_max_entries', int, 50000, 'Maximum rows kept in the on-disk Wikipedia page cache (oldest evicted first)', min_value=100),
+    SettingSpec('candidate_cache_ttl_minutes', int, 60, 'Minutes a theme/keyword search or category member listing is reused before being fetched again', min_value=0),
+    SettingSpec('question_batch_size', int, 10, 'Questions requested from Gemini in one batch call when stocking the question pool', min_value=1, max_value=50),
+    SettingSpec('question_batch_articles', int, 3, 'Wikipedia articles combined into one batch Gemini call when stocking the question pool', min_value=1, max_value=10),
+    SettingSpec('gemini_structured_output', bool, True, 'Request JSON (schema-enforced) questions from Gemini; the legacy text format is used as fallback (true/false)'),
+    SettingSpec('gemini_hedging_enabled', bool, True, 'Start a second identical Gemini call when a live question call is slower than gemini_hedge_percentile of recent calls; first answer wins (true/false)'),
+    SettingSpec('gemini_hedge_percentile', float, 95.0, 'Latency percentile (of recent live Gemini calls) after which a hedge call is started', min_value=50.0, max_value=99.9),
+    SettingSpec('gemini_hedge_budget_percent', float, 10.0, 'Upper bound on hedge calls as a percentage of all Gemini calls', min_value=0.0, max_value=100.0),
+    SettingSpec('circuit_breaker_failure_threshold', int, 5, 'Consecutive Gemini (or Wikipedia) failures that open its circuit breaker; while open, questions come from stored ones or fail fast', min_value=1),
+    SettingSpec('circuit_breaker_recovery_seconds', int, 30, 'Seconds an open circuit breaker waits before letting a probe call through', min_value=1),
+    SettingSpec('async_generation_pipeline', bool, True, 'Run live generation as a concurrent pipeline (parallel page validation, Gemini on the first valid page); either way it is bounded by question_deadline_seconds (true/false)'),
+    SettingSpec('question_deadline_seconds', float, 6.0, 'End-to-end time budget of a synchronous /get_trivia_question request; after it a 503 is returned', min_value=0.0),
+    SettingSpec('async_question_generation', bool, True, 'Generate live (non-pool) questions in a background job the browser polls for, instead of inside the request (true/false)'),
+)
+SETTINGS_BY_KEY = {spec.key: spec for spec in SETTINGS_SCHEMA}
+
+
+class Settings:
+    """Immutable, fully typed view of every schema setting (`settings.game_length`), compiled once per snapshot."""
+    __slots__ = tuple(SETTINGS_BY_KEY)
+
+    def __init__(self, values):
+        for key in self.__slots__: object.__setattr__(self, key, values[key])
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Settings are read-only; change them in the admin.")
+
+
+def compile_settings(raw_values):
+    """Settings from {setting_key: stored string}. Missing or (pre-validation) invalid values fall back to the schema default."""
+    values = {}
+    for spec in SETTINGS_SCHEMA:
+        raw_value = raw_values.get(spec.key)
+        values[spec.key] = spec.default
+        if raw_value is None: continue
+        try: values[spec.key] = spec.parse(raw_value)
+        except ValueError as e: print(f"Invalid stored setting ignored, using default {spec.default!r}: {e}")
+    return Settings(values)
+
+
+def seed_default_settings():
+    """
+    Inserts every schema setting that has no row yet, and refreshes changed descriptions, in one bulk upsert
+    (safe to run concurrently from every worker). Stored values are never touched. Returns the number of rows written.
+    """
+    rows = [{'setting_key': spec.key, 'setting_value': spec.format(spec.default), 'description': spec.description} for spec in SETTINGS_SCHEMA]
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        statement = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(AppSetting).values(rows)
+        statement = statement.on_conflict_do_update(index_elements=[AppSetting.setting_key], set_={'description': statement.excluded.description},
+                                                    where=AppSetting.description.is_distinct_from(statement.excluded.description))
+        written = db.session.execute(statement).rowcount
+    else: # No portable upsert: one read of the existing keys, one bulk insert of the missing ones
+        existing = set(db.session.execute(select(AppSetting.setting_key)).scalars())
+        missing = [row for row in rows if row['setting_key'] not in existing]
+        if missing: db.session.execute(AppSetting.__table__.insert(), missing)
+        written = len(missing)
+    return written
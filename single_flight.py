@@ -0,0 +1,45 @@
+# single_flight.py
+
+import threading
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one: the first caller (the leader) runs `fn`,
+    every caller that arrives while it is running waits and gets the leader's result (or exception).
+    Per process only; calls made after the leader finished run `fn` again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {} # key -> _Call
+
+    class _Call:
+        __slots__ = ('done', 'result', 'error')
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def do(self, key, fn):
+        """Returns (result, shared); `shared` is True when this caller waited on another caller's fn."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None: raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
@@ -0,0 +1,52 @@
+# stats_queries.py
+
+from sqlalchemy import case, func
+
+from models import db, Response, GameSummary
+
+# The per-user reads behind the home page and the calibration chart. They return unexecuted queries so the
+# plan check (query_plans.py, tests/test_query_plans.py) EXPLAINs exactly what the views run.
+
+
+def lifetime_totals_query(user_id):
+    """One row: total_questions_lifetime, total_correct_lifetime, average_brier_lifetime, total_points_lifetime."""
+    return db.session.query(
+        func.count(Response.id).label('total_questions_lifetime'),
+        func.sum(case((Response.is_correct == True, 1), else_=0)).label('total_correct_lifetime'),
+        func.avg(Response.brier_score).label('average_brier_lifetime'),
+        func.sum(Response.points_awarded).label('total_points_lifetime')
+    ).filter(Response.user_id == user_id)
+
+
+def category_stats_query(user_id):
+    """One row per category the user has answered in, ordered by category."""
+    return db.session.query(
+        Response.game_category.label('display_category_name'),
+        func.count(Response.id).label('total_questions'),
+        func.sum(case((Response.is_correct == True, 1), else_=0)).label('total_correct'),
+        func.avg(Response.brier_score).label('average_brier'),
+        func.avg(Response.points_awarded).label('average_points')
+    ).filter(Response.user_id == user_id)\
+     .group_by(Response.game_category)\
+     .order_by(Response.game_category)
+
+
+def best_game_score_query(user_id):
+    return GameSummary.query\
+        .filter_by(user_id=user_id)\
+        .order_by(GameSummary.score.desc())\
+        .limit(1)
+
+
+def best_game_brier_query(user_id):
+    return GameSummary.query\
+        .filter(GameSummary.user_id == user_id, GameSummary.average_brier_score.isnot(None))\
+        .order_by(GameSummary.average_brier_score.asc())\
+        .limit(1)
+
+
+def calibration_responses_query(user_id):
+    """(user_confidence, is_correct) of every answer with a confidence."""
+    return Response.query.filter_by(user_id=user_id)\
+        .with_entities(Response.user_confidence, Response.is_correct)\
+        .filter(Response.user_confidence.isnot(None))
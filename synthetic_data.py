@@ -0,0 +1,41 @@
+# synthetic_data.py
+
+import random
+from datetime import datetime
+from sqlalchemy import text
+
+from models import db, User, Response, GameSummary, UserStats
+
+SYNTHETIC_CATEGORIES = ['World History', 'Mythology', 'Modern Art', None]
+
+
+def seed_synthetic_play(users=200, responses_per_user=50, games_per_user=3):
+    """
+    Synthetic players/answers/games (and their user_stats rows) for the plan check, the leaderboard benchmark and
+    the tests, added in the current transaction (the caller commits or rolls back) and ANALYZEd. Returns the first seeded user id.
+    """
+    now = datetime.utcnow()
+    seeded = [User(nickname=f'synthetic-{index}-{random.randrange(10**9)}') for index in range(users)]
+    db.session.add_all(seeded); db.session.flush()
+    response_rows = []; game_rows = []; stats_rows = []
+    for user in seeded:
+        first_response = len(response_rows)
+        for _ in range(responses_per_user):
+            brier = random.random() if random.random() < 0.9 else None
+            response_rows.append(dict(user_id=user.id, wiki_page_title='Synthetic', correct_answer='A', user_answer='A', timestamp=now,
+                                      user_confidence=random.randint(0, 100), is_correct=random.random() < 0.6, brier_score=brier,
+                                      points_awarded=random.uniform(-100, 100), game_category=random.choice(SYNTHETIC_CATEGORIES)))
+        for _ in range(games_per_user):
+            game_rows.append(dict(user_id=user.id, game_category=random.choice(SYNTHETIC_CATEGORIES), score=random.uniform(-500, 500),
+                                  average_brier_score=random.random() if random.random() < 0.9 else None, questions_answered=20, completed_at=now))
+        answers = response_rows[first_response:]; briers = [row['brier_score'] for row in answers if row['brier_score'] is not None]
+        correct_count = sum(row['is_correct'] for row in answers)
+        stats_rows.append(dict(user_id=user.id, answer_count=len(answers), correct_count=correct_count, brier_sum=sum(briers), brier_count=len(briers),
+                               points_sum=sum(row['points_awarded'] for row in answers), games_played=games_per_user,
+                               accuracy=correct_count * 100.0 / len(answers) if answers else None,
+                               average_brier=sum(briers) / len(briers) if briers else None, updated_at=now))
+    if response_rows: db.session.execute(Response.__table__.insert(), response_rows)
+    if game_rows: db.session.execute(GameSummary.__table__.insert(), game_rows)
+    if stats_rows: db.session.execute(UserStats.__table__.insert(), stats_rows)
+    db.session.execute(text('ANALYZE'))
+    return seeded[0].id
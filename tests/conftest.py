@@ -0,0 +1,41 @@
+# tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from synthetic_data import seed_synthetic_play
+
+
+@pytest.fixture(scope='session')
+def app():
+    """
+    A bare Flask app bound to `models.db` (importing app.py would connect to the configured database at import).
+    Uses a throwaway SQLite file unless TEST_DATABASE_URL points at a scratch PostgreSQL database; the schema is
+    created from the models and dropped again afterwards.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_app = Flask(__name__)
+        test_app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///' + os.path.join(tmp_dir, 'test.sqlite3')
+        test_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(test_app)
+        with test_app.app_context():
+            db.create_all()
+            yield test_app
+            db.session.remove(); db.drop_all(); db.engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def seeded_user_id(app):
+    """Commits a few hundred synthetic players (answers, games) once per run; returns the first of their ids."""
+    user_id = seed_synthetic_play(users=300, responses_per_user=40, games_per_user=4)
+    db.session.commit()
+    if db.engine.dialect.name == 'postgresql': db.session.execute(text('ANALYZE')); db.session.commit()
+    return user_id
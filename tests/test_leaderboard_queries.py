@@ -0,0 +1,73 @@
+# tests/test_leaderboard_queries.py
+
+from datetime import datetime
+
+import pytest
+
+from models import db, GameSummary
+from leaderboard_queries import parse_cursor, leaderboard_page, LIFETIME_BOARDS, CATEGORY_BOARDS
+from synthetic_data import SYNTHETIC_CATEGORIES
+
+CATEGORY = SYNTHETIC_CATEGORIES[0]
+THRESHOLDS = dict(min_questions=5, min_games=1)
+
+
+def walk(metric, category=None, page_size=7):
+    """Every row of a board, page by page through the API's cursor round trip."""
+    rows = []; cursor = None
+    while True:
+        page, next_cursor = leaderboard_page(metric, category, cursor, page_size, **THRESHOLDS)
+        rows.extend(page)
+        if next_cursor is None: return rows
+        cursor = parse_cursor(next_cursor)
+
+
+@pytest.mark.parametrize('cursor, expected', [
+    ('12.5:3', (12.5, 3)),
+    ('-1220.0:74', (-1220.0, 74)),
+    ('1e-05:4', (1e-05, 4)),
+    (f'{31.539999999999974!r}:3', (31.539999999999974, 3)),
+])
+def test_parse_cursor(cursor, expected):
+    assert parse_cursor(cursor) == expected
+
+
+@pytest.mark.parametrize('cursor', [None, '', '12.5', ':3', '12.5:', 'abc:3', '12.5:x', '12.5:3.0'])
+def test_parse_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        parse_cursor(cursor)
+
+
+@pytest.mark.parametrize('metric, category', [(metric, None) for metric in LIFETIME_BOARDS] + [(metric, CATEGORY) for metric in CATEGORY_BOARDS])
+def test_keyset_pages_match_one_big_page(seeded_user_id, metric, category):
+    everything, next_cursor = leaderboard_page(metric, category, None, 100000, **THRESHOLDS)
+    assert everything and next_cursor is None
+    paged = walk(metric, category)
+    assert [row.entry_id for row in paged] == [row.entry_id for row in everything]
+    assert len({row.entry_id for row in paged}) == len(paged)
+
+
+def test_page_boundaries(seeded_user_id):
+    everything, _ = leaderboard_page('score', limit=100000, **THRESHOLDS)
+    total = len(everything)
+    rows, next_cursor = leaderboard_page('score', limit=total, **THRESHOLDS)
+    assert len(rows) == total and next_cursor is None # Exactly full: no empty last page
+    rows, next_cursor = leaderboard_page('score', limit=total - 1, **THRESHOLDS)
+    assert next_cursor == f'{rows[-1].total_score_val!r}:{rows[-1].entry_id}'
+    last, after_last = leaderboard_page('score', cursor=parse_cursor(next_cursor), limit=total - 1, **THRESHOLDS)
+    assert [row.entry_id for row in last] == [everything[-1].entry_id] and after_last is None
+    assert leaderboard_page('score', cursor=(everything[-1].total_score_val, everything[-1].entry_id), **THRESHOLDS) == ([], None)
+
+
+def test_ties_are_split_by_entry_id(seeded_user_id):
+    try:
+        now = datetime.utcnow()
+        db.session.add_all([GameSummary(user_id=seeded_user_id, game_category=CATEGORY, score=10000.0, average_brier_score=0.0,
+                                        questions_answered=20, completed_at=now) for _ in range(5)])
+        db.session.flush()
+        for metric, category in (('game_score', None), ('game_brier', None), ('game_score', CATEGORY)): # Per-game boards
+            top = walk(metric, category, page_size=2)[:5]
+            assert [row.entry_id for row in top] == sorted((row.entry_id for row in top), reverse=metric == 'game_score')
+            assert len({getattr(row, (CATEGORY_BOARDS if category else LIFETIME_BOARDS)[metric].value_label) for row in top}) == 1
+    finally:
+        db.session.rollback()
@@ -0,0 +1,55 @@
+# tests/test_query_plans.py
+
+from sqlalchemy import text
+
+from models import db, Response
+from query_plans import HOT_TABLES, check_query_plans, explain, full_scans
+
+
+SQLITE_PLAN = [
+    'SEARCH responses USING COVERING INDEX ix_responses_user_category (user_id=?)',
+    'SCAN game_summaries USING COVERING INDEX ix_game_summaries_user_score',
+    'SCAN responses',
+    'SCAN game_summaries AS gs',
+    'SCAN users',
+    'USE TEMP B-TREE FOR ORDER BY',
+]
+
+POSTGRES_PLAN = [
+    'Limit  (cost=0.29..1.02 rows=1 width=40)',
+    '  ->  Index Only Scan using ix_responses_user_category on responses  (cost=0.29..8.31 rows=11 width=17)',
+    '  ->  Seq Scan on game_summaries  (cost=10000000000.00..10000000023.60 rows=1360 width=24)',
+    '  ->  Seq Scan on users  (cost=0.00..1.20 rows=20 width=36)',
+    '  ->  Seq Scan on responses_archive  (cost=0.00..1.20 rows=20 width=36)',
+]
+
+
+def test_full_scans_sqlite_flags_bare_scans_of_hot_tables_only():
+    assert full_scans(SQLITE_PLAN, 'sqlite') == ['SCAN responses', 'SCAN game_summaries AS gs']
+
+
+def test_full_scans_postgres_flags_seq_scans_of_hot_tables_only():
+    assert full_scans(POSTGRES_PLAN, 'postgresql') == [POSTGRES_PLAN[2]]
+
+
+def test_full_scans_of_clean_plan_is_empty():
+    assert full_scans(SQLITE_PLAN[:2], 'sqlite') == []
+    assert full_scans(POSTGRES_PLAN[:2], 'postgresql') == []
+    assert set(HOT_TABLES) >= {'responses', 'game_summaries'}
+
+
+def test_hot_queries_use_indexes(seeded_user_id):
+    results = check_query_plans(seed=False)
+    assert results
+    failures = {name: plan for name, scans, plan in results if scans}
+    assert not failures, '\n'.join(f'{name}:\n    ' + '\n    '.join(plan) for name, plan in failures.items())
+
+
+def test_unindexed_read_is_reported(seeded_user_id):
+    """The check itself: a filter on an unindexed column must show up as a full scan in the real plan."""
+    try:
+        if db.engine.dialect.name == 'postgresql': db.session.execute(text('SET LOCAL enable_seqscan = off'))
+        plan = explain(db.session.query(Response.id).filter(Response.wiki_page_title == 'Synthetic'))
+        assert full_scans(plan, db.engine.dialect.name), plan
+    finally:
+        db.session.rollback()
@@ -0,0 +1,49 @@
+# tests/test_rank_index.py
+
+import random
+from bisect import bisect_left
+
+from rank_index import OrderStatisticsList, MetricRanking
+
+
+def test_count_less_matches_sorted_list_through_adds_and_removes():
+    rng = random.Random(7)
+    reference = sorted(rng.randint(0, 50) for _ in range(40))
+    ordered = OrderStatisticsList(reference, load=4) # small buckets: many splits/merges
+    for step in range(2000):
+        if reference and rng.random() < 0.45:
+            key = rng.choice(reference); ordered.remove(key); reference.remove(key)
+        else:
+            key = rng.randint(0, 50); ordered.add(key); reference.insert(bisect_left(reference, key), key)
+        probe = rng.randint(-1, 51)
+        assert len(ordered) == len(reference)
+        assert ordered.count_less(probe) == bisect_left(reference, probe), step
+
+
+def test_empty_and_emptied_list():
+    ordered = OrderStatisticsList(load=2)
+    assert len(ordered) == 0 and ordered.count_less(10) == 0
+    for key in (3, 1, 2, 2, 5):
+        ordered.add(key)
+    assert [ordered.count_less(key) for key in (0, 1, 2, 3, 5, 6)] == [0, 0, 1, 3, 4, 5]
+    for key in (2, 5, 1, 3, 2):
+        ordered.remove(key)
+    assert len(ordered) == 0 and ordered.count_less(10) == 0
+    ordered.add(4)
+    assert ordered.count_less(4) == 0 and ordered.count_less(5) == 1
+
+
+def test_metric_ranking_higher_is_better_with_ties():
+    ranking = MetricRanking(True, {1: 10.0, 2: 30.0, 3: 30.0, 4: 5.0})
+    assert ranking.rank(2)['rank'] == 1 and ranking.rank(3)['rank'] == 1
+    assert ranking.rank(1) == {'rank': 3, 'of': 4, 'percentile': 50.0, 'value': 10.0}
+    assert ranking.rank(4)['rank'] == 4 and ranking.rank(99) is None
+
+
+def test_metric_ranking_lower_is_better_and_updates():
+    ranking = MetricRanking(False, {1: 0.2, 2: 0.1})
+    assert ranking.rank(2)['rank'] == 1
+    ranking.set(1, 0.05)
+    assert ranking.rank(1) == {'rank': 1, 'of': 2, 'percentile': 100.0, 'value': 0.05}
+    ranking.set(2, None)
+    assert ranking.rank(2) is None and ranking.rank(1)['of'] == 1
@@ -0,0 +1,86 @@
+# user_stats.py
+
+from datetime import datetime
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, UserStats, Response, GameSummary
+
+COUNTER_COLUMNS = ('answer_count', 'correct_count', 'brier_sum', 'brier_count', 'points_sum', 'games_played')
+RANKED_COLUMNS = ('answer_count', 'brier_count', 'points_sum', 'accuracy', 'average_brier')
+
+
+def _derived(counters):
+    """accuracy/average_brier for a dict of counter values (plain numbers or SQL expressions)."""
+    return {
+        'accuracy': case((counters['answer_count'] > 0, counters['correct_count'] * 100.0 / counters['answer_count']), else_=None),
+        'average_brier': case((counters['brier_count'] > 0, counters['brier_sum'] / counters['brier_count']), else_=None)
+    }
+
+
+def _increment(user_id, **deltas):
+    """
+    Adds `deltas` to the user's counters (creating the row on first use) and refreshes the derived columns,
+    as one UPSERT statement on PostgreSQL/SQLite. Runs in the caller's transaction; the caller commits.
+    Returns the row's new RANKED_COLUMNS values (for the in-memory rank index).
+    """
+    values = {column: deltas.get(column, 0) for column in COUNTER_COLUMNS}
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        initial = dict(values, accuracy=values['correct_count'] * 100.0 / values['answer_count'] if values['answer_count'] else None,
+                       average_brier=values['brier_sum'] / values['brier_count'] if values['brier_count'] else None)
+        statement = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(UserStats).values(user_id=user_id, updated_at=datetime.utcnow(), **initial)
+        totals = {column: getattr(UserStats, column) + getattr(statement.excluded, column) for column in COUNTER_COLUMNS}
+        statement = statement.on_conflict_do_update(index_elements=[UserStats.user_id],
+                                                    set_=dict(totals, **_derived(totals), updated_at=statement.excluded.updated_at))
+        return db.session.execute(statement.returning(*(getattr(UserStats, column) for column in RANKED_COLUMNS))).one()._asdict()
+    stats = db.session.get(UserStats, user_id, with_for_update=True)
+    if stats is None:
+        stats = UserStats(user_id=user_id, **{column: 0 for column in COUNTER_COLUMNS}); db.session.add(stats)
+    for column, delta in values.items(): setattr(stats, column, getattr(stats, column) + delta)
+    stats.accuracy = stats.correct_count * 100.0 / stats.answer_count if stats.answer_count else None
+    stats.average_brier = stats.brier_sum / stats.brier_count if stats.brier_count else None
+    return {column: getattr(stats, column) for column in RANKED_COLUMNS}
+
+
+def record_answer(user_id: int, is_correct: bool, brier_score, points):
+    """Counts one answer. Call in the same transaction as the Response insert; the caller commits. Returns the new aggregates."""
+    return _increment(user_id, answer_count=1, correct_count=1 if is_correct else 0,
+               brier_sum=brier_score or 0.0, brier_count=0 if brier_score is None else 1, points_sum=points or 0.0)
+
+
+def record_game_completed(user_id: int):
+    """Counts one completed game. Call in the same transaction as the GameSummary insert; the caller commits."""
+    _increment(user_id, games_played=1)
+
+
+def rebuild_user_stats():
+    """
+    Recomputes every user's row from responses and game_summaries (repair; the migration backfills the same values).
+    Answers submitted while it runs may be missed, so run it when the site is quiet. Returns the number of rows written.
+    """
+    answers = db.session.query(
+        Response.user_id,
+        func.count(Response.id),
+        func.sum(case((Response.is_correct == True, 1), else_=0)),
+        func.coalesce(func.sum(Response.brier_score), 0.0),
+        func.count(Response.brier_score),
+        func.coalesce(func.sum(Response.points_awarded), 0.0)
+    ).group_by(Response.user_id).all()
+    games = dict(db.session.query(GameSummary.user_id, func.count(GameSummary.id)).group_by(GameSummary.user_id).all())
+
+    rows = {}; now = datetime.utcnow()
+    for user_id, answer_count, correct_count, brier_sum, brier_count, points_sum in answers:
+        rows[user_id] = dict(user_id=user_id, answer_count=answer_count, correct_count=correct_count or 0, brier_sum=brier_sum,
+                             brier_count=brier_count, points_sum=points_sum, games_played=games.get(user_id, 0), updated_at=now)
+    for user_id, games_played in games.items():
+        rows.setdefault(user_id, dict(user_id=user_id, answer_count=0, correct_count=0, brier_sum=0.0, brier_count=0, points_sum=0.0,
+                                      games_played=games_played, updated_at=now))
+    for row in rows.values():
+        row['accuracy'] = row['correct_count'] * 100.0 / row['answer_count'] if row['answer_count'] else None
+        row['average_brier'] = row['brier_sum'] / row['brier_count'] if row['brier_count'] else None
+
+    db.session.query(UserStats).delete(synchronize_session=False)
+    if rows: db.session.execute(UserStats.__table__.insert(), list(rows.values()))
+    db.session.commit()
+    return len(rows)
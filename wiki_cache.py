@@ -0,0 +1,313 @@
+# wiki_cache.py
+
+import threading
+import time
+from datetime import datetime, timedelta
+from cachetools import LRUCache
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, WikiPageCacheEntry
+
+# prop=extracts with exintro returns at most 20 extracts per request, so batches are chunked to that size.
+MEDIAWIKI_BATCH_SIZE = 20
+# Pages smaller than this (bytes of wikitext) are treated as lead-only stubs when no section list is available.
+STUB_MAX_PAGE_BYTES = 3000
+
+
+def normalize_title(title: str) -> str:
+    """MediaWiki-style normalization: underscores -> spaces, collapsed whitespace, first letter upper-cased."""
+    title = ' '.join(title.replace('_', ' ').split())
+    return title[:1].upper() + title[1:]
+
+
+def looks_like_disambiguation(title: str, summary: str) -> bool:
+    summary_lower = (summary or '').lower()
+    return ("may refer to:" in summary_lower
+            or (title or '').lower().endswith("(disambiguation)")
+            or "is a disambiguation page" in summary_lower)
+
+
+def build_batch_page_query(titles):
+    """MediaWiki query params fetching intro extract, disambiguation prop, size, revision and URL for up to MEDIAWIKI_BATCH_SIZE titles."""
+    return {
+        "action": "query", "formatversion": "2", "redirects": "1",
+        "titles": "|".join(titles),
+        "prop": "extracts|pageprops|info",
+        "exintro": "1", "explaintext": "1", "exlimit": "max",
+        "ppprop": "disambiguation",
+        "inprop": "url"
+    }
+
+
+def parse_batch_page_query(data: dict, requested_titles):
+    """
+    Maps each requested title to a WikiPageRecord, following the API's normalization and redirect hops.
+    Titles the API didn't mention at all are left out (treated as fetch failures, not as missing pages).
+    """
+    query = data.get("query", {})
+    hops = {n['from']: n['to'] for n in query.get("normalized", [])}
+    hops.update({r['from']: r['to'] for r in query.get("redirects", [])})
+    pages_by_title = {p.get('title'): p for p in query.get("pages", [])}
+
+    records = {}
+    for requested in requested_titles:
+        final_title = requested
+        for _ in range(3): # normalized -> redirect -> (rarely) normalized again
+            if final_title not in hops: break
+            final_title = hops[final_title]
+        page = pages_by_title.get(final_title)
+        if page is not None:
+            records[requested] = WikiPageRecord.from_api_page(page)
+    return records
+
+
+class WikiPageRecord:
+    """
+    Compact, cacheable view of a Wikipedia page: everything page validation and question
+    generation need (title, fullurl, summary, counts, flags, revision id) without any further HTTP calls.
+    `is_stub` means the page has no body sections beyond the lead; the word-count half of the
+    stub rule depends on the min_summary_words setting and is applied at validation time.
+    """
+    __slots__ = ('title', 'exists', 'fullurl', 'summary', 'word_count', 'section_count',
+                 'is_disambiguation', 'is_stub', 'revision_id')
+
+    def __init__(self, title, exists=True, fullurl=None, summary='', section_count=0,
+                 revision_id=None, is_disambiguation=None, word_count=None, is_stub=None):
+        self.title = title
+        self.exists = exists
+        self.fullurl = fullurl
+        self.summary = summary or ''
+        self.word_count = word_count if word_count is not None else len(self.summary.split())
+        self.section_count = section_count
+        self.is_disambiguation = is_disambiguation if is_disambiguation is not None else looks_like_disambiguation(title, self.summary)
+        self.is_stub = is_stub if is_stub is not None else section_count <= 1
+        self.revision_id = revision_id
+
+    @classmethod
+    def missing(cls, title):
+        return cls(title, exists=False)
+
+    @classmethod
+    def from_api_page(cls, page: dict):
+        """
+        Builds a record from one entry of a formatversion=2 prop=extracts|pageprops|info response.
+        That query has no section list, so the stub flag is derived from the page size instead.
+        """
+        if page.get('missing') or page.get('invalid'):
+            return cls.missing(page.get('title'))
+        is_disambiguation = 'disambiguation' in page.get('pageprops', {}) or None # None -> fall back to text rules
+        return cls(page['title'], fullurl=page.get('fullurl'), summary=page.get('extract', ''),
+                   section_count=0, revision_id=page.get('lastrevid'), is_disambiguation=is_disambiguation,
+                   is_stub=page.get('length', 0) < STUB_MAX_PAGE_BYTES)
+
+    @classmethod
+    def from_entry(cls, entry: WikiPageCacheEntry):
+        return cls(entry.title, exists=entry.page_exists, fullurl=entry.fullurl, summary=entry.summary,
+                   section_count=entry.section_count, revision_id=entry.revision_id,
+                   is_disambiguation=entry.is_disambiguation, word_count=entry.word_count, is_stub=entry.is_stub)
+
+    def __repr__(self):
+        return f'<WikiPageRecord "{self.title}" rev={self.revision_id} words={self.word_count} exists={self.exists}>'
+
+
+class WikiPageCache:
+    """
+    Two-tier cache in front of Wikipedia page lookups:
+    a bounded in-process LRU (microsecond hits) over the wiki_page_cache table (shared by all workers).
+    Every entry carries its own expiry; the table is pruned to `max_db_entries`, oldest fetches first.
+    DB access needs an app context and uses its own connection, so it never flushes, commits or rolls back the caller's session.
+    """
+
+    PRUNE_EVERY_N_WRITES = 100
+
+    def __init__(self, memory_maxsize=2048, ttl_seconds=24 * 3600, max_db_entries=50000, on_store=None):
+        self.on_store = on_store # Optional callback(record) for every record stored, e.g. the local search index
+        self.ttl_seconds = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self._memory = LRUCache(maxsize=memory_maxsize) # title_key -> (expires_at_ts, WikiPageRecord)
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.counters = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+
+    def configure(self, ttl_seconds=None, max_db_entries=None):
+        if ttl_seconds is not None: self.ttl_seconds = ttl_seconds
+        if max_db_entries is not None: self.max_db_entries = max_db_entries
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 3) if lookups else None
+        return stats
+
+    def clear_memory(self):
+        """Empties this process's memory tier (the DB tier is kept)."""
+        with self._lock: self._memory.clear()
+
+    def get(self, title: str):
+        """Returns a fresh WikiPageRecord (possibly a negative `exists=False` one) or None on a miss."""
+        return self.get_many([title]).get(title)
+
+    def get_many(self, titles):
+        """{title: fresh WikiPageRecord} for the cached titles; misses are left out. One DB query for all memory misses."""
+        records = {}; pending = {} # title_key -> requested titles
+        now = time.time()
+        with self._lock:
+            for title in titles:
+                title_key = normalize_title(title)
+                cached = self._memory.get(title_key)
+                if cached and cached[0] > now:
+                    self.counters['memory_hits'] += 1
+                    records[title] = cached[1]; continue
+                if cached:
+                    self._memory.pop(title_key, None)
+                    self.counters['expired'] += 1
+                pending.setdefault(title_key, []).append(title)
+        if not pending: return records
+
+        try:
+            with db.engine.connect() as connection:
+                entries = connection.execute(select(WikiPageCacheEntry.__table__).where(WikiPageCacheEntry.title_key.in_(list(pending)))).all()
+        except Exception as e:
+            print(f"Wiki page cache DB read failed for {len(pending)} title(s): {e}")
+            entries = []
+        utcnow = datetime.utcnow()
+        with self._lock:
+            for entry in entries:
+                if entry.expires_at <= utcnow:
+                    self.counters['expired'] += 1; continue
+                record = WikiPageRecord.from_entry(entry)
+                self._memory[entry.title_key] = (now + (entry.expires_at - utcnow).total_seconds(), record)
+                for title in pending.pop(entry.title_key, ()):
+                    records[title] = record; self.counters['db_hits'] += 1
+            self.counters['misses'] += sum(len(requested) for requested in pending.values())
+        return records
+
+    def put(self, title: str, record: WikiPageRecord):
+        """Stores a record under the requested title (and its canonical title, if different)."""
+        self.put_many({title: record})
+
+    def put_many(self, records):
+        """Stores {requested title: record} (each also under its canonical title) with one bulk upsert."""
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds); fetched_at = datetime.utcnow()
+        rows = {}
+        for title, record in records.items():
+            keys = {normalize_title(title)}
+            if record.exists and record.title: keys.add(normalize_title(record.title))
+            with self._lock:
+                for title_key in keys: self._memory[title_key] = (time.time() + self.ttl_seconds, record)
+            for title_key in keys: rows[title_key] = self._entry_values(title_key, record, fetched_at, expires_at)
+        if not rows: return
+        self._write_entries(list(rows.values()))
+        if self.on_store:
+            for record in records.values(): self.on_store(record)
+        self._writes_since_prune += len(records)
+        if self._writes_since_prune >= self.PRUNE_EVERY_N_WRITES:
+            self._writes_since_prune = 0
+            self.prune()
+
+    @staticmethod
+    def _entry_values(title_key, record, fetched_at, expires_at):
+        return dict(
+            title_key=title_key, title=record.title, page_exists=record.exists, fullurl=record.fullurl,
+            summary=record.summary if record.exists else None, word_count=record.word_count,
+            section_count=record.section_count, is_disambiguation=record.is_disambiguation,
+            is_stub=record.is_stub, revision_id=record.revision_id,
+            fetched_at=fetched_at, expires_at=expires_at
+        )
+
+    def _write_entries(self, rows):
+        """One INSERT ... ON CONFLICT (title_key) DO UPDATE for all rows (concurrent writers of a title just overwrite each other)."""
+        try:
+            with db.engine.begin() as connection:
+                dialect = connection.dialect.name
+                if dialect in ('postgresql', 'sqlite'):
+                    statement = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(WikiPageCacheEntry).values(rows)
+                    connection.execute(statement.on_conflict_do_update(
+                        index_elements=[WikiPageCacheEntry.title_key],
+                        set_={column: statement.excluded[column] for column in rows[0] if column != 'title_key'}))
+                else: # No portable upsert: replace the rows in one transaction
+                    connection.execute(delete(WikiPageCacheEntry).where(WikiPageCacheEntry.title_key.in_([row['title_key'] for row in rows])))
+                    connection.execute(WikiPageCacheEntry.__table__.insert(), rows)
+        except Exception as e:
+            print(f"Wiki page cache DB write failed for {len(rows)} title(s): {e}")
+
+    def get_or_fetch(self, title: str, fetch_fn):
+        """Cache lookup falling back to `fetch_fn(title) -> WikiPageRecord`. Fetch errors propagate and are not cached."""
+        record = self.get(title)
+        if record is None:
+            record = fetch_fn(title)
+            self.put(title, record)
+        return record
+
+    def get_or_fetch_many(self, titles, fetch_batch_fn):
+        """
+        Batch lookup. Cached titles are answered locally; all the others are fetched with a single
+        `fetch_batch_fn(titles) -> {title: WikiPageRecord}` call and cached. Returns {title: WikiPageRecord}.
+        """
+        records = self.get_many(titles)
+        to_fetch = [title for title in titles if title not in records]
+        if to_fetch:
+            fetched = fetch_batch_fn(to_fetch)
+            self.put_many(fetched)
+            records.update(fetched)
+        return records
+
+    def prune(self):
+        """Deletes expired rows, then the oldest rows beyond max_db_entries. Returns the number deleted."""
+        try:
+            with db.engine.begin() as connection:
+                deleted = connection.execute(delete(WikiPageCacheEntry).where(WikiPageCacheEntry.expires_at <= datetime.utcnow())).rowcount
+                excess = connection.execute(select(func.count(WikiPageCacheEntry.id))).scalar() - self.max_db_entries
+                if excess > 0:
+                    oldest_ids = select(WikiPageCacheEntry.id).order_by(WikiPageCacheEntry.fetched_at).limit(excess).scalar_subquery()
+                    deleted += connection.execute(delete(WikiPageCacheEntry).where(WikiPageCacheEntry.id.in_(oldest_ids))).rowcount
+            with self._lock:
+                self.counters['evicted'] += deleted
+            return deleted
+        except Exception as e:
+            print(f"Wiki page cache prune failed: {e}")
+            return 0
+
+
+class CandidateListCache:
+    """
+    In-process TTL cache of candidate title lists keyed by (strategy, query, limit), so a search or
+    category listing is fetched once and then serves many questions. Empty results are not cached.
+    """
+
+    def __init__(self, maxsize=512, ttl_seconds=3600):
+        self.ttl_seconds = ttl_seconds
+        self._entries = LRUCache(maxsize=maxsize) # (strategy, query, limit) -> (expires_at_ts, titles)
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0}
+
+    def configure(self, ttl_seconds=None):
+        if ttl_seconds is not None: self.ttl_seconds = ttl_seconds
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+        return stats
+
+    def get_or_fetch(self, strategy: str, query: str, limit: int, fetch_fn):
+        """Returns a copy of the cached title list, calling `fetch_fn() -> list of titles` on a miss or expiry."""
+        key = (strategy, query.strip().lower(), limit)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] > time.time():
+                self.counters['hits'] += 1
+                return list(cached[1])
+            self.counters['misses'] += 1
+        titles = fetch_fn()
+        if titles:
+            with self._lock:
+                self._entries[key] = (time.time() + self.ttl_seconds, list(titles))
+        return list(titles)
@@ -0,0 +1,118 @@
+# wiki_client.py
+
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """Thread-safe token bucket. `acquire()` blocks until a token is available (or `timeout` passes)."""
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate_per_second)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate_per_second
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class WikipediaAPIError(Exception):
+    """Raised when the MediaWiki API keeps failing after all retries (or is rate limited locally)."""
+
+
+class WikipediaClient:
+    """
+    Process-wide MediaWiki API client: one pooled keep-alive session, connect/read timeouts,
+    jittered exponential backoff on 429/5xx/maxlag, and a token-bucket limiter so a busy
+    worker stays within Wikimedia's API etiquette (identifying User-Agent, gzip, maxlag, modest request rate).
+    """
+
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, user_agent: str, api_url: str = "https://en.wikipedia.org/w/api.php",
+                 pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 requests_per_second: float = 10.0, burst: int = 20, maxlag: int = 5, breaker=None, adapter=None):
+        self.api_url = api_url
+        self.breaker = breaker # Optional CircuitBreaker; a query that exhausts its retries counts as one failure
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.maxlag = maxlag
+        self.rate_limiter = TokenBucket(requests_per_second, burst)
+
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': user_agent, 'Accept-Encoding': 'gzip'})
+        # Retries are handled below (with jitter and Retry-After), so the adapter itself never retries.
+        # A custom `adapter` (see backends.py: record/replay) replaces the pooled HTTP one.
+        adapter = adapter or HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff_delay(self, attempt: int, retry_after=None) -> float:
+        if retry_after:
+            try: return min(self.backoff_max, float(retry_after))
+            except ValueError: pass
+        # "Full jitter": uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def query(self, params: dict) -> dict:
+        """GETs api.php with `params` (format=json and maxlag are added) and returns the decoded JSON."""
+        if self.breaker and not self.breaker.allow():
+            raise WikipediaAPIError(f"Wikipedia circuit breaker is open; failing fast (retry in {self.breaker.retry_after_seconds():.0f}s).")
+        try:
+            data = self._query_with_retries(params)
+        except WikipediaAPIError as e:
+            if self.breaker: self.breaker.record_failure(e)
+            raise
+        except Exception:
+            if self.breaker: self.breaker.record_success() # Wikipedia answered (e.g. a 4xx); not an outage
+            raise
+        if self.breaker: self.breaker.record_success()
+        return data
+
+    def _query_with_retries(self, params: dict) -> dict:
+        params = {"format": "json", "maxlag": str(self.maxlag), **params}
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if not self.rate_limiter.acquire(timeout=self.timeout[1]):
+                raise WikipediaAPIError("Local Wikipedia rate limit: no request token available in time.")
+            retry_after = None
+            try:
+                response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+                if response.status_code in self.RETRY_STATUS_CODES:
+                    retry_after = response.headers.get('Retry-After')
+                    last_error = WikipediaAPIError(f"HTTP {response.status_code} from Wikipedia API")
+                else:
+                    response.raise_for_status()
+                    data = response.json()
+                    if data.get('error', {}).get('code') == 'maxlag':
+                        retry_after = response.headers.get('Retry-After')
+                        last_error = WikipediaAPIError(f"Wikipedia replication lag: {data['error'].get('info')}")
+                    else:
+                        return data
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = e
+            if attempt < self.max_retries:
+                delay = self._backoff_delay(attempt, retry_after)
+                print(f"Wikipedia API attempt {attempt + 1} failed ({last_error}); retrying in {delay:.2f}s.")
+                time.sleep(delay)
+        raise WikipediaAPIError(f"Wikipedia API failed after {self.max_retries + 1} attempts: {last_error}")